@@ -0,0 +1,200 @@
+# connectors.py
+# ---------------------------------------------------------------------
+# Source connector registry + concurrent runtime.
+#
+# A source is one Connector: its fetch(ctx) returns base_item records,
+# and it declares its own request rate, concurrency and page budget.
+# The sources themselves are registered in pipeline.py (next to their
+# normalization); run_connectors() then
+# - runs every enabled connector in its own thread → sources overlap
+#   instead of adding up
+# - gives each one a SourceContext: shared pooled httpx.Client, a
+#   per-source RateLimiter + semaphore (ctx.get / ctx.entries), ctx.map
+#   for parallel sub-requests, ctx.paginate for page loops
+# - isolates failures: a failing source logs a warning and yields []
+# - persists a cursor per source (out/connectors/cursors.json): newest
+#   published_ts seen + anything the connector stores in ctx.cursor;
+#   with FEED_HWM=1 ctx.since starts at that mark (incremental polling);
+#   a run with failed sub-requests keeps the old mark, so what it missed
+#   is fetched again next run. A page budget spent on full pages is a
+#   real gap for newest-first APIs (the next run would get the same
+#   newest page again): the mark advances, the gap is logged and kept in
+#   the cursor ("gap": [since, oldest fetched]) → raise *_PAGES
+#
+#   SOURCES=nzz,finews python pipeline.py    # restrict to some sources
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from edgar import RateLimiter
+from feeds import stream_entries, FeedTruncated, FEED_HWM
+from snapshots import atomic_write_json
+
+SOURCES       = {s.strip() for s in os.getenv("SOURCES", "").split(",") if s.strip()}   # empty = all enabled
+CURSOR_PATH   = Path(os.getenv("CONNECTOR_CURSORS", "out/connectors/cursors.json"))
+LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "7"))
+
+
+@dataclass
+class Connector:
+    name: str
+    fetch: Callable[["SourceContext"], List[Any]]
+    enabled: Callable[[], bool] = lambda: True
+    rate: float = 5.0          # requests/s against this source
+    concurrency: int = 2       # parallel requests against this source
+    max_pages: int = 1         # ctx.paginate() budget per run
+
+
+class SourceContext:
+    def __init__(self, conn: Connector, http: httpx.Client, cursor: Dict[str, Any], since: float):
+        self.name = conn.name
+        self.rate = conn.rate
+        self.concurrency = max(1, conn.concurrency)
+        self.max_pages = max(1, conn.max_pages)
+        self.http = http
+        self.cursor = cursor        # persisted after a successful run
+        self.since = since          # epoch: lookback cutoff or high-water mark
+        self.stats = {"requests": 0, "errors": 0, "truncated": 0}
+        self._limiter = RateLimiter(conn.rate)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def get(self, url: str, **kw) -> httpx.Response:
+        with self._slots:
+            self._limiter.wait()
+            self.stats["requests"] += 1
+            r = self.http.get(url, **kw)
+        r.raise_for_status()
+        return r
+
+    def entries(self, url: str) -> List[Dict[str, Any]]:
+        """Atom/RSS entries newer than ctx.since (streamed, see feeds.py). A feed that
+        breaks off mid-stream returns what was read and counts as an error (mark kept)."""
+        out: List[Dict[str, Any]] = []
+        with self._slots:
+            self._limiter.wait()
+            self.stats["requests"] += 1
+            try:
+                out.extend(stream_entries(self.http, url, since=self.since))
+            except FeedTruncated as e:
+                self.stats["errors"] += 1
+                print(f"[connectors] [warn] {self.name}: {url} cut off after {len(out)} entries: {e}", flush=True)
+        return out
+
+    def map(self, fn: Callable[[Any], Any], args: Iterable[Any]) -> List[Any]:
+        """[fn(a) …] with up to `concurrency` in flight; failed calls are logged and skipped."""
+        def safe(a):
+            try:
+                return True, fn(a)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[connectors] [warn] {self.name}: {a} failed: {e}", flush=True)
+                return False, None
+        args = list(args)
+        if self.concurrency == 1 or len(args) <= 1:
+            res = [safe(a) for a in args]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(args))) as pool:
+                res = list(pool.map(safe, args))
+        return [r for ok, r in res if ok]
+
+    def paginate(self, fetch_page: Callable[[int], List[Any]], *, first: int = 1,
+                 page_size: int | None = None) -> List[Any]:
+        """fetch_page(1), fetch_page(2), … until an empty/short page or max_pages.
+        Errors after the first page end the loop and keep what was fetched."""
+        out: List[Any] = []
+        for page in range(first, first + self.max_pages):
+            try:
+                rows = fetch_page(page)
+            except Exception as e:
+                if page == first:
+                    raise
+                self.stats["errors"] += 1
+                print(f"[connectors] [warn] {self.name}: page {page} failed: {e}", flush=True)
+                break
+            out.extend(rows)
+            if not rows or (page_size and len(rows) < page_size):
+                break
+        else:
+            self.stats["truncated"] += 1   # page budget spent on full pages → maybe more left
+        return out
+
+
+CONNECTORS: Dict[str, Connector] = {}
+
+
+def register(conn: Connector) -> Connector:
+    CONNECTORS[conn.name] = conn
+    return conn
+
+
+def load_cursors(path: Path = CURSOR_PATH) -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def run_connectors(names: Optional[Iterable[str]] = None, *, headers: Dict[str, str] | None = None,
+                   timeout: float = 20.0, incremental: bool = FEED_HWM,
+                   lookback_days: int = LOOKBACK_DAYS) -> Dict[str, List[Any]]:
+    """Fetch all enabled connectors concurrently → {name: items} (every registered name present)."""
+    wanted = set(names) if names is not None else set(CONNECTORS)
+    out: Dict[str, List[Any]] = {n: [] for n in CONNECTORS if n in wanted}
+    active = [c for c in CONNECTORS.values()
+              if c.name in wanted and (not SOURCES or c.name in SOURCES) and c.enabled()]
+    if not active:
+        return out
+
+    cursors = load_cursors()
+    cutoff = time.time() - lookback_days * 86400
+    pool_size = sum(max(1, c.concurrency) for c in active)
+    lock = threading.Lock()
+
+    with httpx.Client(timeout=timeout, headers=headers, follow_redirects=True,
+                      limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)) as http:
+
+        def run(conn: Connector) -> None:
+            cur = dict(cursors.get(conn.name) or {})
+            since = max(cutoff, float(cur.get("hwm") or 0.0)) if incremental else cutoff
+            ctx = SourceContext(conn, http, cur, since)
+            t0 = time.perf_counter()
+            try:
+                items = list(conn.fetch(ctx) or [])
+            except Exception as e:
+                print(f"[connectors] [warn] {conn.name} failed: {e}", flush=True)
+                return
+            newest = max((it.get("published_ts") or 0.0 for it in items), default=0.0)
+            if ctx.stats["errors"]:
+                print(f"[connectors] [warn] {conn.name}: partial fetch, high-water mark kept", flush=True)
+            else:
+                if ctx.stats["truncated"]:
+                    oldest = min((it.get("published_ts") or newest for it in items), default=newest)
+                    cur["gap"] = [since, oldest]
+                    print(f"[connectors] [warn] {conn.name}: page budget ({conn.max_pages}) used up, "
+                          f"{(oldest - since) / 3600:.1f}h before the oldest item not read", flush=True)
+                if newest > float(cur.get("hwm") or 0.0):
+                    cur["hwm"] = newest
+            with lock:
+                out[conn.name] = items
+                cursors[conn.name] = cur
+            print(f"[connectors] {conn.name}: {len(items)} items in {time.perf_counter() - t0:.2f}s "
+                  f"(requests={ctx.stats['requests']} errors={ctx.stats['errors']})", flush=True)
+
+        with ThreadPoolExecutor(max_workers=len(active), thread_name_prefix="connector") as pool:
+            list(pool.map(run, active))
+
+    try:
+        atomic_write_json(CURSOR_PATH, cursors, indent=2)
+    except OSError as e:
+        print(f"[connectors] [warn] could not save cursors: {e}", flush=True)
+    return out
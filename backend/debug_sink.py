@@ -0,0 +1,144 @@
+# debug_sink.py
+# ---------------------------------------------------------------------
+# Background debug sink for malformed LLM responses.
+# - debug_write() only enqueues (never touches disk on the caller thread)
+# - one writer thread appends batches to a gzip JSONL log
+# - size-capped rotation (llm_debug.jsonl.gz → .1.gz → … → dropped)
+# - sampling + bounded queue: under heavy failure we drop, not block
+# File count in out/debug stays constant no matter how many parses fail.
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEBUG_DIR        = Path(os.getenv("DEBUG_DIR", "out/debug"))
+DEBUG_SAMPLE     = float(os.getenv("DEBUG_SAMPLE", "1.0"))          # 0..1 share of records kept
+DEBUG_MAX_BYTES  = int(os.getenv("DEBUG_MAX_BYTES", str(5 * 1024 * 1024)))
+DEBUG_BACKUPS    = int(os.getenv("DEBUG_BACKUPS", "3"))
+DEBUG_QUEUE_MAX  = 1000
+DEBUG_BATCH      = 100
+DEBUG_FLUSH_SECS = 2.0
+
+
+class DebugSink:
+    def __init__(self, directory: Path = DEBUG_DIR, *, name: str = "llm_debug",
+                 sample: float = DEBUG_SAMPLE, max_bytes: int = DEBUG_MAX_BYTES,
+                 backups: int = DEBUG_BACKUPS):
+        self.dir = Path(directory)
+        self.path = self.dir / f"{name}.jsonl.gz"
+        self.name = name
+        self.sample = sample
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._q: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=DEBUG_QUEUE_MAX)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stats = {"queued": 0, "written": 0, "sampled_out": 0, "dropped": 0, "rotations": 0}
+
+    # ---- producer side (hot path) ----
+    def write(self, kind: str, item_id: str | None, *, raw: str | None = None, parsed: Any = None) -> None:
+        if self.sample < 1.0 and random.random() >= self.sample:
+            self.stats["sampled_out"] += 1
+            return
+        self._ensure_thread()
+        rec = {"ts": time.time(), "kind": kind, "id": item_id or "unknown"}
+        if raw is not None:
+            rec["raw"] = raw
+        if parsed is not None:
+            rec["parsed"] = parsed
+        try:
+            self._q.put_nowait(rec)
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until everything queued so far is on disk (call at shutdown)."""
+        if self._thread is None:
+            return
+        self._q.put(None)  # flush marker
+        deadline = time.time() + timeout
+        while self._q.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    # ---- writer thread ----
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"debug-sink-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch, flush_now = [], False
+            try:
+                first = self._q.get(timeout=DEBUG_FLUSH_SECS)
+            except queue.Empty:
+                continue
+            pending = 1
+            if first is None:
+                flush_now = True
+            else:
+                batch.append(first)
+            while not flush_now and len(batch) < DEBUG_BATCH:
+                try:
+                    nxt = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                pending += 1
+                if nxt is None:
+                    flush_now = True
+                else:
+                    batch.append(nxt)
+            try:
+                if batch:
+                    self._append(batch)
+            except Exception:
+                self.stats["dropped"] += len(batch)
+            finally:
+                for _ in range(pending):
+                    self._q.task_done()
+
+    def _append(self, batch) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+        payload = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+        # each batch is its own gzip member; gzip readers concatenate members transparently
+        with gzip.open(self.path, "ab") as f:
+            f.write(payload.encode("utf-8"))
+        self.stats["written"] += len(batch)
+
+    def _rotate(self) -> None:
+        for i in range(self.backups, 0, -1):
+            src = self.path if i == 1 else self.dir / f"{self.name}.{i-1}.jsonl.gz"
+            dst = self.dir / f"{self.name}.{i}.jsonl.gz"
+            if src.exists():
+                os.replace(src, dst)
+        if self.backups <= 0 and self.path.exists():
+            self.path.unlink()
+        self.stats["rotations"] += 1
+
+
+_SINK = DebugSink()
+atexit.register(_SINK.flush)
+
+
+def debug_write(kind: str, item_id: str | None, *, raw: str | None = None, parsed: Any = None) -> None:
+    """Queue one malformed/odd LLM response for the background debug log."""
+    _SINK.write(kind, item_id, raw=raw, parsed=parsed)
+
+
+def debug_stats() -> Dict[str, int]:
+    return dict(_SINK.stats)
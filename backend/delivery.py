@@ -0,0 +1,476 @@
+# delivery.py
+# ---------------------------------------------------------------------
+# Persistent alert delivery queue (SQLite, WAL) between the pipeline's
+# subscriber fan-out and outbound channels (HTTP digest endpoint, or
+# per-recipient Slack webhook / HTTP webhook / email).
+# - enqueue() is cheap and idempotent per (recipient, item): reruns of the
+#   pipeline never alert twice for the same item
+# - coalescing: pending alerts of one recipient are folded into ONE digest
+#   once the oldest is DIGEST_WINDOW old, the digest is full, or an urgent
+#   (high severity / ceo_exit / mna) item arrives
+# - batched sends: up to SEND_BATCH digests per outbound HTTP request
+# - retries with exponential backoff + jitter; dead after MAX_ATTEMPTS
+# - backpressure: 429/503 (Retry-After) or slow responses pause sending and
+#   widen the coalescing window; above MAX_PENDING non-urgent alerts are shed
+# - stats(): queue depth, sent/dead/retry counts and delivery latency
+#   p50/p95 (last STATS_HOURS) read from the database → the same from any
+#   process (`python delivery.py stats`); shed/duplicate/throttled only
+#   exist in the process that saw them ("this_process")
+# - the worker purges finished digests after DELIVERY_KEEP_DAYS; never
+#   below LOOKBACK_DAYS + 1, since the alerts rows are the per-item dedup
+#   and a re-fetched item may come back for the whole lookback
+# - without DELIVERY_URL each digest is routed by its recipient's channel
+#   ({"slack": url} / {"webhook": url} / {"email": addr}); digests with no
+#   usable channel are dead-lettered at once instead of retried
+#
+#   python delivery.py stub --port 8010 --fail-rate 0.2 --latency 0.3
+#   python delivery.py worker --url http://localhost:8010/deliver
+#   python delivery.py stats
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+import httpx
+
+DELIVERY_DB    = Path(os.getenv("DELIVERY_DB", "out/delivery.db"))
+DELIVERY_URL   = os.getenv("DELIVERY_URL", "")              # HTTP digest endpoint
+SLACK_WEBHOOK  = os.getenv("SLACK_WEBHOOK_URL", "")       # only for channels with {"slack": true}
+SMTP_HOST      = os.getenv("SMTP_HOST", "")
+SMTP_PORT      = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER      = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD  = os.getenv("SMTP_PASSWORD", "")
+SMTP_FROM      = os.getenv("SMTP_FROM", SMTP_USER)
+SMTP_STARTTLS  = os.getenv("SMTP_STARTTLS", "1") == "1"
+DIGEST_WINDOW  = float(os.getenv("DIGEST_WINDOW", "60"))    # seconds
+MAX_WINDOW     = float(os.getenv("DIGEST_MAX_WINDOW", "600"))
+DIGEST_MAX     = int(os.getenv("DIGEST_MAX_ITEMS", "20"))
+SEND_BATCH     = int(os.getenv("SEND_BATCH", "25"))         # digests per outbound request
+MAX_ATTEMPTS   = 8
+BACKOFF_BASE   = 2.0
+BACKOFF_MAX    = 300.0
+MAX_PENDING    = int(os.getenv("DELIVERY_MAX_PENDING", "20000"))
+SLOW_SECS      = 2.0                                        # response slower than this = pressure
+URGENT_EVENTS  = {"ceo_exit", "mna"}
+LOOKBACK_DAYS  = int(os.getenv("LOOKBACK_DAYS", "7"))         # pipeline lookback (connectors.py)
+KEEP_DAYS      = float(os.getenv("DELIVERY_KEEP_DAYS", str(LOOKBACK_DAYS + 7)))
+STATS_HOURS    = 24.0                                       # latency percentiles over this window
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    recipient    TEXT NOT NULL,
+    item_id      TEXT NOT NULL,
+    channel      TEXT,           -- JSON
+    payload      TEXT NOT NULL,  -- JSON
+    urgent       INTEGER NOT NULL DEFAULT 0,
+    enqueued_at  REAL NOT NULL,
+    digest_id    INTEGER,
+    PRIMARY KEY (recipient, item_id)
+);
+CREATE INDEX IF NOT EXISTS ix_alerts_open ON alerts(digest_id, recipient, enqueued_at);
+CREATE TABLE IF NOT EXISTS digests (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient    TEXT NOT NULL,
+    channel      TEXT,
+    n_items      INTEGER NOT NULL,
+    created_at   REAL NOT NULL,
+    first_enqueued_at REAL NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'ready',   -- ready | sent | dead
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    sent_at      REAL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_digests_due ON digests(status, next_attempt_at);
+"""
+
+
+class Throttled(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"throttled for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Undeliverable(Exception):
+    """Digest has no usable channel → dead-lettered, never retried."""
+
+
+# -------------------- senders --------------------
+
+class HttpSender:
+    """POST {"digests": [...]} (up to SEND_BATCH per request) to a digest endpoint."""
+    batch_size = SEND_BATCH
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.client = httpx.Client(timeout=timeout)
+
+    def send(self, digests: List[Dict[str, Any]]) -> None:
+        r = self.client.post(self.url, json={"digests": digests})
+        if r.status_code in (429, 503):
+            raise Throttled(float(r.headers.get("Retry-After") or 5))
+        r.raise_for_status()
+
+
+def _digest_lines(d: Dict[str, Any]) -> List[str]:
+    return [f"{len(d['items'])} neue Meldung(en)"] + [
+        f"• [{it.get('severity', 'low')}] {it.get('title', '')} — {it.get('url', '')}" for it in d["items"]]
+
+
+class SlackSender:
+    """Incoming-webhook Slack: one message per digest, to the recipient's own webhook."""
+    batch_size = 1
+
+    def __init__(self, timeout: float = 10.0):
+        self.client = httpx.Client(timeout=timeout)
+
+    @staticmethod
+    def url_for(channel: Dict[str, Any]) -> str:
+        url = channel.get("slack")
+        return SLACK_WEBHOOK if url is True else (url or "")
+
+    def send(self, digests: List[Dict[str, Any]]) -> None:
+        for d in digests:
+            url = self.url_for(d["channel"])
+            if not url:
+                raise Undeliverable(f"no slack webhook for {d['recipient']}")
+            lines = [f"*{len(d['items'])} neue Meldung(en)*"] + [
+                f"• [{it.get('severity', 'low')}] <{it.get('url', '')}|{it.get('title', '')}>" for it in d["items"]]
+            r = self.client.post(url, json={"text": "\n".join(lines)})
+            if r.status_code == 429:
+                raise Throttled(float(r.headers.get("Retry-After") or 5))
+            r.raise_for_status()
+
+
+class EmailSender:
+    """Plain-text digest mail via SMTP_* (one message per digest)."""
+    batch_size = 1
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+
+    def send(self, digests: List[Dict[str, Any]]) -> None:
+        if not SMTP_HOST:
+            raise Undeliverable("SMTP_HOST not configured")
+        with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=self.timeout) as s:
+            if SMTP_STARTTLS:
+                s.starttls()
+            if SMTP_USER:
+                s.login(SMTP_USER, SMTP_PASSWORD)
+            for d in digests:
+                msg = EmailMessage()
+                msg["From"], msg["To"] = SMTP_FROM, d["channel"]["email"]
+                msg["Subject"] = f"{len(d['items'])} neue Meldung(en)"
+                msg.set_content("\n".join(_digest_lines(d)))
+                try:
+                    s.send_message(msg)
+                except smtplib.SMTPRecipientsRefused as e:
+                    raise Undeliverable(f"recipient refused: {e}")
+
+
+class ChannelSender:
+    """Route each digest by its recipient's channel: slack → webhook → email."""
+    batch_size = 1
+
+    def __init__(self, timeout: float = 10.0):
+        self.slack = SlackSender(timeout)
+        self.email = EmailSender(timeout)
+        self.client = self.slack.client
+
+    def send(self, digests: List[Dict[str, Any]]) -> None:
+        for d in digests:
+            ch = d["channel"]
+            if SlackSender.url_for(ch):
+                self.slack.send([d])
+            elif ch.get("webhook"):
+                r = self.client.post(ch["webhook"], json={"digests": [d]})
+                if r.status_code in (429, 503):
+                    raise Throttled(float(r.headers.get("Retry-After") or 5))
+                r.raise_for_status()
+            elif ch.get("email"):
+                self.email.send([d])
+            else:
+                raise Undeliverable(f"no usable channel for {d['recipient']}: {sorted(ch) or 'none'}")
+
+
+def default_sender():
+    """Central digest endpoint if configured (it routes itself), else per-recipient channels."""
+    if DELIVERY_URL:
+        return HttpSender(DELIVERY_URL)
+    return ChannelSender()
+
+
+# -------------------- queue --------------------
+
+class DeliveryQueue:
+    def __init__(self, path: Path | str = DELIVERY_DB, *, window: float = DIGEST_WINDOW):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self.base_window = window
+        self.window = window
+        self.paused_until = 0.0
+        self.counters = {"enqueued": 0, "duplicate": 0, "shed": 0, "digests": 0,
+                         "sent": 0, "sent_items": 0, "retries": 0, "dead": 0, "throttled": 0}
+        with self._conn() as c:
+            c.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            c.row_factory = sqlite3.Row
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+    # ---- producer ----
+    def enqueue(self, recipient: str, entries: Iterable[Dict[str, Any]],
+                channel: Optional[Dict[str, Any]] = None) -> int:
+        """Queue alerts for one recipient; returns how many were new."""
+        now = time.time()
+        c = self._conn()
+        depth = c.execute("SELECT COUNT(*) FROM alerts WHERE digest_id IS NULL").fetchone()[0]
+        rows = []
+        for e in entries:
+            urgent = int(e.get("severity") == "high" or e.get("event_type") in URGENT_EVENTS)
+            if depth + len(rows) >= MAX_PENDING and not urgent:
+                self.counters["shed"] += 1   # backpressure: keep urgent alerts only
+                continue
+            rows.append((recipient, e["id"], json.dumps(channel or {}), json.dumps(e, ensure_ascii=False),
+                         urgent, now))
+        with c:
+            before = c.total_changes
+            c.executemany("INSERT OR IGNORE INTO alerts (recipient, item_id, channel, payload, urgent, enqueued_at) "
+                          "VALUES (?,?,?,?,?,?)", rows)
+            added = c.total_changes - before
+        self.counters["enqueued"] += added
+        self.counters["duplicate"] += len(rows) - added
+        return added
+
+    # ---- coalescing ----
+    def coalesce(self, now: Optional[float] = None, *, force: bool = False) -> int:
+        """Fold due pending alerts into per-recipient digests. Returns digests created."""
+        now = time.time() if now is None else now
+        c = self._conn()
+        due = c.execute("""
+            SELECT recipient, MIN(enqueued_at) AS first, COUNT(*) AS n, MAX(urgent) AS urgent, MAX(channel) AS channel
+            FROM alerts WHERE digest_id IS NULL GROUP BY recipient
+        """).fetchall()
+        made = 0
+        with c:
+            for r in due:
+                if not (force or r["urgent"] or r["n"] >= DIGEST_MAX or now - r["first"] >= self.window):
+                    continue
+                ids = [x[0] for x in c.execute(
+                    "SELECT item_id FROM alerts WHERE digest_id IS NULL AND recipient = ? "
+                    "ORDER BY urgent DESC, enqueued_at LIMIT ?", (r["recipient"], DIGEST_MAX))]
+                cur = c.execute(
+                    "INSERT INTO digests (recipient, channel, n_items, created_at, first_enqueued_at, next_attempt_at) "
+                    "VALUES (?,?,?,?,?,?)", (r["recipient"], r["channel"], len(ids), now, r["first"], now))
+                c.executemany("UPDATE alerts SET digest_id = ? WHERE recipient = ? AND item_id = ?",
+                              [(cur.lastrowid, r["recipient"], i) for i in ids])
+                made += 1
+        self.counters["digests"] += made
+        return made
+
+    def _load_digests(self, ids: List[int]) -> List[Dict[str, Any]]:
+        c = self._conn()
+        out = []
+        for did in ids:
+            d = c.execute("SELECT * FROM digests WHERE id = ?", (did,)).fetchone()
+            items = [json.loads(x[0]) for x in c.execute(
+                "SELECT payload FROM alerts WHERE digest_id = ? ORDER BY urgent DESC, enqueued_at", (did,))]
+            out.append({"digest_id": did, "recipient": d["recipient"], "channel": json.loads(d["channel"] or "{}"),
+                        "items": items, "first_enqueued_at": d["first_enqueued_at"]})
+        return out
+
+    # ---- sending ----
+    def deliver_due(self, sender, now: Optional[float] = None) -> int:
+        """Send due digests in batches. Returns digests delivered."""
+        now = time.time() if now is None else now
+        if now < self.paused_until:
+            return 0
+        c = self._conn()
+        ids = [r[0] for r in c.execute(
+            "SELECT id FROM digests WHERE status = 'ready' AND next_attempt_at <= ? ORDER BY next_attempt_at, id",
+            (now,))]
+        delivered = 0
+        for i in range(0, len(ids), max(1, sender.batch_size)):
+            chunk = self._load_digests(ids[i:i + sender.batch_size])
+            t0 = time.time()
+            try:
+                sender.send(chunk)
+            except Throttled as e:
+                self._pressure(e.retry_after)
+                self.counters["throttled"] += 1
+                break
+            except Undeliverable as e:
+                self._failed([d["digest_id"] for d in chunk], str(e), final=True)
+                continue
+            except Exception as e:
+                self._failed([d["digest_id"] for d in chunk], str(e))
+                self._pressure(BACKOFF_BASE)
+                break   # honour the pause just set; remaining chunks go next tick
+            done = time.time()
+            if done - t0 > SLOW_SECS:
+                self._pressure(0.0)
+            else:
+                self.window = max(self.base_window, self.window / 2)   # recover gradually
+            with c:
+                c.executemany("UPDATE digests SET status = 'sent', sent_at = ?, attempts = attempts + 1 WHERE id = ?",
+                              [(done, d["digest_id"]) for d in chunk])
+            for d in chunk:
+                self.counters["sent_items"] += len(d["items"])
+            self.counters["sent"] += len(chunk)
+            delivered += len(chunk)
+        return delivered
+
+    def _pressure(self, pause: float) -> None:
+        self.paused_until = max(self.paused_until, time.time() + pause)
+        self.window = min(MAX_WINDOW, max(self.window, 1.0) * 2)   # coalesce harder while downstream struggles
+
+    def _failed(self, ids: List[int], err: str, *, final: bool = False) -> None:
+        c = self._conn()
+        now = time.time()
+        with c:
+            for did in ids:
+                att = c.execute("SELECT attempts FROM digests WHERE id = ?", (did,)).fetchone()[0] + 1
+                if final or att >= MAX_ATTEMPTS:
+                    c.execute("UPDATE digests SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                              (att, err[:500], did))
+                    self.counters["dead"] += 1
+                else:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (att - 1)) * random.uniform(0.8, 1.2)
+                    c.execute("UPDATE digests SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                              (att, now + delay, err[:500], did))
+                    self.counters["retries"] += 1
+
+    def run_once(self, sender, now: Optional[float] = None) -> Tuple[int, int]:
+        return self.coalesce(now), self.deliver_due(sender, now)
+
+    def run_forever(self, sender, poll: float = 1.0, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.run_once(sender)
+            stop.wait(poll)
+
+    def purge(self, older_than_days: float = KEEP_DAYS) -> None:
+        """Drop sent/dead digests and their alerts; kept past the lookback (dedup)."""
+        cut = time.time() - max(older_than_days, LOOKBACK_DAYS + 1) * 86400
+        c = self._conn()
+        with c:
+            c.execute("DELETE FROM alerts WHERE digest_id IN (SELECT id FROM digests WHERE status != 'ready' "
+                      "AND created_at < ?)", (cut,))
+            c.execute("DELETE FROM digests WHERE status != 'ready' AND created_at < ?", (cut,))
+
+    def stats(self) -> Dict[str, Any]:
+        c = self._conn()
+        depth = dict(c.execute("SELECT status, COUNT(*) FROM digests GROUP BY status").fetchall())
+        sent_items, retries = c.execute(
+            "SELECT COALESCE(SUM(CASE WHEN status = 'sent' THEN n_items END), 0), "
+            "COALESCE(SUM(MAX(attempts - (status = 'sent'), 0)), 0) FROM digests").fetchone()
+        since = time.time() - STATS_HOURS * 3600
+        n = c.execute("SELECT COUNT(*) FROM digests WHERE status = 'sent' AND sent_at >= ?", (since,)).fetchone()[0]
+
+        def pct(p: float) -> Optional[float]:
+            if not n:
+                return None
+            r = c.execute("SELECT sent_at - first_enqueued_at AS lat FROM digests WHERE status = 'sent' "
+                          "AND sent_at >= ? ORDER BY lat LIMIT 1 OFFSET ?", (since, min(n - 1, int(p * n)))).fetchone()
+            return round(r[0], 3)
+
+        return {
+            "pending_alerts": c.execute("SELECT COUNT(*) FROM alerts WHERE digest_id IS NULL").fetchone()[0],
+            "ready_digests": depth.get("ready", 0), "sent_digests": depth.get("sent", 0),
+            "dead_digests": depth.get("dead", 0), "sent_items": sent_items, "failed_attempts": retries,
+            "latency_p50_s": pct(0.50), "latency_p95_s": pct(0.95), "latency_n": n,
+            "window_s": self.window, "paused_for_s": round(max(0.0, self.paused_until - time.time()), 1),
+            "this_process": dict(self.counters),
+        }
+
+
+_default: Optional[DeliveryQueue] = None
+
+
+def get_queue() -> DeliveryQueue:
+    global _default
+    if _default is None:
+        _default = DeliveryQueue()
+    return _default
+
+
+# -------------------- local stub endpoint --------------------
+
+def serve_stub(port: int = 8010, *, fail_rate: float = 0.0, latency: float = 0.0, throttle_every: int = 0) -> None:
+    """Fake digest receiver: random 500s, artificial latency, periodic 429s."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    seen = {"requests": 0, "digests": 0, "items": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            seen["requests"] += 1
+            time.sleep(latency)
+            if throttle_every and seen["requests"] % throttle_every == 0:
+                self.send_response(429); self.send_header("Retry-After", "2"); self.end_headers()
+                return
+            if random.random() < fail_rate:
+                self.send_error(500)
+                return
+            ds = body.get("digests", [])
+            seen["digests"] += len(ds)
+            seen["items"] += sum(len(d.get("items", [])) for d in ds)
+            print(f"[stub] {seen}", flush=True)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    print(f"[stub] listening on http://localhost:{port}/deliver")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Alert delivery queue.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    wp = sub.add_parser("worker")
+    wp.add_argument("--url", default=DELIVERY_URL)
+    wp.add_argument("--poll", type=float, default=1.0)
+    sp = sub.add_parser("stub")
+    sp.add_argument("--port", type=int, default=8010)
+    sp.add_argument("--fail-rate", type=float, default=0.0)
+    sp.add_argument("--latency", type=float, default=0.0)
+    sp.add_argument("--throttle-every", type=int, default=0)
+    sub.add_parser("stats")
+    a = ap.parse_args()
+
+    if a.cmd == "stub":
+        serve_stub(a.port, fail_rate=a.fail_rate, latency=a.latency, throttle_every=a.throttle_every)
+    elif a.cmd == "stats":
+        print(json.dumps(get_queue().stats(), indent=2))
+    else:
+        snd = HttpSender(a.url) if a.url else default_sender()
+        q = get_queue()
+        last = purged = 0.0
+        while True:
+            q.run_once(snd)
+            if time.time() - last > 30:
+                print(f"[delivery] {q.stats()}", flush=True)
+                last = time.time()
+            if time.time() - purged > 3600:
+                q.purge()
+                purged = time.time()
+            time.sleep(a.poll)
@@ -0,0 +1,452 @@
+# edgar.py
+# ---------------------------------------------------------------------
+# SEC EDGAR filings incl. the primary document (not just the Atom line):
+#
+#   Atom "getcurrent" feed → filing index (…-index.htm) → primary document
+#   → text → Item sections ("Item 5.02 …") + key numbers ($, %, per share)
+#
+# - SEC fair-access rules: ≤ EDGAR_RPS requests/s (capped at 10) across
+#   all worker threads, declared User-Agent with contact (SEC_USER_AGENT),
+#   one pooled httpx.Client (keep-alive) per crawl
+# - the primary document is parsed while it streams in and cut off at
+#   EDGAR_DOC_MAX_BYTES (10-K bodies can be tens of MB)
+# - parsed filings are cached on disk by accession number
+#   (out/edgar/cache/0001048911-24-000012.json) → a filing is downloaded
+#   once, later runs only pay for the Atom feeds
+# - Atom feeds are parsed while streaming (feeds.py) and the read stops at
+#   the lookback cutoff / per-feed high-water mark (FEED_HWM=1); the mark
+#   never passes a filing skipped by the budget or whose fetch failed
+# - EDGAR_MODE=watchlist (default): only filers listed under "ciks" in
+#   data/watchlist.json. Small watchlists poll the per-CIK company feeds;
+#   large ones filter the global feeds against a CIK set while parsing.
+#   Either way, other filers never reach the index/document fetch, and
+#   tickers come straight from data/company_tickers.json (CIK → ticker)
+# - no pipeline imports: pipeline.fetch_edgar() maps Items → event/urgency
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Any, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+
+from feeds import parse_entries, FeedTruncated, HighWaterMarks, FEED_HWM
+from snapshots import atomic_write_json
+
+SEC_BASE            = "https://www.sec.gov"
+SEC_USER_AGENT      = os.getenv("SEC_USER_AGENT", "MarketNewsMonitor/1.0 (contact: youremail@example.com)")
+EDGAR_RPS           = min(10.0, float(os.getenv("EDGAR_RPS", "10")))       # SEC limit: 10 req/s
+EDGAR_WORKERS       = int(os.getenv("EDGAR_WORKERS", "4"))
+EDGAR_MAX_FILINGS   = int(os.getenv("EDGAR_MAX_FILINGS", "300"))           # per crawl (uncached ones)
+EDGAR_DOC_MAX_BYTES = int(os.getenv("EDGAR_DOC_MAX_BYTES", str(2_000_000)))
+EDGAR_ITEM_CHARS    = int(os.getenv("EDGAR_ITEM_CHARS", "4000"))           # text kept per Item
+EDGAR_CACHE_DIR     = Path(os.getenv("EDGAR_CACHE_DIR", "out/edgar/cache"))
+EDGAR_MODE          = os.getenv("EDGAR_MODE", "watchlist")                  # watchlist | global
+EDGAR_CIK_POLL_MAX  = int(os.getenv("EDGAR_CIK_POLL_MAX", "25"))           # above: filter global feeds
+EDGAR_LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "7"))                 # company feeds list history
+EDGAR_FORMS         = ("8-K", "10-Q", "10-K")
+WATCHLIST_PATH      = Path(os.getenv("EDGAR_WATCHLIST_PATH", "data/watchlist.json"))
+CIK_MAP_PATH        = Path(os.getenv("CIK_MAP_PATH", "data/company_tickers.json"))
+TIMEOUT             = 20.0
+
+_ACCESSION   = re.compile(r"(\d{10}-\d{2}-\d{6})")
+_CIK_IN_PATH = re.compile(r"/edgar/data/(\d+)/")
+_CIK_IN_TEXT = re.compile(r"\((\d{6,10})\)")
+_ITEM_HEAD   = re.compile(r"^\s*item\s+(\d{1,2}\.\d{2}|\d{1,2}[a-c]?)\b[.:\s]*(.*)$", re.IGNORECASE | re.MULTILINE)
+_MONEY       = re.compile(r"\$\s?\d[\d,]*(?:\.\d+)?(?:\s*(?:million|billion|thousand|mn|bn)\b)?", re.IGNORECASE)
+_PER_SHARE   = re.compile(r"\$\s?\d+\.\d{2}\s+per\s+(?:diluted\s+|basic\s+)?share", re.IGNORECASE)
+_PERCENT     = re.compile(r"\d+(?:\.\d+)?\s?(?:%|percent\b)", re.IGNORECASE)
+
+_BLOCK_TAGS = {"p", "div", "br", "tr", "li", "table", "h1", "h2", "h3", "h4", "h5", "h6", "title"}
+_SKIP_TAGS  = {"script", "style", "ix:header"}   # ix:header = hidden inline-XBRL facts
+
+
+class RateLimiter:
+    """Spaces calls ≥ 1/rate apart across threads."""
+
+    def __init__(self, rate: float = EDGAR_RPS):
+        self.interval = 1.0 / max(rate, 0.1)
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# -------------------- HTML → text (incremental) --------------------
+
+class _TextExtractor(HTMLParser):
+    """Fed chunk by chunk while the document downloads; block tags → newlines."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(l.split()) for l in "".join(self.parts).splitlines())
+        return "\n".join(l for l in lines if l)
+
+
+class _IndexParser(HTMLParser):
+    """Rows of the 'Document Format Files' table: (description, href, type)."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[Tuple[str, str, str]] = []
+        self._in_table = False
+        self._cells: List[str] | None = None
+        self._href = ""
+
+    def handle_starttag(self, tag, attrs):
+        a = dict(attrs)
+        if tag == "table" and "tableFile" in (a.get("class") or ""):
+            self._in_table = True
+        elif self._in_table and tag == "tr":
+            self._cells, self._href = [], ""
+        elif self._cells is not None and tag == "td":
+            self._cells.append("")
+        elif self._cells is not None and tag == "a" and not self._href:
+            self._href = a.get("href") or ""
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._in_table:
+            self._in_table = False
+        elif tag == "tr" and self._cells is not None:
+            c = [x.strip() for x in self._cells]
+            if len(c) >= 4 and self._href:
+                self.rows.append((c[1], self._href, c[3]))
+            self._cells = None
+
+    def handle_data(self, data):
+        if self._cells:
+            self._cells[-1] += data
+
+
+def parse_index(html: str, form: str) -> Optional[str]:
+    """Absolute URL of the filing's primary document (row whose Type is the form)."""
+    p = _IndexParser()
+    p.feed(html)
+    p.close()
+    base = form.upper().split("/")[0]
+    rows = [(d, h.replace("/ix?doc=", ""), t.upper()) for d, h, t in p.rows]
+    pick = next((h for _, h, t in rows if t.split("/")[0] == base), None) \
+        or next((h for _, h, _t in rows if h.lower().endswith((".htm", ".html", ".txt"))), None)
+    if not pick:
+        return None
+    return pick if pick.startswith("http") else SEC_BASE + pick
+
+
+# -------------------- Items + key numbers --------------------
+
+def parse_items(text: str) -> Dict[str, str]:
+    """Item code → section text ("5.02" → "Departure of Directors … text …")."""
+    heads = list(_ITEM_HEAD.finditer(text))
+    out: Dict[str, str] = {}
+    for i, m in enumerate(heads):
+        code = m.group(1).upper()
+        end = heads[i + 1].start() if i + 1 < len(heads) else len(text)
+        body = " ".join(text[m.start(2):end].split())
+        # tables of contents repeat the headings → keep the longest section per code
+        if len(body) > len(out.get(code, "")):
+            out[code] = body[:EDGAR_ITEM_CHARS]
+    return out
+
+
+def key_numbers(text: str, limit: int = 20) -> Dict[str, List[str]]:
+    def uniq(rx):
+        seen: Dict[str, None] = {}
+        for m in rx.finditer(text):
+            seen.setdefault(" ".join(m.group(0).split()), None)
+            if len(seen) >= limit:
+                break
+        return list(seen)
+    return {"per_share": uniq(_PER_SHARE), "amounts": uniq(_MONEY), "percents": uniq(_PERCENT)}
+
+
+# -------------------- Watchlist CIKs --------------------
+
+def norm_cik(cik: Any) -> str:
+    """'0001048911' / 1048911 → '1048911' (the form used as set/map key)."""
+    return str(cik).strip().lstrip("0") or "0"
+
+
+def load_cik_map(path: Path = CIK_MAP_PATH) -> Dict[str, str]:
+    """CIK → ticker from company_tickers.json ({"1048911": "FDX"} or SEC's
+    {"0": {"cik_str": …, "ticker": …}} layout)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    out: Dict[str, str] = {}
+    for k, v in data.items():
+        if isinstance(v, dict):
+            if v.get("cik_str") is not None and v.get("ticker"):
+                out[norm_cik(v["cik_str"])] = str(v["ticker"]).upper()
+        elif v:
+            out[norm_cik(k)] = str(v).upper()
+    return out
+
+
+def load_watchlist_ciks(path: Path = WATCHLIST_PATH) -> FrozenSet[str]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return frozenset()
+    return frozenset(norm_cik(c) for c in data.get("ciks") or () if str(c).strip())
+
+
+def company_feed_url(cik: str, form: str, count: int = 20) -> str:
+    return (f"{SEC_BASE}/cgi-bin/browse-edgar?action=getcompany&CIK={cik.zfill(10)}"
+            f"&type={form}&dateb=&owner=include&count={count}&output=atom")
+
+
+def watchlist_sources(global_feeds: Iterable[str], forms: Iterable[str] = EDGAR_FORMS,
+                      mode: str = EDGAR_MODE) -> Tuple[List[str], Optional[FrozenSet[str]]]:
+    """(feed urls, CIK filter or None) for the configured EDGAR_MODE."""
+    if mode != "watchlist":
+        return list(global_feeds), None
+    ciks = load_watchlist_ciks()
+    if not ciks:
+        print(f"[edgar] [warn] EDGAR_MODE=watchlist but no ciks in {WATCHLIST_PATH} → global feeds", flush=True)
+        return list(global_feeds), None
+    if len(ciks) <= EDGAR_CIK_POLL_MAX:
+        return [company_feed_url(c, f) for c in sorted(ciks, key=int) for f in forms], ciks
+    return list(global_feeds), ciks
+
+
+# -------------------- Crawler --------------------
+
+def cache_path(accession: str) -> Path:
+    return EDGAR_CACHE_DIR / f"{accession}.json"
+
+
+def load_cached(accession: str) -> Optional[Dict[str, Any]]:
+    p = cache_path(accession)
+    try:
+        return json.loads(p.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class EdgarClient:
+    def __init__(self, rate: float = EDGAR_RPS, user_agent: str = SEC_USER_AGENT):
+        self.limiter = RateLimiter(rate)
+        self.http = httpx.Client(
+            timeout=TIMEOUT, follow_redirects=True,
+            headers={"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"},
+            limits=httpx.Limits(max_connections=EDGAR_WORKERS + 1, max_keepalive_connections=EDGAR_WORKERS + 1),
+        )
+        self.stats = {"requests": 0, "cached": 0, "fetched": 0, "errors": 0, "throttled": 0}
+        self.truncated: set = set()   # feed urls whose XML broke off this crawl → marks stay put
+
+    def close(self) -> None:
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url: str) -> httpx.Response:
+        for attempt in range(3):
+            self.limiter.wait()
+            self.stats["requests"] += 1
+            r = self.http.get(url)
+            if r.status_code not in (429, 503):
+                r.raise_for_status()
+                return r
+            self.stats["throttled"] += 1
+            time.sleep(float(r.headers.get("Retry-After") or 2 ** (attempt + 1)))
+        r.raise_for_status()
+        return r
+
+    def stream_text(self, url: str, max_bytes: int = EDGAR_DOC_MAX_BYTES) -> str:
+        """Download + parse incrementally; stops reading after max_bytes."""
+        self.limiter.wait()
+        self.stats["requests"] += 1
+        p, n = _TextExtractor(), 0
+        with self.http.stream("GET", url) as r:
+            r.raise_for_status()
+            for chunk in r.iter_text():
+                p.feed(chunk)
+                n += len(chunk)
+                if n >= max_bytes:
+                    break
+        p.close()
+        return p.text()
+
+    # ---- feed ----
+    def feed_entries(self, url: str, since: float | None = None) -> Iterator[Dict[str, Any]]:
+        """Atom entries while the feed downloads; stops at `since`."""
+        for attempt in range(3):
+            self.limiter.wait()
+            self.stats["requests"] += 1
+            with self.http.stream("GET", url) as r:
+                if r.status_code in (429, 503):
+                    self.stats["throttled"] += 1
+                    time.sleep(float(r.headers.get("Retry-After") or 2 ** (attempt + 1)))
+                    continue
+                r.raise_for_status()
+                yield from parse_entries(r.iter_bytes(), since)
+                return
+        raise RuntimeError(f"throttled by SEC: {url}")
+
+    def current_filings(self, feed_url: str, ciks: Optional[FrozenSet[str]] = None,
+                        since: float | None = None) -> List[Dict[str, Any]]:
+        """Atom entries → filing stubs (accession, cik, form, title, summary, link, filed);
+        with `ciks`, entries of other filers are dropped right here. A feed cut off
+        mid-stream returns the entries read so far and lands in self.truncated."""
+        out, entries = [], []
+        try:
+            entries.extend(self.feed_entries(feed_url, since))
+        except FeedTruncated as ex:
+            self.truncated.add(feed_url)
+            self.stats["errors"] += 1
+            print(f"[edgar] feed cut off after {len(entries)} entries {feed_url}: {ex}", flush=True)
+        for e in entries:
+            link = e["link"]
+            path_cik = _CIK_IN_PATH.search(link)
+            entry_ciks = {norm_cik(c) for c in _CIK_IN_TEXT.findall(e["title"])}
+            if path_cik:
+                entry_ciks.add(norm_cik(path_cik.group(1)))
+            if ciks is not None:
+                entry_ciks &= ciks
+                if not entry_ciks:
+                    continue
+            m = _ACCESSION.search(link) or _ACCESSION.search(e["id"])
+            if not m:
+                continue
+            filed = e["published"] or datetime.now(timezone.utc)
+            out.append({
+                "accession": m.group(1),
+                "cik": min(entry_ciks, key=int) if entry_ciks else "",
+                "form": (e["category"] or e["title"].split(" - ")[0]).strip(),
+                "title": e["title"] or "SEC Filing",
+                "summary": e["summary"],
+                "link": link,
+                "filed": filed.isoformat(),
+            })
+        return out
+
+    # ---- one filing ----
+    def filing(self, stub: Dict[str, Any]) -> Dict[str, Any]:
+        """stub + primary_url/items/numbers/text; from cache when present."""
+        acc = stub["accession"]
+        cached = load_cached(acc)
+        if cached is not None:
+            self.stats["cached"] += 1
+            return {**stub, **cached}
+        index_url = stub["link"] if stub["link"].endswith("-index.htm") else (
+            f"{SEC_BASE}/Archives/edgar/data/{stub['cik']}/{acc.replace('-', '')}/{acc}-index.htm")
+        primary = parse_index(self.get(index_url).text, stub["form"])
+        text = self.stream_text(primary) if primary else ""
+        doc = {
+            "accession": acc,
+            "form": stub["form"],
+            "cik": stub["cik"],
+            "primary_url": primary,
+            "items": parse_items(text),
+            "numbers": key_numbers(text),
+            "text": text[:EDGAR_ITEM_CHARS],
+        }
+        atomic_write_json(cache_path(acc), doc)
+        self.stats["fetched"] += 1
+        return {**stub, **doc}
+
+
+def fetch_filings(feed_urls: List[str], *, ciks: Optional[FrozenSet[str]] = None,
+                  max_filings: int = EDGAR_MAX_FILINGS, workers: int = EDGAR_WORKERS,
+                  rate: float = EDGAR_RPS, lookback_days: int = EDGAR_LOOKBACK_DAYS) -> List[Dict[str, Any]]:
+    """All current filings of the given Atom feeds (only `ciks` filers if given), each
+    with its parsed primary document and CIK-mapped tickers.
+    Filings whose document fetch fails are returned as stubs (Atom data only)."""
+    cik_map = load_cik_map()
+    cutoff = datetime.now(timezone.utc).timestamp() - lookback_days * 86400
+    hwm = HighWaterMarks() if FEED_HWM else None
+    with EdgarClient(min(rate, EDGAR_RPS)) as ec:
+        stubs: Dict[str, Dict[str, Any]] = {}
+        seen: Dict[str, List[Tuple[str, float]]] = {}   # feed url → (accession, filed ts); complete feeds only
+        for url in feed_urls:
+            since = max(cutoff, hwm.get(url) or 0.0) if hwm else cutoff
+            try:
+                rows = ec.current_filings(url, ciks, since)
+                if url not in ec.truncated:   # cut-off feed: keep its filings, not its mark
+                    seen[url] = [(s["accession"], datetime.fromisoformat(s["filed"]).timestamp()) for s in rows]
+                for s in rows:
+                    tick = cik_map.get(s["cik"])
+                    s["tickers"] = [tick] if tick else []
+                    if "(" not in s["title"]:   # company feeds: "8-K - Current report"
+                        s["title"] = f"{s['form']} - {tick or 'CIK ' + s['cik']} ({s['cik'].zfill(10)}) (Filer)"
+                    stubs.setdefault(s["accession"], s)
+            except Exception as e:
+                ec.stats["errors"] += 1
+                print(f"[edgar] feed failed {url}: {e}", flush=True)
+
+        todo = [s for s in stubs.values() if not cache_path(s["accession"]).exists()][:max_filings]
+        todo_ids = {s["accession"] for s in todo}
+
+        def one(stub):
+            if stub["accession"] not in todo_ids and not cache_path(stub["accession"]).exists():
+                return stub   # over the per-crawl budget → next run
+            try:
+                return ec.filing(stub)
+            except Exception as e:
+                ec.stats["errors"] += 1
+                print(f"[edgar] {stub['accession']} failed: {e}", flush=True)
+                return stub
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            out = list(pool.map(one, stubs.values()))
+        if hwm:
+            # only advance past documents we actually have: a filing over the budget or
+            # whose fetch failed pins its feed's mark so the next crawl sees it again
+            done = {f["accession"] for f in out if "primary_url" in f}
+            for url, rows in seen.items():
+                pending = [ts for acc, ts in rows if acc not in done]
+                hwm.update(url, min(pending) if pending else max((ts for _, ts in rows), default=None))
+            hwm.save()
+        print(f"[edgar] filings={len(out)} stats={ec.stats}", flush=True)
+        return out
+
+
+if __name__ == "__main__":
+    import sys
+    urls, ciks = watchlist_sources(sys.argv[1:] or [
+        f"{SEC_BASE}/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=8-K&count=40&owner=exclude&output=atom"])
+    t0 = time.perf_counter()
+    fs = fetch_filings(urls, ciks=ciks)
+    for f in fs[:10]:
+        print(f["accession"], f["form"], f["tickers"], sorted(f.get("items") or {}),
+              (f.get("numbers") or {}).get("amounts", [])[:3])
+    print(f"{len(fs)} filings in {time.perf_counter() - t0:.1f}s")
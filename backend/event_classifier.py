@@ -0,0 +1,120 @@
+# event_classifier.py
+# ---------------------------------------------------------------------
+# Local, CPU-only event_type pre-classifier (routing tier before watsonx).
+# - Hashed word uni/bi-grams (no vocabulary to store or drift)
+# - Linear model (SGD log-loss) → calibrated-enough probabilities
+# - Trained from our labeled history: triage exports + LLM-confirmed labels
+# - Microseconds per item; only low-confidence items go to the LLM
+# ---------------------------------------------------------------------
+import os, joblib, numpy as np, pandas as pd
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import make_pipeline
+from prompts import EVENT_TYPES
+
+MODEL_PATH = Path("models/event_classifier.joblib")
+MODEL_PATH.parent.mkdir(exist_ok=True)
+
+LABELS_CSV   = "out/event_labels.csv"       # LLM-confirmed labels appended per run
+HISTORY_CSVS = ("out/triage.csv", LABELS_CSV)
+
+# Items at/above this probability skip the watsonx classify call
+LOCAL_CONF_MIN = float(os.getenv("LOCAL_CONF_MIN", "0.75"))
+MIN_CLASS_ROWS = 2   # drop classes with fewer examples (can't be learned)
+
+_model_cache: Dict[str, Any] = {}
+
+
+def _text(it: Dict[str, Any]) -> str:
+    return f"{it.get('headline') or ''} \n {(it.get('body_text') or '')[:1500]}"
+
+
+def _vectorizer() -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=2**16, ngram_range=(1, 2), alternate_sign=False,
+        lowercase=True, norm="l2",
+    )
+
+
+def load_history(paths=HISTORY_CSVS) -> pd.DataFrame:
+    """Concatenate all labeled rows we have (headline, body_text, event_type)."""
+    frames = []
+    for p in paths:
+        if os.path.exists(p):
+            df = pd.read_csv(p, usecols=lambda c: c in {"id", "headline", "body_text", "event_type"})
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["id", "headline", "body_text", "event_type"])
+    df = pd.concat(frames, ignore_index=True)
+    df = df.dropna(subset=["event_type"]).drop_duplicates(subset=["id"], keep="last")
+    return df.fillna("")
+
+
+def fit_from_history(paths=HISTORY_CSVS, out_path: str = str(MODEL_PATH)) -> dict:
+    df = load_history(paths)
+    counts = df["event_type"].value_counts()
+    df = df[df["event_type"].isin(counts[counts >= MIN_CLASS_ROWS].index)]
+    if df["event_type"].nunique() < 2:
+        raise ValueError("Need at least two event types with labeled rows to train.")
+
+    X = [_text(r) for r in df.to_dict("records")]
+    y = df["event_type"].astype(str).values
+    model = make_pipeline(
+        _vectorizer(),
+        SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, class_weight="balanced", random_state=42),
+    )
+    model.fit(X, y)
+    joblib.dump({"model": model, "classes": [str(c) for c in model.classes_], "n_rows": len(df)}, out_path)
+    _model_cache.pop(out_path, None)
+    return {"n_rows": int(len(df)), "classes": [str(c) for c in model.classes_], "path": out_path}
+
+
+def _load(model_path: str):
+    if model_path not in _model_cache:
+        if not os.path.exists(model_path):
+            return None
+        _model_cache[model_path] = joblib.load(model_path)
+    return _model_cache[model_path]
+
+
+def predict_events(items: List[Dict[str, Any]], model_path: str = str(MODEL_PATH)) -> Dict[str, Tuple[str, float]]:
+    """Return dict id -> (event_type, probability). If model missing, return {}."""
+    bundle = _load(model_path)
+    if bundle is None or not items:
+        return {}
+    model = bundle["model"]
+    proba = model.predict_proba([_text(it) for it in items])
+    best = proba.argmax(axis=1)
+    classes = np.asarray(model.classes_)
+    return {it["id"]: (str(classes[b]), float(proba[i, b])) for i, (it, b) in enumerate(zip(items, best))}
+
+
+def append_labeled_rows(items: List[Dict[str, Any]], csv_out: str = LABELS_CSV) -> int:
+    """Persist the LLM's own (non-fallback) event answers as future training rows.
+
+    Uses `_llm_event`, not `event_type`: the classify loop only fills gaps, so
+    `event_type` may still be a rule/local-model label the LLM never confirmed.
+    """
+    rows = [
+        {"id": it["id"], "headline": it.get("headline") or "", "body_text": (it.get("body_text") or "")[:1500],
+         "event_type": it.get("_llm_event")}
+        for it in items
+        if it.get("_classify_source") == "llm" and not it.get("_classify_fallback", True)
+        and it.get("_llm_event") in EVENT_TYPES
+    ]
+    if not rows:
+        return 0
+    df = pd.DataFrame(rows)
+    p = Path(csv_out)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    if p.exists():
+        old = pd.read_csv(p)
+        df = pd.concat([old, df], ignore_index=True).drop_duplicates(subset=["id"], keep="first")
+    df.to_csv(p, index=False)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    print(fit_from_history())
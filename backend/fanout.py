@@ -0,0 +1,198 @@
+# fanout.py
+# ---------------------------------------------------------------------
+# Multi-tenant watchlist fan-out: which subscribers care about an item?
+#
+# A subscription constrains any of: tickers, sectors, event_types,
+# severities, tags. Within a dimension values are OR'ed, across the
+# constrained dimensions AND'ed; an empty dimension is a wildcard
+# (same rule as the dashboard's priorities × tags check).
+#
+# Each subscription is indexed only under its most selective constrained
+# dimension (tickers → sectors → tags → event_types → severities): one
+# posting list per (dimension, value). match() unions the postings of the
+# item's own values and checks the remaining constraints of just those
+# candidates → cost ~ O(candidates), independent of the total number of
+# subscriptions.
+#
+# Also home of the house WATCHLIST shared by pipeline.py and ranker.py.
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Set, FrozenSet
+
+# House watchlist (override with WATCHLIST env var)
+WATCHLIST: FrozenSet[str] = frozenset(s.strip().upper() for s in os.getenv(
+    "WATCHLIST", "FDX,NVDA,INTC,CRWD,AMD,AAPL,MSFT,GOOGL,AMZN,TSLA"
+).split(",") if s.strip())
+
+SUBSCRIPTIONS_PATH = Path(os.getenv("SUBSCRIPTIONS_PATH", "data/subscriptions.json"))
+
+DIMENSIONS = ("tickers", "sectors", "tags", "event_types", "severities")  # most → least selective
+# dashboard priority labels → pipeline severities
+_PRIORITY_TO_SEV = {"Hoch": "high", "Mittel": "med", "Niedrig": "low"}
+
+
+def _norm(dim: str, v: Any) -> str:
+    s = str(v).strip()
+    return s.upper() if dim == "tickers" else s.lower()
+
+
+@dataclass
+class Subscription:
+    id: str
+    tickers: Set[str] = field(default_factory=set)
+    sectors: Set[str] = field(default_factory=set)
+    event_types: Set[str] = field(default_factory=set)
+    severities: Set[str] = field(default_factory=set)
+    tags: Set[str] = field(default_factory=set)
+    channel: Dict[str, Any] = field(default_factory=dict)   # e.g. {"email": …} / {"webhook": …}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Subscription":
+        sevs = {_PRIORITY_TO_SEV.get(p, p) for p in d.get("severities") or d.get("priorities") or []}
+        channel = dict(d.get("channel") or {})
+        if d.get("email"):
+            channel.setdefault("email", d["email"])
+        return cls(
+            id=str(d.get("id") or d.get("email")),
+            tickers=set(d.get("tickers") or ()), sectors=set(d.get("sectors") or ()),
+            event_types=set(d.get("event_types") or ()), severities=sevs,
+            tags=set(d.get("tags") or ()), channel=channel,
+        )
+
+    def constraints(self) -> Dict[str, Set[str]]:
+        out = {}
+        for dim in DIMENSIONS:
+            vals = {_norm(dim, v) for v in getattr(self, dim) if str(v).strip()}
+            if vals:
+                out[dim] = vals
+        return out
+
+
+def item_values(it: Any, tags: Iterable[str] | None = None) -> Dict[str, Set[str]]:
+    """The item's value per dimension (record or dict); `tags` defaults to it["tags"]."""
+    return {
+        "tickers": {_norm("tickers", t) for t in (it.get("tickers") or ()) if t},
+        "sectors": {_norm("sectors", s) for s in (it.get("sectors") or ()) if s},
+        "event_types": {_norm("event_types", it.get("event_type") or "other_events")},
+        "severities": {_norm("severities", it.get("severity") or "low")},
+        "tags": {_norm("tags", t) for t in (tags if tags is not None else it.get("tags") or ()) if t},
+    }
+
+
+class FanoutEngine:
+    def __init__(self, subs: Iterable[Subscription] = ()):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, Set[str]]] = {d: defaultdict(set) for d in DIMENSIONS}
+        self._cons: Dict[str, Dict[str, Set[str]]] = {}   # sub id → normalized constraints
+        self._match_all: Set[str] = set()    # subscriptions without any constraint
+        self.subs: Dict[str, Subscription] = {}
+        for s in subs:
+            self.add(s)
+
+    def __len__(self) -> int:
+        return len(self.subs)
+
+    def add(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub.id in self.subs:
+                self._remove(sub.id)
+            cons = sub.constraints()
+            self.subs[sub.id] = sub
+            self._cons[sub.id] = cons
+            if not cons:
+                self._match_all.add(sub.id)
+                return
+            anchor = next(d for d in DIMENSIONS if d in cons)
+            for v in cons[anchor]:
+                self._postings[anchor][v].add(sub.id)
+
+    def remove(self, sub_id: str) -> None:
+        with self._lock:
+            self._remove(sub_id)
+
+    def _remove(self, sub_id: str) -> None:
+        if self.subs.pop(sub_id, None) is None:
+            return
+        cons = self._cons.pop(sub_id)
+        self._match_all.discard(sub_id)
+        if not cons:
+            return
+        anchor = next(d for d in DIMENSIONS if d in cons)
+        for v in cons[anchor]:
+            p = self._postings[anchor].get(v)
+            if p is not None:
+                p.discard(sub_id)
+                if not p:
+                    del self._postings[anchor][v]
+
+    def match(self, it: Any, tags: Iterable[str] | None = None) -> Set[str]:
+        """Subscription ids interested in `it`."""
+        vals = item_values(it, tags)
+        cand: Set[str] = set()
+        for dim in DIMENSIONS:
+            postings = self._postings[dim]
+            for v in vals[dim]:
+                p = postings.get(v)
+                if p:
+                    cand |= p
+        cons = self._cons
+        out = {sid for sid in cand
+               if all(not vals[d].isdisjoint(c) for d, c in cons[sid].items())}
+        out |= self._match_all
+        return out
+
+    def fanout(self, items: Iterable[Any], tags_of=None) -> Dict[str, List[str]]:
+        """subscription id → ids of matching items (in item order); `tags_of(it)` supplies tags."""
+        out: Dict[str, List[str]] = defaultdict(list)
+        for it in items:
+            for sid in self.match(it, tags_of(it) if tags_of else None):
+                out[sid].append(it.get("id"))
+        return dict(out)
+
+
+def load_subscriptions(path: Path | str = SUBSCRIPTIONS_PATH) -> List[Subscription]:
+    """JSON list of subscriptions, or a dashboard db.json ({"subscriptions": [...]})."""
+    p = Path(path)
+    if not p.exists():
+        return []
+    data = json.loads(p.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("subscriptions") or []
+    return [Subscription.from_dict(d) for d in data]
+
+
+_engine: FanoutEngine | None = None
+
+
+def get_engine() -> FanoutEngine:
+    global _engine
+    if _engine is None:
+        _engine = FanoutEngine(load_subscriptions())
+    return _engine
+
+
+if __name__ == "__main__":
+    import random, time
+    rnd = random.Random(7)
+    universe = [f"T{i:04d}" for i in range(3000)]
+    events = ["ceo_exit", "mna", "earnings_surprise", "rating_change", "other_events"]
+    eng = FanoutEngine(
+        Subscription(id=f"c{i}", tickers=set(rnd.sample(universe, 40)),
+                     event_types=set(rnd.sample(events, 2)) if i % 3 else set(),
+                     severities={"high", "med"} if i % 2 else set())
+        for i in range(1000)
+    )
+    items = [{"id": str(i), "tickers": rnd.sample(universe, 2), "event_type": rnd.choice(events),
+              "severity": rnd.choice(["low", "med", "high"])} for i in range(5000)]
+    t0 = time.perf_counter()
+    res = eng.fanout(items)
+    dt = time.perf_counter() - t0
+    print(f"{len(eng)} subscriptions × {len(items)} items → {sum(map(len, res.values()))} notifications "
+          f"in {dt*1000:.1f} ms ({dt/len(items)*1e6:.1f} µs/item)")
@@ -0,0 +1,191 @@
+# feeds.py
+# ---------------------------------------------------------------------
+# Streaming Atom / RSS 2.0 reader (replaces feedparser.parse(r.text)).
+#
+# - XMLPullParser is fed the response bytes as they arrive; an entry is
+#   yielded as soon as its closing tag is parsed, then detached from the
+#   tree → memory stays flat regardless of feed size
+# - only the fields we use: title, link, summary, published(_ts), id,
+#   category
+# - `since` (epoch): stop reading once entries are older than the mark
+#   (feeds are newest-first; `stale_stop` consecutive old entries end
+#   the read and close the connection)
+# - malformed XML mid-feed (e.g. an undefined &nbsp; entity) raises
+#   FeedTruncated AFTER the entries parsed so far were yielded: callers
+#   keep that prefix but must not treat the feed as read to the end
+# - HighWaterMarks: newest published_ts seen per feed URL, persisted in
+#   out/feeds/hwm.json, for incremental polling (FEED_HWM=1)
+#
+#   python feeds.py     # feedparser vs. streaming on a synthetic feed
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, Optional
+from xml.etree.ElementTree import XMLPullParser, ParseError
+
+from snapshots import atomic_write_json
+
+FEED_HWM      = os.getenv("FEED_HWM", "0") == "1"
+FEED_HWM_PATH = Path(os.getenv("FEED_HWM_PATH", "out/feeds/hwm.json"))
+
+_ENTRY_TAGS = {"entry", "item"}   # Atom / RSS
+
+
+class FeedTruncated(Exception):
+    """Feed XML broke off mid-stream; the entries before the break were yielded."""
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag.split(":")[-1]
+
+
+def _parse_date(s: str | None) -> Optional[datetime]:
+    s = (s or "").strip()
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s.replace("Z", "+00:00"))   # Atom / dc:date
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(s)                        # RSS pubDate (RFC 822)
+        except (TypeError, ValueError):
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _entry(elem) -> Dict[str, Any]:
+    e: Dict[str, Any] = {"title": "", "link": "", "summary": "", "id": "", "category": ""}
+    date = None
+    for c in elem:
+        tag = _local(c.tag)
+        text = (c.text or "").strip()
+        if tag == "title":
+            e["title"] = text
+        elif tag == "link":
+            href = c.get("href")
+            if href is None:                        # RSS: <link>url</link>
+                e["link"] = e["link"] or text
+            elif c.get("rel", "alternate") == "alternate" and not e["link"]:
+                e["link"] = href
+        elif tag in ("summary", "description"):
+            e["summary"] = e["summary"] or text
+        elif tag in ("content", "encoded") and not e["summary"]:
+            e["summary"] = text
+        elif tag in ("id", "guid"):
+            e["id"] = text
+        elif tag == "category" and not e["category"]:
+            e["category"] = c.get("term") or text
+        elif tag in ("published", "pubDate", "updated", "date"):
+            # Atom: prefer updated (EDGAR), RSS: pubDate
+            if date is None or tag in ("updated", "pubDate"):
+                date = _parse_date(text) or date
+    e["published"] = date
+    e["published_ts"] = date.timestamp() if date else None
+    return e
+
+
+def parse_entries(chunks: Iterable[bytes], since: float | None = None,
+                  stale_stop: int = 3) -> Iterator[Dict[str, Any]]:
+    """Yield entries from Atom/RSS byte chunks; entries older than `since` are
+    skipped, and `stale_stop` of them in a row end the read."""
+    p = XMLPullParser(events=("start", "end"))
+    stack: list = []
+    stale = 0
+    try:
+        for chunk in chunks:
+            p.feed(chunk)
+            for ev, elem in p.read_events():
+                if ev == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if _local(elem.tag) not in _ENTRY_TAGS:
+                    continue
+                e = _entry(elem)
+                if stack:
+                    stack[-1].remove(elem)       # detach → constant memory
+                if since is not None and e["published_ts"] is not None and e["published_ts"] < since:
+                    stale += 1
+                    if stale >= stale_stop:
+                        return
+                    continue
+                stale = 0
+                yield e
+        p.close()
+    except ParseError as ex:
+        raise FeedTruncated(f"XML parse error: {ex}") from ex
+
+
+def stream_entries(client, url: str, since: float | None = None, **kw) -> Iterator[Dict[str, Any]]:
+    """GET `url` with an httpx.Client and parse while downloading (closes early at `since`)."""
+    with client.stream("GET", url) as r:
+        r.raise_for_status()
+        yield from parse_entries(r.iter_bytes(), since, **kw)
+
+
+class HighWaterMarks:
+    """Newest published_ts seen per feed (only advanced, persisted on save())."""
+
+    def __init__(self, path: Path = FEED_HWM_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self.marks: Dict[str, float] = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.marks = {}
+
+    def get(self, url: str) -> float | None:
+        return self.marks.get(url)
+
+    def update(self, url: str, ts: float | None) -> None:
+        if ts is None:
+            return
+        with self._lock:
+            if ts > self.marks.get(url, 0.0):
+                self.marks[url] = ts
+
+    def save(self) -> None:
+        with self._lock:
+            atomic_write_json(self.path, self.marks, indent=2)
+
+
+if __name__ == "__main__":
+    import time, tracemalloc
+    try:
+        import feedparser   # baseline only; no longer a runtime dependency
+    except ImportError:
+        feedparser = None
+
+    n = int(os.getenv("BENCH_ITEMS", "5000"))
+    now = time.time()
+    entries = "".join(
+        f"<entry><title>8-K - CO {i} (000{1000000 + i}) (Filer)</title>"
+        f"<link rel='alternate' type='text/html' href='https://www.sec.gov/Archives/edgar/data/{1000000 + i}/x/0001{i:06d}-24-000001-index.htm'/>"
+        f"<summary type='html'>&lt;b&gt;Filed:&lt;/b&gt; 2024-05-01 Item 2.02: Results of Operations</summary>"
+        f"<updated>{datetime.fromtimestamp(now - i * 60, timezone.utc).isoformat()}</updated>"
+        f"<category scheme='https://www.sec.gov/' label='form type' term='8-K'/><id>urn:tag:sec.gov:{i}</id></entry>"
+        for i in range(n))
+    data = f"<?xml version='1.0' encoding='ISO-8859-1'?><feed xmlns='http://www.w3.org/2005/Atom'>{entries}</feed>".encode("latin-1")
+    chunks = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+
+    def run(label, fn):
+        t0 = time.perf_counter()
+        k = fn()
+        dt = time.perf_counter() - t0
+        tracemalloc.start()   # separate pass: tracing slows both parsers down
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:>28}: {k:5d} entries  {dt*1000:7.1f} ms  peak {peak/1e6:6.1f} MB")
+
+    print(f"feed: {n} entries, {len(data)/1e6:.1f} MB")
+    if feedparser:
+        run("feedparser.parse(text)", lambda: len(feedparser.parse(data.decode("latin-1")).entries))
+    run("parse_entries (all)", lambda: sum(1 for _ in parse_entries(chunks)))
+    run("parse_entries (since 1h)", lambda: sum(1 for _ in parse_entries(chunks, since=now - 3600)))
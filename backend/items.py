@@ -0,0 +1,226 @@
+# items.py
+# ---------------------------------------------------------------------
+# Compact in-memory item record used inside pipeline.process().
+# - __slots__ instead of a per-item dict (≈ 5–8x smaller per item)
+# - enum-like fields (source, event_type, urgency, severity, …) interned,
+#   so thousands of items share one string object per value
+# - body_text can be parked zlib-compressed (compact()) once an item is
+#   past the stages that read it; it is inflated lazily on access
+# - dict-style access (it["x"], it.get, "x" in it, pop, …) still works,
+#   so helpers written for plain dicts keep working unchanged
+# - to_dict() at the output boundary (JSON, CSV, store, pandas)
+# - published_ts (epoch seconds) is set once at ingestion; _age_h is
+#   stamped once per run against a single run-level "now" (stamp_ages)
+#
+# Optional fields and "_" flags: None means "not set" (KeyError / get
+# default / not in to_dict), mirroring keys that were never assigned.
+# Unknown keys go to a small overflow dict.
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import sys
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+# always present (base_item shape, in output order)
+BASE_FIELDS = (
+    "id", "published_at", "source", "url", "headline", "body_text", "tickers", "entities",
+    "event_type", "asset_classes", "sectors", "regions", "confidence", "urgency",
+    "why_it_matters", "draft_note", "hash",
+)
+# set later in process(); None = absent
+OPTIONAL_FIELDS = (
+    "published_ts", "_age_h", "severity", "bullets", "headline_de", "draft_note_de", "label",
+    "_classified", "_summarized", "_pre_conf", "_ml_score", "_llm_conf", "_llm_event",
+    "_classify_fallback", "_classify_source", "_summary_fallback", "_headline_fallback",
+    "_bullets_fallback", "_why_fallback", "_analyze_fallback",
+    "_novelty", "_story_id", "_parent_id",
+)
+INTERNED = frozenset(("source", "event_type", "urgency", "severity", "_classify_source"))
+
+_SLOTS = tuple(f for f in BASE_FIELDS if f != "body_text") + OPTIONAL_FIELDS
+_BASE = frozenset(BASE_FIELDS)
+_OPTIONAL = frozenset(OPTIONAL_FIELDS)
+_BODY_COMPRESS_MIN = 256   # shorter bodies are not worth a zlib round-trip
+
+
+def _intern(v: Any) -> Any:
+    return sys.intern(v) if type(v) is str else v
+
+
+class ItemRecord:
+    __slots__ = _SLOTS + ("_body", "_more")
+
+    def __init__(self, id: str, published_at: str, source: str, url: str, headline: str,
+                 body_text: str = "", **fields: Any):
+        self.id = id
+        self.published_at = published_at
+        self.source = _intern(source)
+        self.url = url
+        self.headline = headline
+        self._body = body_text
+        self._more: Optional[Dict[str, Any]] = None
+        self.tickers = []
+        self.entities = []
+        self.event_type = None
+        self.asset_classes = []
+        self.sectors = []
+        self.regions = []
+        self.confidence = None
+        self.urgency = None
+        self.why_it_matters = None
+        self.draft_note = None
+        self.hash = id
+        for f in OPTIONAL_FIELDS:
+            object.__setattr__(self, f, None)
+        for k, v in fields.items():
+            self[k] = v
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "ItemRecord":
+        d = dict(d)
+        return cls(d.pop("id"), d.pop("published_at", None), d.pop("source", ""), d.pop("url", ""),
+                   d.pop("headline", ""), d.pop("body_text", "") or "", **d)
+
+    # ---- body (lazy) ----
+    @property
+    def body_text(self) -> str:
+        b = self._body
+        return zlib.decompress(b).decode("utf-8") if type(b) is bytes else b
+
+    @body_text.setter
+    def body_text(self, v: str | None) -> None:
+        self._body = v or ""
+
+    def compact(self) -> None:
+        """Park body_text compressed (call once no hot stage needs it any more)."""
+        b = self._body
+        if type(b) is str and len(b) >= _BODY_COMPRESS_MIN:
+            self._body = zlib.compress(b.encode("utf-8"), 1)
+
+    # ---- mapping protocol ----
+    def __getitem__(self, key: str) -> Any:
+        if key in _BASE:
+            return getattr(self, key)
+        if key in _OPTIONAL:
+            v = getattr(self, key)
+            if v is None:
+                raise KeyError(key)
+            return v
+        if self._more and key in self._more:
+            return self._more[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _BASE or key in _OPTIONAL:
+            setattr(self, key, _intern(value) if key in INTERNED else value)
+        else:
+            if self._more is None:
+                self._more = {}
+            self._more[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _BASE or key in _OPTIONAL:
+            setattr(self, key, "" if key == "body_text" else None)
+        elif self._more and key in self._more:
+            del self._more[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _BASE:
+            return True
+        if key in _OPTIONAL:
+            return getattr(self, key) is not None
+        return bool(self._more) and key in self._more
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _BASE:
+            return getattr(self, key)
+        if key in _OPTIONAL:
+            v = getattr(self, key)
+            return default if v is None else v
+        if self._more:
+            return self._more.get(key, default)
+        return default
+
+    def pop(self, key: str, *default: Any) -> Any:
+        try:
+            v = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return v
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, other: Mapping[str, Any] = (), **kw: Any) -> None:
+        for k, v in dict(other, **kw).items():
+            self[k] = v
+
+    def keys(self) -> Iterator[str]:
+        yield from BASE_FIELDS
+        for f in OPTIONAL_FIELDS:
+            if getattr(self, f) is not None:
+                yield f
+        if self._more:
+            yield from self._more
+
+    __iter__ = keys
+
+    def items(self):
+        for k in self.keys():
+            yield k, self[k]
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in self.items()}
+
+    def __repr__(self) -> str:
+        return f"ItemRecord(id={self.id!r}, source={self.source!r}, headline={self.headline[:60]!r})"
+
+    # slots without __dict__: pickle via explicit state (process pools, caches)
+    def __getstate__(self):
+        return tuple(getattr(self, s) for s in self.__slots__)
+
+    def __setstate__(self, state) -> None:
+        for s, v in zip(self.__slots__, state):
+            object.__setattr__(self, s, v)
+
+
+@lru_cache(maxsize=8192)
+def epoch_of(iso: str | None) -> Optional[float]:
+    """RFC3339 string → epoch seconds (None if unparseable). Memoized."""
+    try:
+        return datetime.fromisoformat((iso or "").replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def item_ts(it: Any) -> Optional[float]:
+    """Epoch of an item (record or dict): published_ts if present, else parsed once."""
+    ts = it.get("published_ts")
+    return ts if ts is not None else epoch_of(it.get("published_at"))
+
+
+def stamp_ages(items, now: float) -> None:
+    """Set _age_h (hours before the run-level `now`, >= 0) on every item."""
+    for it in items:
+        ts = it.published_ts
+        if ts is None:
+            ts = it.published_ts = epoch_of(it.published_at)
+        it._age_h = 0.0 if ts is None else max(0.0, (now - ts) / 3600.0)
+
+
+def as_dict(it: Any) -> Dict[str, Any]:
+    """Boundary helper: ItemRecord → plain dict, dicts pass through."""
+    return it.to_dict() if isinstance(it, ItemRecord) else it
@@ -0,0 +1,298 @@
+# novelty.py
+# ---------------------------------------------------------------------
+# Story linking + novelty score (is this new, or the tenth follow-up?).
+#
+# - embedding: hashed word uni/bi-grams of headline + lead (as in
+#   event_classifier.py), sublinear tf × idf from the index's own
+#   document frequencies (over the rows the index currently holds: each
+#   row keeps its n-gram ids, prune() takes them back out of df/n_docs),
+#   then a fixed-seed sparse random projection to
+#   NOVELTY_DIM dense dims (cosine ≈ preserved) → float32, L2-normed
+# - ANN: inverted index over each item's NOVELTY_TERMS highest-weighted
+#   n-grams (names, tickers, event words — what identifies a story).
+#   A query scores only items sharing one of its top terms; terms in
+#   more than NOVELTY_MAX_POSTING items are skipped (too common to
+#   identify anything) → well under a ms per query at tens of thousands
+#   of vectors. (Random-hyperplane LSH was tried: at the cosines real
+#   follow-ups have, 0.4–0.7, it either missed most of them or scanned
+#   most of the index.)
+# - link_stories(): items in published order; the nearest earlier item
+#   with cosine ≥ NOVELTY_LINK becomes the parent and the item joins its
+#   story; _novelty = 1 - best cosine (1.0 = nothing similar seen)
+# - the index keeps the last NOVELTY_DAYS days, persisted to
+#   out/novelty/index.npz between runs
+#
+#   python novelty.py     # build/query benchmark on synthetic stories
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.random_projection import SparseRandomProjection
+
+NOVELTY_PATH        = Path(os.getenv("NOVELTY_PATH", "out/novelty/index.npz"))
+NOVELTY_DAYS        = float(os.getenv("NOVELTY_DAYS", "7"))
+NOVELTY_LINK        = float(os.getenv("NOVELTY_LINK", "0.45"))     # cosine → same story
+NOVELTY_DIM         = int(os.getenv("NOVELTY_DIM", "256"))
+NOVELTY_TERMS       = int(os.getenv("NOVELTY_TERMS", "12"))        # indexed terms per item
+NOVELTY_MAX_POSTING = int(os.getenv("NOVELTY_MAX_POSTING", "1000"))
+
+_N_FEATURES = 2**18
+_LEAD_CHARS = 400
+_SEED = 20240501   # projection must be identical in every process
+
+
+def _text(it: Dict[str, Any]) -> str:
+    return f"{it.get('headline') or ''} \n {(it.get('body_text') or '')[:_LEAD_CHARS]}"
+
+
+class StoryIndex:
+    """Vectors of recent items + term postings; rows are (id, ts, story, parent, novelty)."""
+
+    def __init__(self, dim: int = NOVELTY_DIM, terms: int = NOVELTY_TERMS):
+        self.dim, self.terms = dim, terms
+        self._hv = HashingVectorizer(n_features=_N_FEATURES, ngram_range=(1, 2), alternate_sign=False,
+                                     norm=None, lowercase=True, dtype=np.float32)
+        self._proj = SparseRandomProjection(n_components=dim, dense_output=True, random_state=_SEED)
+        self._proj.fit(np.zeros((1, _N_FEATURES), dtype=np.float32))
+        self.df = np.zeros(_N_FEATURES, dtype=np.int32)   # document frequency per hashed n-gram
+        self.n_docs = 0
+        self.V = np.zeros((0, dim), dtype=np.float32)
+        self.ts = np.zeros(0, dtype=np.float64)
+        self.ids: List[str] = []
+        self.story: List[str] = []
+        self.parent: List[str] = []                       # "" = story root
+        self.novelty: List[float] = []
+        self.top: List[np.ndarray] = []                   # indexed terms per row
+        self.grams: List[np.ndarray] = []                 # all n-gram ids per row (counted in df)
+        self._post: Dict[int, List[int]] = {}
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    # ---- vectors ----
+    def embed(self, texts: List[str], update_df: bool = True
+              ) -> Tuple[np.ndarray, List[np.ndarray], List[np.ndarray]]:
+        """Texts → ((n, dim) float32 unit vectors, top-weighted term ids, all n-gram ids per text).
+        With `update_df` the texts are counted in df/n_docs → add() them so prune() can take them out."""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32), [], []
+        X = self._hv.transform(texts).tocsr()
+        X.sum_duplicates()                                              # one entry per n-gram and row
+        grams = [X.indices[X.indptr[r]:X.indptr[r + 1]].astype(np.int32) for r in range(X.shape[0])]
+        if update_df:
+            self.df += np.bincount(X.indices, minlength=_N_FEATURES).astype(np.int32)
+            self.n_docs += X.shape[0]
+        X.data = 1.0 + np.log(X.data)                                   # sublinear tf
+        X.data *= np.log((1.0 + self.n_docs) / (1.0 + self.df[X.indices])) + 1.0
+        top = []
+        for r in range(X.shape[0]):
+            lo, hi = X.indptr[r], X.indptr[r + 1]
+            k = min(self.terms, hi - lo)
+            sel = np.argpartition(-X.data[lo:hi], k - 1)[:k] if k else []
+            top.append(X.indices[lo:hi][sel].astype(np.int64))
+        V = np.asarray(self._proj.transform(X), dtype=np.float32)
+        V /= np.maximum(np.linalg.norm(V, axis=1, keepdims=True), 1e-12)
+        return V, top, grams
+
+    # ---- index ----
+    def add(self, ids: List[str], V: np.ndarray, top: List[np.ndarray], grams: List[np.ndarray],
+            ts: Iterable[float], stories: List[str], parents: List[str], novelty: List[float]) -> None:
+        with self._lock:
+            start = self._n
+            self._grow(start + len(ids))
+            self.V[start:start + len(ids)] = V
+            self.ts[start:start + len(ids)] = list(ts)
+            self.ids.extend(ids)
+            self.story.extend(stories)
+            self.parent.extend(parents)
+            self.novelty.extend(novelty)
+            self.top.extend(top)
+            self.grams.extend(grams)
+            for r, terms in enumerate(top, start):
+                for t in terms.tolist():
+                    self._post.setdefault(t, []).append(r)
+            self._n += len(ids)
+
+    def _grow(self, n: int) -> None:
+        cap = len(self.V)
+        if n <= cap:
+            return
+        cap = max(n, 2 * cap, 1024)
+        V = np.zeros((cap, self.dim), dtype=np.float32)
+        V[:self._n] = self.V[:self._n]
+        ts = np.zeros(cap, dtype=np.float64)
+        ts[:self._n] = self.ts[:self._n]
+        self.V, self.ts = V, ts
+
+    def query(self, v: np.ndarray, terms: np.ndarray, k: int = 1,
+              before: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Top-k (row, cosine) among rows sharing an indexed term; `before` = only rows with ts ≤ before."""
+        cand: set = set()
+        for t in terms.tolist():
+            rows = self._post.get(t)
+            if rows and len(rows) <= NOVELTY_MAX_POSTING:
+                cand.update(rows)
+        if not cand:
+            return []
+        rows = np.fromiter(cand, dtype=np.int64, count=len(cand))
+        if before is not None:
+            rows = rows[self.ts[rows] <= before]
+            if not len(rows):
+                return []
+        sims = self.V[rows] @ v
+        top = np.argsort(-sims)[:k]
+        return [(int(rows[i]), float(sims[i])) for i in top]
+
+    def prune(self, cutoff: float) -> int:
+        """Drop rows older than `cutoff` (epoch), take their n-grams out of df and
+        rebuild the postings → rows dropped."""
+        old = self.ts[:self._n] < cutoff
+        dropped = int(old.sum())
+        if dropped:
+            gone = [self.grams[i] for i in np.flatnonzero(old)]
+            self.df -= np.bincount(np.concatenate(gone), minlength=_N_FEATURES).astype(np.int32)
+            self.n_docs -= dropped
+            keep = np.flatnonzero(~old)
+            V, ts = self.V[keep], self.ts[keep]
+            ids, story, parent, nov, top, grams = ([xs[i] for i in keep] for xs in (
+                self.ids, self.story, self.parent, self.novelty, self.top, self.grams))
+            self.V, self.ts = V[:0], ts[:0]
+            self.ids, self.story, self.parent, self.novelty, self.top, self.grams = [], [], [], [], [], []
+            self._post, self._n = {}, 0
+            self.add(ids, V, top, grams, ts, story, parent, nov)
+        return dropped
+
+    # ---- persistence ----
+    def save(self, path: Path = NOVELTY_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp.npz")
+        n = self._n
+        lens = np.array([len(t) for t in self.top], dtype=np.int64)
+        glens = np.array([len(g) for g in self.grams], dtype=np.int64)
+        np.savez(tmp, V=self.V[:n], ts=self.ts[:n], ids=np.array(self.ids, dtype=object),
+                 story=np.array(self.story, dtype=object), parent=np.array(self.parent, dtype=object),
+                 novelty=np.array(self.novelty, dtype=np.float32),
+                 top=np.concatenate(self.top) if self.top else np.zeros(0, dtype=np.int64), top_len=lens,
+                 grams=np.concatenate(self.grams) if self.grams else np.zeros(0, dtype=np.int32), grams_len=glens,
+                 df=self.df, n_docs=self.n_docs, shape=np.array([self.dim, self.terms]))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = NOVELTY_PATH) -> "StoryIndex":
+        """Saved index (postings rebuilt), or an empty one if missing / built with other settings."""
+        idx = cls()
+        try:
+            with np.load(path, allow_pickle=True) as z:
+                if tuple(z["shape"].tolist()) != (idx.dim, idx.terms):
+                    raise ValueError("index built with other NOVELTY_DIM/NOVELTY_TERMS")
+                if "grams" not in z.files:
+                    raise ValueError("index without per-row n-grams (df could not be pruned)")
+                idx.df, idx.n_docs = z["df"].astype(np.int32), int(z["n_docs"])
+                split = lambda a, lens: np.split(a, np.cumsum(lens)[:-1]) if len(lens) else []
+                idx.add(z["ids"].tolist(), z["V"].astype(np.float32), split(z["top"], z["top_len"]),
+                        split(z["grams"].astype(np.int32), z["grams_len"]), z["ts"].tolist(),
+                        z["story"].tolist(), z["parent"].tolist(), z["novelty"].tolist())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[novelty] [warn] index not loaded ({e}); starting empty", flush=True)
+        return idx
+
+
+_INDEX: Optional[StoryIndex] = None
+
+
+def get_index() -> StoryIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = StoryIndex.load()
+    return _INDEX
+
+
+def link_stories(items: List[Any], now: float, index: Optional[StoryIndex] = None,
+                 link: float = NOVELTY_LINK, persist: bool = True) -> Dict[str, int]:
+    """Set _novelty / _story_id / _parent_id on `items` (in place) and add new ones to the
+    index; re-fetched items keep what they got on first sight. → counts."""
+    index = index or get_index()
+    index.prune(now - NOVELTY_DAYS * 86400)
+    known = {i: r for r, i in enumerate(index.ids)}
+    fresh = []
+    for it in items:
+        r = known.get(it.get("id"))
+        if r is None:
+            fresh.append(it)
+        else:
+            it["_story_id"], it["_novelty"] = index.story[r], index.novelty[r]
+            if index.parent[r]:
+                it["_parent_id"] = index.parent[r]
+    fresh.sort(key=lambda it: it.get("published_ts") or now)
+    V, top, grams = index.embed([_text(it) for it in fresh])
+    linked = 0
+    for it, v, terms, g in zip(fresh, V, top, grams):
+        ts = it.get("published_ts") or now
+        hit = index.query(v, terms, k=1, before=ts)
+        sim = hit[0][1] if hit else 0.0
+        it["_novelty"] = round(min(1.0, max(0.0, 1.0 - sim)), 4)
+        if hit and sim >= link:
+            it["_parent_id"] = index.ids[hit[0][0]]
+            it["_story_id"] = index.story[hit[0][0]]
+            linked += 1
+        else:
+            it["_story_id"] = it["id"]
+        index.add([it["id"]], v[None, :], [terms], [g], [ts], [it["_story_id"]],
+                  [it.get("_parent_id") or ""], [it["_novelty"]])
+    if persist:
+        try:
+            index.save()
+        except OSError as e:
+            print(f"[novelty] [warn] could not save index: {e}", flush=True)
+    return {"new": len(fresh), "linked": linked, "indexed": len(index)}
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(7)
+    n = int(os.getenv("BENCH_ITEMS", "30000"))
+    n_stories = n // 4
+    zipf = 1.0 / np.arange(1, 20001)
+    draw = lambda k: rng.choice(20000, size=k, p=zipf / zipf.sum())
+    seeds = [draw(30) for _ in range(n_stories)]
+    texts, stories = [], []
+    for i in range(n):   # ~4 items per story; a follow-up keeps ~70% of the words, adds 10 new
+        s = int(rng.integers(n_stories))
+        keep = seeds[s][rng.random(30) < 0.7]
+        texts.append(" ".join(f"w{w}" for w in np.concatenate([keep, draw(10)])))
+        stories.append(s)
+
+    idx = StoryIndex()
+    t0 = time.perf_counter()
+    V, top, grams = idx.embed(texts)
+    t1 = time.perf_counter()
+    idx.add([str(i) for i in range(n)], V, top, grams, range(n), [str(s) for s in stories], [""] * n, [1.0] * n)
+    t2 = time.perf_counter()
+    qs = rng.choice(n, size=500, replace=False).tolist()
+    t3 = time.perf_counter()
+    hits = [idx.query(V[q], top[q], k=2) for q in qs]
+    t4 = time.perf_counter()
+    exact = []
+    for q in qs:
+        sims = idx.V[:n] @ V[q]
+        sims[q] = -1.0
+        exact.append(float(sims.max()))
+    t5 = time.perf_counter()
+    linkable = [len(h) > 1 and h[1][1] >= NOVELTY_LINK for h, e in zip(hits, exact) if e >= NOVELTY_LINK]
+    same = sum(len(h) > 1 and h[1][1] >= NOVELTY_LINK and stories[h[1][0]] == stories[q] for h, q in zip(hits, qs))
+    print(f"{n} vectors ({n_stories} stories): embed {t1-t0:.2f}s  index {t2-t1:.2f}s")
+    print(f"query {(t4-t3)/len(qs)*1000:.2f} ms  vs brute force {(t5-t4)/len(qs)*1000:.2f} ms")
+    print(f"neighbour at cos≥{NOVELTY_LINK} found for {sum(linkable)}/{len(linkable)} queries that have one "
+          f"(exact scan); linked to the right story: {same}/{sum(linkable)}")
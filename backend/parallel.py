@@ -0,0 +1,127 @@
+# parallel.py
+# ---------------------------------------------------------------------
+# Optional process pool for the pure, CPU-bound pipeline stages
+# (ticker/keyword enrichment, LLM-free feed formatting).
+# - off by default (PARALLEL_WORKERS=0) and auto-serial below
+#   PARALLEL_MIN_ITEMS — pool start-up costs more than it saves there
+# - fork start method: the batch is parked in a module global BEFORE the
+#   pool forks, so workers inherit it copy-on-write; tasks are only
+#   (start, end) index ranges and results are small per-item tuples
+#   → no pickling of item batches on the way in
+# - only forks while the process is single-threaded: fork() copies just
+#   the calling thread, so a lock held by any other live thread (watsonx
+#   warm-up, push server, debug sink, httpx pools) would stay locked in
+#   the child. process() always has such threads once LLM or push is on,
+#   so there the pool comes from a forkserver (started clean, with the
+#   stage function's module preloaded) and item chunks ARE pickled on the
+#   way in. The first call per process pays the server start (~2 s: it
+#   imports pipeline once), every call the pickling (~1 s per 20k items),
+#   so in LLM/push runs PARALLEL_WORKERS only pays off on multi-core hosts
+#   with large batches (raise PARALLEL_MIN_ITEMS if a profile says so)
+# - stage functions must RETURN what they compute (worker-side mutations
+#   are lost); the caller applies results in the parent
+# - no LLM / network calls in stage functions (clients and stats live in
+#   the parent process)
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+from typing import Any, Callable, List, Sequence
+
+PARALLEL_WORKERS   = int(os.getenv("PARALLEL_WORKERS", "0"))       # 0/1 = serial, -1 = all cores
+PARALLEL_MIN_ITEMS = int(os.getenv("PARALLEL_MIN_ITEMS", "2000"))
+PARALLEL_CHUNK     = int(os.getenv("PARALLEL_CHUNK", "1000"))
+
+_SHARED: Sequence[Any] = ()
+_FN: Callable[[Any], Any] | None = None
+
+
+def _run_chunk(bounds) -> List[Any]:
+    start, end = bounds
+    fn = _FN
+    return [fn(x) for x in _SHARED[start:end]]
+
+
+def _run_items(task) -> List[Any]:
+    fn, part = task
+    return [fn(x) for x in part]
+
+
+def fork_safe() -> bool:
+    """fork start method available and no other thread alive in this process."""
+    return "fork" in mp.get_all_start_methods() and threading.active_count() == 1
+
+
+def pool_context():
+    """fork when fork_safe(), else forkserver/spawn (tasks are pickled → small payloads only)."""
+    if fork_safe():
+        return mp.get_context("fork")
+    return mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+
+
+def effective_workers(n_items: int, workers: int | None = None, min_items: int | None = None) -> int:
+    w = PARALLEL_WORKERS if workers is None else workers
+    if w < 0:
+        w = os.cpu_count() or 1
+    if w <= 1 or n_items < (PARALLEL_MIN_ITEMS if min_items is None else min_items):
+        return 1
+    if "fork" not in mp.get_all_start_methods():
+        return 1   # spawn re-imports everything per worker → not worth it
+    return min(w, max(1, n_items // 100))
+
+
+def pmap(fn: Callable[[Any], Any], items: Sequence[Any], *, workers: int | None = None,
+         min_items: int | None = None, chunk: int | None = None) -> List[Any]:
+    """[fn(x) for x in items], order preserved; process pool for large batches
+    (forked while single-threaded, else forkserver — `fn` must be module-level)."""
+    w = effective_workers(len(items), workers, min_items)
+    if w == 1:
+        return [fn(x) for x in items]
+
+    global _SHARED, _FN
+    n = len(items)
+    chunk = chunk or max(100, min(PARALLEL_CHUNK, -(-n // (w * 4))))
+    bounds = [(i, min(n, i + chunk)) for i in range(0, n, chunk)]
+    if not fork_safe():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([fn.__module__])   # no-op once the server runs
+        with ctx.Pool(w) as pool:
+            parts = pool.map(_run_items, [(fn, items[i:j]) for i, j in bounds], chunksize=1)
+        return [r for part in parts for r in part]
+    _SHARED, _FN = items, fn
+    try:
+        with mp.get_context("fork").Pool(w) as pool:
+            parts = pool.map(_run_chunk, bounds, chunksize=1)
+    finally:
+        _SHARED, _FN = (), None
+    return [r for part in parts for r in part]
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import datetime, timezone
+    import pipeline as P
+
+    n = int(os.getenv("BENCH_ITEMS", "20000"))
+    body = ("Nvidia said on Tuesday its chief executive resigns after the merger closes. "
+            "Shares of FedEx (FDX) fell 3% as guidance was cut. ") * 20
+    items = [P.base_item("reuters", f"https://x.com/news/nvda-{i}", f"Nvidia CEO resigns {i}", body,
+                         datetime.now(timezone.utc)) for i in range(n)]
+    for w in (1, os.cpu_count() or 1):
+        t0 = time.perf_counter()
+        res = pmap(P._enrich_one, items, workers=w, min_items=0)
+        t1 = time.perf_counter()
+        ents = pmap(P.to_provisional_entry, items, workers=w, min_items=0)
+        t2 = time.perf_counter()
+        print(f"workers={w}: enrich {t1-t0:.2f}s  provisional entries {t2-t1:.2f}s  ({len(res)}/{len(ents)} items)")
+    # as inside process(): push server / watsonx warm-up threads alive → forkserver pool
+    stop = threading.Event()
+    threading.Thread(target=stop.wait, daemon=True).start()
+    w = os.cpu_count() or 1
+    t0 = time.perf_counter()
+    res2 = pmap(P._enrich_one, items, workers=w, min_items=0)
+    t1 = time.perf_counter()
+    stop.set()
+    print(f"workers={w} (threads alive → forkserver): enrich {t1-t0:.2f}s  same results: {res2 == res}")
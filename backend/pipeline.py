@@ -4,14 +4,32 @@ import os
 import re
 import hashlib
 from datetime import datetime, timezone
-from typing import Dict, Any, List, Tuple
-from watson_helper import _wx_gen, wx_healthcheck
-from ranker import infer_scores, append_training_rows
+from typing import Dict, Any, List, Tuple, Optional
+from watson_helper import _wx_gen, wx_healthcheck, wx_params, wx_warmup
+from prompts import TEMPLATES, EVENT_TYPES, record as record_prompt, prompt_stats
+from novelty import link_stories
+from ranker import infer_scores, append_training_rows, build_feature_matrix, blend_weight
+from event_classifier import predict_events, append_labeled_rows, LOCAL_CONF_MIN
 from datetime import timedelta
 import json
+from functools import partial
 from pathlib import Path
-DEBUG_DIR = Path("out/debug")
-DEBUG_DIR.mkdir(parents=True, exist_ok=True)
+from debug_sink import debug_write, debug_stats  # malformed LLM output → background gz log
+from store import get_store
+from items import ItemRecord, as_dict, epoch_of, stamp_ages
+from snapshots import get_publisher, atomic_write_json, LEGACY_PATH
+import push_server as push  # SSE push (no-op unless PUSH_PORT / push_server.start())
+from delivery import get_queue as get_delivery_queue
+from edgar import fetch_filings, watchlist_sources, EDGAR_RPS, EDGAR_WORKERS  # EDGAR filing documents (rate-limited, cached by accession)
+from connectors import Connector, SourceContext, register, run_connectors  # source registry, concurrent fetch
+from parallel import pmap  # optional process pool for pure CPU stages (PARALLEL_WORKERS)
+import textnorm
+from textnorm import (  # precompiled + memoized cleanup helpers
+    strip_code_fence, first_sentence as _first_sentence, sentences as _sentences,
+    clean_prefixes as _clean_prefixes, clean_text as _clean_text,
+    strip_translation_markup as _strip_translation_markup,
+    looks_german as _looks_german, normalize_headline as _normalize_headline,
+)
 
 
 LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "7"))
@@ -20,20 +38,17 @@ LOOKBACK_DAYS = int(os.getenv("LOOKBACK_DAYS", "7"))
 
 try:
     import httpx
-    import feedparser
 except Exception as e:
     raise ImportError(
         "Required packages not found. Please run:\n"
-        "  pip install httpx==0.27.2 feedparser==6.0.11\n"
+        "  pip install httpx==0.27.2\n"
         f"Import error was: {e}"
     )
 
 
 import re, json
 
-print("[watsonx]", wx_healthcheck())
 def _extract_json_block(raw):
-    import json, re
     if raw is None:
         return None
     # Accept already-parsed Python objects
@@ -44,8 +59,7 @@ def _extract_json_block(raw):
 
     # Strip code fences if present
     if s.startswith("```"):
-        s = re.sub(r"^```(?:json)?\s*|\s*```$", "", s,
-                   flags=re.IGNORECASE | re.DOTALL).strip()
+        s = strip_code_fence(s)
 
     # Fast path for clean JSON object/array
     if s[:1] in ("{", "["):
@@ -108,6 +122,18 @@ NEWSAPI_DOMAINS = os.getenv(
     "reuters.com,ft.com,wsj.com,bloomberg.com,cnbc.com,marketwatch.com,nzz.ch,handelszeitung.ch"
 )
 
+MARKETAUX_PAGES = int(os.getenv("MARKETAUX_PAGES", "1"))
+NEWSAPI_PAGES   = int(os.getenv("NEWSAPI_PAGES", "1"))
+
+# Outlet RSS feeds (connector name = item source; matches TIER1). Override: RSS_FEEDS='{"nzz": [...]}'
+RSS_ENABLED = os.getenv("RSS_ENABLED", "1") == "1"
+RSS_FEEDS: Dict[str, List[str]] = json.loads(os.getenv("RSS_FEEDS", "null") or "null") or {
+    "nzz":          ["https://www.nzz.ch/wirtschaft.rss", "https://www.nzz.ch/finanzen.rss"],
+    "handelsblatt": ["https://www.handelsblatt.com/contentexport/feed/finanzen",
+                     "https://www.handelsblatt.com/contentexport/feed/unternehmen"],
+    "finews":       ["https://www.finews.ch/news/finanzplatz?format=feed&type=rss"],
+}
+
 USER_AGENT = "MarketNewsMonitor/1.0"
 TIMEOUT    = 20.0
 HEADERS = {
@@ -116,16 +142,16 @@ HEADERS = {
 }
 
 
+EDGAR_ENABLED = os.getenv("EDGAR_ENABLED", "0") == "1"   # filing documents: see edgar.py
+
 SEC_ATOM = [
     "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=8-K&count=100&owner=exclude&output=atom",
     "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=10-Q&count=100&owner=exclude&output=atom",
     "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&CIK=&type=10-K&count=100&owner=exclude&output=atom",
 ]
 
-# A light watchlist (override with WATCHLIST env var)
-WATCHLIST = {s.strip().upper() for s in os.getenv(
-    "WATCHLIST", "FDX,NVDA,INTC,CRWD,AMD,AAPL,MSFT,GOOGL,AMZN,TSLA"
-).split(",") if s.strip()}
+# A light watchlist (override with WATCHLIST env var); shared with ranker.py
+from fanout import WATCHLIST, get_engine as get_fanout
 
 # -------------------- Normalization helpers --------------------
 
@@ -146,27 +172,17 @@ def safe_hash(*parts: str) -> str:
             h.update(p.encode("utf-8", "ignore"))
     return h.hexdigest()[:16]
 
-def base_item(source: str, url: str, headline: str, body: str, published: datetime) -> Dict[str, Any]:
-    _id = safe_hash(source, url, headline)
-    return {
-        "id": _id,
-        "published_at": to_rfc3339(published),
-        "source": source or "",
-        "url": url or "",
-        "headline": (headline or "").strip(),
-        "body_text": strip_html(body)[:8000],
-        "tickers": [],
-        "entities": [],
-        "event_type": None,
-        "asset_classes": [],
-        "sectors": [],
-        "regions": [],
-        "confidence": None,
-        "urgency": None,
-        "why_it_matters": None,
-        "draft_note": None,
-        "hash": _id,
-    }
+def base_item(source: str, url: str, headline: str, body: str, published: datetime) -> ItemRecord:
+    # slotted record with dict-style access; converted with to_dict() at the output boundary
+    return ItemRecord(
+        safe_hash(source, url, headline),
+        to_rfc3339(published),
+        source or "",
+        url or "",
+        (headline or "").strip(),
+        strip_html(body)[:8000],
+        published_ts=(published if published.tzinfo else published.replace(tzinfo=timezone.utc)).timestamp(),
+    )
 
 # -------------------- EDGAR: Item → event/urgency --------------------
 
@@ -195,7 +211,10 @@ ITEM_REGEX = re.compile(r"Item\s+(\d+\.\d+)", re.IGNORECASE)
 def classify_edgar_from_summary(summary: str):
     if not summary:
         return None, None, []
-    found = ITEM_REGEX.findall(summary)
+    return classify_edgar_items(ITEM_REGEX.findall(summary))
+
+def classify_edgar_items(found: List[str]):
+    """Item codes → (event_type, urgency, codes); the most urgent Item wins."""
     event_type = urgency = None
     if found:
         pr = {"high": 3, "med": 2, "low": 1}
@@ -235,33 +254,64 @@ KW_MAP = {
 
 
 
+def _wx_prompt(name: str, **fields) -> str:
+    """Render a prompt template (token-budgeted), call watsonx, record token stats."""
+    tpl = TEMPLATES[name]
+    rp = tpl.render(**fields)
+    params = dict(wx_params(tpl.model_key), max_new_tokens=rp.max_new_tokens)
+    raw = _wx_gen(rp.text, model_key=tpl.model_key, params=params)
+    record_prompt(rp, raw)
+    return raw
+
+
 def translate_to_de(text: str) -> str:
     if not text:
         return ""
-    prompt = f"""Übersetze ins Deutsche in neutralem Finanzstil.
-- Erhalte Zahlen, Prozente, Währungen und Ticker unverändert.
-- Unternehmens- und Eigennamen nicht übersetzen.
-- Keine Halluzinationen, nichts hinzufügen oder weglassen.
-- Wenn Text bereits Deutsch ist, unverändert zurückgeben.
-
-TEXT:
-{text[:6000]}"""
-    raw = _wx_gen(prompt, model_key="summarize")
+    raw = _wx_prompt("translate", text=text)
     # Best-effort: if model returns JSON by habit, strip it; else return as-is
     tr = str(raw or "").strip()
     return tr
 
 
+HIGH_URGENCY_EVENTS = {"ceo_exit","mna","earnings_surprise","bankruptcy"}
+
 def preclassify_keywords(item: Dict[str, Any]) -> None:
     if item.get("source", "").lower() == "sec_edgar": return
     text = ((item.get("headline") or "") + " " + (item.get("body_text") or "")).lower()
     for et, words in KW_MAP.items():
         if any(w in text for w in words):
             item["event_type"] = item.get("event_type") or et
-            item["urgency"] = item.get("urgency") or ("high" if et in {"ceo_exit","mna","earnings_surprise","bankruptcy"} else "med")
+            item["urgency"] = item.get("urgency") or ("high" if et in HIGH_URGENCY_EVENTS else "med")
             return
 
 
+def route_classification(item: Dict[str, Any], local_pred: Tuple[str, float] | None) -> str | None:
+    """
+    Decide whether `item` still needs the watsonx classifier.
+    Returns "rules" / "local" when the event_type is already confident
+    (and marks the item classified), or None to route it to the LLM.
+    """
+    if local_pred:
+        item["_local_event"], item["_local_conf"] = local_pred[0], float(local_pred[1])
+
+    # EDGAR Item codes are deterministic (ITEM_MAP)
+    if item.get("source", "").lower() == "sec_edgar" and item.get("event_type"):
+        route = "rules"
+    # Local model is sure and does not contradict the keyword pre-classifier
+    elif local_pred and local_pred[1] >= LOCAL_CONF_MIN and item.get("event_type") in (None, local_pred[0]):
+        route = "local"
+        if not item.get("event_type"):
+            item["event_type"] = local_pred[0]
+            item["urgency"] = item.get("urgency") or ("high" if local_pred[0] in HIGH_URGENCY_EVENTS else "med")
+    else:
+        return None
+
+    item["_classified"] = True
+    item["_classify_fallback"] = False
+    item["_classify_source"] = route
+    return route
+
+
 # -------------------- Ticker enrichment --------------------
 
 _TICK_IN_PARENS = re.compile(r"\((?P<t>[A-Z]{1,5})\)")
@@ -310,6 +360,15 @@ def enrich_tickers(item: Dict[str, Any]) -> None: # add tickers if missing
     if found:
         item["tickers"] = found
 
+def _enrich_one(item: ItemRecord) -> tuple:
+    """enrich_tickers + preclassify_keywords; RETURNS what they set (process-pool safe)."""
+    try:
+        enrich_tickers(item)
+        preclassify_keywords(item)
+        return item.tickers, item.event_type, item.urgency, None
+    except Exception as e:
+        return None, None, None, str(e)
+
 # -------------------- Dedupe, scoring, severity --------------------
 
 def dedupe(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]: # remove duplicates
@@ -322,66 +381,40 @@ def dedupe(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]: # remove duplic
         out.append(it)
     return out
 
-# ---- Weights (tweak in one place) ----
-SOURCE_W = {
-    "sec_8k": 0.45,   # filings are high-signal but not always high-impact
-    "sec_10q": 0.30,
-    "sec_10k": 0.25,
-    "tier1_press": 0.30,   # Reuters/BBG/WSJ/FT/CNBC/MW
-    "other_press": 0.20,
-}
-EVENT_W = {
-    "ceo_exit": 0.35,
-    "bankruptcy": 0.35,
-    "non_reliance": 0.35,
-    "earnings_surprise": 0.30,
-    "mna": 0.30,
-    "guidance_change": 0.20,
-    "rating_change": 0.20,
-    "reg_fd": 0.10,
-    "geopolitics": 0.20,
-    "unregistered_sale": 0.15,
-    "dividend_change": 0.15,
-    "other_events": 0.05,
-}
-URGENCY_W = {"high": 0.15, "med": 0.06, "low": 0.00}
-KEYWORD_NUDGE = 0.03
-TICKER_PRESENT = 0.04
-WATCHLIST_BOOST = 0.12
-MAX_SCORE = 1.0
-
-TIER1 = ("reuters","bloomberg","wsj","ft","cnbc","marketwatch",
-         "nzz","handelszeitung","handelsblatt","faz","wiwo","boerse.ard","tagesschau","finanzen.net","cash","finews","tagesanzeiger")
+# ---- Weights (weights.py, shared with ranker / rescore) ----
+from weights import (SOURCE_W, EVENT_W, URGENCY_W, KEYWORD_NUDGE, TICKER_PRESENT,
+                     WATCHLIST_BOOST, MAX_SCORE, TIER1, FOLLOWUP_PENALTY, HEADLINE_KEYWORDS)
 
 
 from datetime import datetime, timezone
 
-def hours_old(item):
-    try:
-        dt = datetime.fromisoformat(item["published_at"].replace("Z","+00:00"))
-    except Exception:
+def hours_old(item: ItemRecord, now: float | None = None):
+    # _age_h is stamped once per run (stamp_ages) against the run-level now
+    if item._age_h is not None and now is None:
+        return item._age_h
+    ts = item.published_ts if item.published_ts is not None else epoch_of(item.published_at)
+    if ts is None:
         return 0.0
-    now = datetime.now(timezone.utc)
-    return max(0.0, (now - dt).total_seconds() / 3600.0)
+    return max(0.0, ((time.time() if now is None else now) - ts) / 3600.0)
 
 def time_decay(item, half_life_hours=72):
     # 24h half-life; =1 when fresh, 0.5 after 24h, etc.
     h = hours_old(item)
     return 0.5 ** (h / half_life_hours)
 
-def score_item_base(it: dict) -> float:
+def novelty_factor(item) -> float:
+    nov = item.get("_novelty")
+    return 1.0 if nov is None else 1.0 - FOLLOWUP_PENALTY * (1.0 - float(nov))
+
+def score_item_base(it: ItemRecord) -> float:
     s = 0.0
-    src = (it.get("source") or "").lower()
+    src = (it.source or "").lower()
     s += SOURCE_W["tier1_press"] if any(d in src for d in TIER1) else SOURCE_W["other_press"]
-    et = (it.get("event_type") or "other_events"); urg = (it.get("urgency") or "low")
+    et = (it.event_type or "other_events"); urg = (it.urgency or "low")
     s += EVENT_W.get(et, EVENT_W["other_events"]); s += URGENCY_W.get(urg, 0.0)
-    if any(kw in (it.get("headline") or "").lower() for kw in (
-        "guidance","resigns","resignation","appointed","impairment","non-reliance",
-        "acquisition","merger","downgrade","upgrade","beats","misses",
-        "ausblick","tritt zurück","übernahme","fusion","abstufung","hochstuft",
-        "übertrifft","verfehlt","dividende","aktienrückkauf","insolvenz")): s += KEYWORD_NUDGE
-    if it.get("tickers"): s += TICKER_PRESENT
-    if set(it.get("tickers") or []) & WATCHLIST: s += WATCHLIST_BOOST
+    if any(kw in (it.headline or "").lower() for kw in HEADLINE_KEYWORDS): s += KEYWORD_NUDGE
+    if it.tickers: s += TICKER_PRESENT
+    if not WATCHLIST.isdisjoint(it.tickers or ()): s += WATCHLIST_BOOST
     return min(s, MAX_SCORE)
 
 
@@ -393,28 +426,9 @@ def severity(score: float) -> str:
 # -------------------- LLM scaffolding (safe fallbacks) --------------------
 
 def llm_classify(item: dict) -> dict:
-    title = item.get("headline") or ""
-    body  = (item.get("body_text") or "")[:1500]
     hints = ", ".join(item.get("tickers") or [])
-    prompt = f"""
-Du bist ein Klassifizierer für Finanznachrichten (Analysten-Triage).
-
-Gib STRENGES JSON mit folgenden Schlüsseln zurück:
-event_type: eins aus [central_bank, earnings_surprise, ceo_exit, mna, rating_change, dividend_change, bankruptcy, regulatory, sector_shock, other_events]
-tickers: Array aus Strings (Aktienticker, UPPERCASE)
-sectors: Array aus Strings (GICS-ähnlich)
-asset_classes: Teilmenge von [Equity, Rates, Credit, Commodities, FX]
-regions: Teilmenge von [US, EU, CH, UK, JP, EM]
-confidence: Float 0..1 (Sicherheit bzgl. event_type)
-
-TITLE: {title}
-BODY: {body}
-TICKER_HINTS: {hints or "n/a"}
-
-Nur JSON ausgeben, keine Prosa.
-""".strip()
-
-    raw = _wx_gen(prompt, model_key="classify")
+    raw = _wx_prompt("classify", title=item.get("headline") or "", body=item.get("body_text") or "",
+                     hints=hints or "n/a")
     # Safe fallback default
     out = {
         "event_type": "other_events",
@@ -431,11 +445,14 @@ Nur JSON ausgeben, keine Prosa.
     try:
         j = _extract_json_block(raw)
         if not j:
-            Path(DEBUG_DIR / f"classify_{item.get('id','unknown')}.txt").write_text(raw or "", encoding="utf-8")
+            debug_write("classify", item.get("id"), raw=raw)
             return out
 
         # Aliases
         evt = j.get("event_type") or j.get("eventType") or j.get("type")
+        evt = str(evt).strip().lower() if evt else None
+        if evt not in EVENT_TYPES:   # missing or invented class → not an LLM label
+            evt = None
         tix = j.get("tickers")    or j.get("symbols")  or j.get("tickers_list")
         sct = j.get("sectors")    or j.get("sector")   or []
         acl = j.get("asset_classes") or j.get("assetClasses") or []
@@ -451,13 +468,11 @@ Nur JSON ausgeben, keine Prosa.
             "asset_classes": acl or ["Equity"],
             "regions": rgn or ["US"],
             "confidence": float(conf if conf is not None else out["confidence"]),
-            "_classify_fallback": False,
+            "_classify_fallback": evt is None,
         })
         # Save parsed if anything is odd/missing
         if not evt:
-            Path(DEBUG_DIR / f"classify_{item.get('id','unknown')}_parsed.json").write_text(
-                json.dumps(j, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
+            debug_write("classify_parsed", item.get("id"), parsed=j)
         return out
 
     except Exception:
@@ -465,6 +480,7 @@ Nur JSON ausgeben, keine Prosa.
 
 MAX_CLASSIFY  = 100  # cap LLM classify for testing
 MAX_SUMMARIZE = 100  # cap LLM summarize for testing
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "5"))  # publish provisional feed every N summaries (0 = off)
 
 WHY_DEFAULTS = {
     "ceo_exit": "Führungswechsel kann Strategie und Guidance verschieben; Nachfolge und Marktreaktion beobachten.",
@@ -484,45 +500,10 @@ WHY_DEFAULTS = {
 
 def llm_summarize(item: dict) -> dict:
     title = item.get("headline") or ""
-    body  = (item.get("body_text") or "")[:1500]
     event = item.get("event_type") or "other_events"
     tick  = ", ".join(item.get("tickers") or [])
-
-    prompt = f"""
-Du verfasst kompakte Analysten-Karten im Stil von Wellershoff & Partners.
-
-STIL:
-- Neutral, faktenbasiert, knapp. Zahlen zuerst, dann eine Linie Kontext.
-- Kurze Hauptsätze, wenige Adjektive. „stieg/fiel/unverändert“, nicht „sprang/stürzte“.
-- Makro-bewusst (Basiseffekte, Kern vs. Gesamt, real vs. nominal, Bewertung vs. Ertrag, Politikrahmen).
-- Formulierungen: „bleibt“, „deutet auf“, „stützt“, „belastet“, „Spielraum ist gering“, „Risiken sind asymmetrisch“.
-- Keine Ratschläge, keine Ausrufe, keine Spekulation außer wenn explizit im INPUT.
-- Zahlen mit Einheiten (%, bp, YoY/QoQ, Niveaus, Vergleich).
-
-STRUKTUR (genau 3 Bulletpoints, je 7–18 Wörter):
-1) Kontext — Was das Unternehmen/der Emittent ist (Kernaktivität).
-2) Narrativ — Was jetzt passiert (Aktion/Ereignis) mit relevantesten Zahlen.
-3) Wirkung/Jetzt — Warum es jetzt zählt; Reaktion/Guidance/Bewertung falls vorhanden.
-
-AUSGABE
-Gib JSON mit GENAU diesen Schlüsseln zurück:
-- "headline": string (<= 90 Zeichen), rein sachlich.
-- "bullets": genau 3 kurze Sätze (7–18 Wörter).
-- "why_it_matters": ein Satz (<= 40 Wörter), sachlich.
-
-REGELN
-- Immer alle Schlüssel ausgeben.
-- Wenn Infos nicht reichen: why_it_matters = "Unzureichende Informationen für eine Einordnung."
-- Keine Emojis, keine Halbsätze, keine Semikolons.
-- Nur belegbare Fakten aus dem INPUT.
-
-INPUT
-TITLE: {title}
-BODY: {body}
-EVENT: {event}
-TICKERS: {tick or "n/a"}
-""".strip()
-    raw = _wx_gen(prompt, model_key="summarize")
+    raw = _wx_prompt("summarize", title=title, body=item.get("body_text") or "", event=event,
+                     tick=tick or "n/a")
 
     # Fallback
     h = title.strip()
@@ -549,7 +530,7 @@ TICKERS: {tick or "n/a"}
     try:
         j = _extract_json_block(raw)
         if not j:
-            Path(DEBUG_DIR / f"summarize_{item.get('id','unknown')}.txt").write_text(raw or "", encoding="utf-8")
+            debug_write("summarize", item.get("id"), raw=raw)
             return {**fallback, **meta}
 
         # Accept common variants
@@ -618,23 +599,10 @@ TICKERS: {tick or "n/a"}
 
 def llm_why(item: dict) -> str | None:
     """Get ONLY why_it_matters as JSON to backfill when missing."""
-    title = item.get("headline") or ""
-    body  = (item.get("body_text") or "")[:800]  # keep it short to reduce failure
-    event = item.get("event_type") or "other_events"
-    tick  = ", ".join(item.get("tickers") or [])
-
-    prompt = f'''
-Gib JSON mit genau einem Schlüssel zurück: "why_it_matters".
-- Wert: ein prägnanter deutscher Satz (<= 40 Wörter), warum die Meldung marktrelevant ist.
-- Wenn Infos nicht reichen: "Unzureichende Informationen für eine Einordnung."
-
-TITLE: {title}
-BODY: {body}
-EVENT: {event}
-TICKERS: {tick or "n/a"}
-'''.strip()
-
-    raw = _wx_gen(prompt, model_key="summarize")  # or a dedicated "why" key if you have it
+    tick = ", ".join(item.get("tickers") or [])
+    # body budget is kept short (see TEMPLATES["why"]) to reduce failure
+    raw = _wx_prompt("why", title=item.get("headline") or "", body=item.get("body_text") or "",
+                     event=item.get("event_type") or "other_events", tick=tick or "n/a")
     try:
         j = _extract_json_block(raw)
         v = j.get("why_it_matters") if j else None
@@ -644,56 +612,175 @@ TICKERS: {tick or "n/a"}
         return None
 
 
+# Combined "analyze" call: classification + German card in ONE round-trip.
+# Keys the model must return (and the type we accept for each).
+ANALYZE_SCHEMA = {
+    "event_type": str,
+    "tickers": list,
+    "sectors": list,
+    "asset_classes": list,
+    "regions": list,
+    "confidence": float,
+    "headline_de": str,
+    "bullets": list,
+    "why_it_matters": str,
+}
+ANALYZE_MODE = os.getenv("ANALYZE_MODE", "1") not in ("0", "false", "False", "")
+
+
+def llm_analyze(item: dict) -> dict:
+    """
+    Classify + summarize in a single schema-constrained call.
+    Returns only the fields that validated against ANALYZE_SCHEMA, plus
+    `_missing` (list of schema keys the caller has to backfill).
+    """
+    hints = ", ".join(item.get("tickers") or [])
+    raw = _wx_prompt("analyze", title=item.get("headline") or "", body=item.get("body_text") or "",
+                     event=item.get("event_type") or "n/a", hints=hints or "n/a")
+    out: dict = {"_missing": list(ANALYZE_SCHEMA)}
+    if not raw:
+        return out
+    try:
+        j = _extract_json_block(raw)
+        if not isinstance(j, dict):
+            debug_write("analyze", item.get("id"), raw=raw)
+            return out
+
+        # Same aliases the single-purpose parsers accept
+        aliases = {
+            "event_type": ("event_type", "eventType", "type"),
+            "tickers": ("tickers", "symbols"),
+            "sectors": ("sectors", "sector"),
+            "asset_classes": ("asset_classes", "assetClasses"),
+            "regions": ("regions", "region"),
+            "confidence": ("confidence",),
+            "headline_de": ("headline_de", "headline", "title"),
+            "bullets": ("bullets", "points", "bullet_points"),
+            "why_it_matters": ("why_it_matters", "whyItMatters", "why"),
+        }
+        missing = []
+        for key, typ in ANALYZE_SCHEMA.items():
+            v = next((j[a] for a in aliases[key] if j.get(a) not in (None, "", [])), None)
+            if typ is list and isinstance(v, str):
+                v = [p.strip("•- \t") for p in v.splitlines() if p.strip()]
+            if typ is float:
+                try:
+                    v = max(0.0, min(1.0, float(v)))
+                except (TypeError, ValueError):
+                    v = None
+            elif typ is str:
+                v = str(v).strip() if isinstance(v, str) else None
+            elif not isinstance(v, list):
+                v = None
+
+            if key == "event_type" and v not in EVENT_TYPES:
+                v = None
+            if key == "tickers" and v is not None:
+                v = [str(t).upper() for t in v if str(t).strip()]
+            if key == "bullets" and v is not None:
+                v = [str(b).strip() for b in v if str(b).strip()][:3]
+                v = [b if b.endswith(".") else b + "." for b in v]
+                if len(v) < 3:
+                    v = None
+
+            if v is None:
+                missing.append(key)
+            else:
+                out[key] = v
+        out["_missing"] = missing
+        if missing:
+            debug_write("analyze_parsed", item.get("id"), parsed=j)
+        return out
+    except Exception:
+        return out
+
+
+def analyze_with_fallbacks(item: dict) -> dict:
+    """
+    Run llm_analyze() and call the single-purpose functions ONLY for the
+    fields it could not deliver. Returns a dict shaped like llm_summarize()
+    output plus the classification keys from llm_analyze().
+    """
+    ana = llm_analyze(item)
+    missing = set(ana.pop("_missing", ()))
+
+    # Classification: fill gaps only (same semantics as the classify loop)
+    item["event_type"]    = item.get("event_type") or ana.get("event_type")
+    item["tickers"]       = list({*(item.get("tickers") or []), *(ana.get("tickers") or [])})
+    item["sectors"]       = item.get("sectors") or ana.get("sectors") or []
+    item["asset_classes"] = item.get("asset_classes") or ana.get("asset_classes") or []
+    item["regions"]       = item.get("regions") or ana.get("regions") or []
+    if "confidence" in ana and "_llm_conf" not in item:
+        item["_llm_conf"] = float(ana["confidence"])
+    if not item.get("event_type"):  # rare rescue
+        cls = llm_classify(item)
+        item["event_type"] = cls.get("event_type")
+
+    # Card: bullets/headline missing → full summarize (also backfills why)
+    if {"bullets", "headline_de"} & missing:
+        summ = llm_summarize(item)
+        if "headline_de" not in missing:
+            summ["headline"], summ["_headline_fallback"] = ana["headline_de"], False
+        if "why_it_matters" not in missing:
+            summ["why_it_matters"], summ["_why_fallback"] = ana["why_it_matters"], False
+        summ["_analyze_fallback"] = True
+        return summ
+
+    return {
+        "headline": ana["headline_de"],
+        "bullets": ana["bullets"],
+        "why_it_matters": ana.get("why_it_matters", ""),  # empty → caller backfills via llm_why
+        "_headline_fallback": False,
+        "_bullets_fallback": False,
+        "_why_fallback": "why_it_matters" in missing,
+        "_summary_fallback": False,
+        "_analyze_fallback": False,
+    }
+
+
 # -------------------- Fetchers --------------------
 
-def fetch_edgar() -> List[Dict[str, Any]]:
+def fetch_edgar(ctx: SourceContext | None = None) -> List[Dict[str, Any]]:
+    """Current filings incl. the primary document's Item sections (edgar.py: rate-limited, cached)."""
     items: List[Dict[str, Any]] = []
-    with httpx.Client(timeout=TIMEOUT, headers=HEADERS, follow_redirects=True) as client:
-        for url in SEC_ATOM:
-            try:
-                r = client.get(url)
-                r.raise_for_status()
-                feed = feedparser.parse(r.text)
-                for e in feed.entries:
-                    link = e.get("link") or ""
-                    title = e.get("title","SEC Filing")
-                    summary = e.get("summary","")
-                    published = e.get("published_parsed")
-                    if published:
-                        dt = datetime(*published[:6], tzinfo=timezone.utc)
-                    else:
-                        dt = datetime.now(timezone.utc)
-                    itm = base_item("sec_edgar", link, title, summary, dt)
-                    et, urg, codes = classify_edgar_from_summary(summary)
-                    itm["event_type"] = et
-                    itm["urgency"] = urg
-                    itm["entities"] = codes
-                    items.append(itm)
-            except Exception:
-                continue
+    urls, ciks = watchlist_sources(SEC_ATOM)   # EDGAR_MODE=watchlist: watchlist CIKs only
+    kw = {"rate": ctx.rate, "workers": ctx.concurrency} if ctx else {}
+    for f in fetch_filings(urls, ciks=ciks, **kw):
+        doc_items = f.get("items") or {}
+        codes = [c for c in doc_items if "." in c] or ITEM_REGEX.findall(f.get("summary") or "")
+        et, urg, codes = classify_edgar_items(codes)
+        if doc_items:
+            body = "\n".join(f"Item {c}: {t}" for c, t in doc_items.items())
+        else:
+            body = f.get("text") or f.get("summary") or ""
+        itm = base_item("sec_edgar", f.get("link") or "", f.get("title") or "SEC Filing", body,
+                        datetime.fromisoformat(f["filed"]))
+        itm["event_type"] = et
+        itm["urgency"] = urg
+        itm["entities"] = codes
+        if f.get("tickers"):
+            itm["tickers"] = list(f["tickers"])   # from the CIK map; enrich_tickers keeps them
+        itm["accession"] = f.get("accession")
+        itm["key_numbers"] = f.get("numbers") or {}
+        items.append(itm)
     return items
 
-def fetch_marketaux() -> List[Dict[str, Any]]:
-    if not MARKETAUX_API_TOKEN:
-        return []
+def _api_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+def fetch_marketaux(ctx: SourceContext) -> List[Dict[str, Any]]:
     q = " OR ".join([f'"{t}"' for t in QUERY_TERMS]) or "markets"
-    published_after = (datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)).replace(microsecond=0).isoformat()+"Z"
     params = {
         "api_token": MARKETAUX_API_TOKEN,
         "language":"en",
         "filter_entities":"true",
-        "published_after": published_after,
+        "published_after": _api_time(ctx.since),
         "limit": 50,
         "search": q
     }
     url = "https://api.marketaux.com/v1/news/all"
-    try:
-        with httpx.Client(timeout=TIMEOUT, headers=HEADERS) as client:
-            r = client.get(url, params=params)
-            r.raise_for_status()
-            data = r.json().get("data", [])
-    except Exception:
-        return []
+    data = ctx.paginate(lambda page: ctx.get(url, params={**params, "page": page}).json().get("data", []),
+                        page_size=params["limit"])
     out = []
     for a in data:
         _url = a.get("url","")
@@ -711,12 +798,8 @@ def fetch_marketaux() -> List[Dict[str, Any]]:
     return out
 
 
-def fetch_newsapi() -> List[Dict[str, Any]]:
-    if not NEWSAPI_API_KEY:
-        return []
+def fetch_newsapi(ctx: SourceContext) -> List[Dict[str, Any]]:
     q = " OR ".join([f'"{t}"' for t in QUERY_TERMS]) or "markets"
-    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat() + "Z"
-    frm = (datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)).replace(microsecond=0).isoformat() + "Z"
     params = {
         "q": q,
         "language":"en",
@@ -724,17 +807,12 @@ def fetch_newsapi() -> List[Dict[str, Any]]:
         "sortBy":"publishedAt",
         "apiKey": NEWSAPI_API_KEY,
         "domains": NEWSAPI_DOMAINS,
-        "from": frm,
-        "to": now,
+        "from": _api_time(ctx.since),
+        "to": _api_time(time.time()),
     }
     url = "https://newsapi.org/v2/everything"
-    try:
-        with httpx.Client(timeout=TIMEOUT, headers=HEADERS) as client:
-            r = client.get(url, params=params)
-            r.raise_for_status()
-            articles = r.json().get("articles", [])
-    except Exception:
-        return []
+    articles = ctx.paginate(lambda page: ctx.get(url, params={**params, "page": page}).json().get("articles", []),
+                            page_size=params["pageSize"])
     out = []
     for a in articles:
         _url   = a.get("url","")
@@ -753,6 +831,31 @@ def fetch_newsapi() -> List[Dict[str, Any]]:
     return out
 
 
+def fetch_rss(ctx: SourceContext, urls: List[str]) -> List[Dict[str, Any]]:
+    """One outlet's RSS/Atom feeds (fetched in parallel up to the connector's concurrency)."""
+    out = []
+    for entries in ctx.map(ctx.entries, urls):
+        for e in entries:
+            if not e["link"] or not e["title"]:
+                continue
+            out.append(base_item(ctx.name, e["link"], e["title"], e["summary"],
+                                 e["published"] or datetime.now(timezone.utc)))
+    return out
+
+
+# -------------------- Source registry --------------------
+# Order = dedupe precedence. Rates are per source; all sources run concurrently.
+
+register(Connector("sec_edgar", fetch_edgar, enabled=lambda: EDGAR_ENABLED,
+                   rate=EDGAR_RPS, concurrency=EDGAR_WORKERS))
+register(Connector("marketaux", fetch_marketaux, enabled=lambda: bool(MARKETAUX_API_TOKEN),
+                   rate=1.0, concurrency=1, max_pages=MARKETAUX_PAGES))
+register(Connector("newsapi", fetch_newsapi, enabled=lambda: bool(NEWSAPI_API_KEY),
+                   rate=1.0, concurrency=1, max_pages=NEWSAPI_PAGES))
+for _name, _urls in RSS_FEEDS.items():
+    register(Connector(_name, partial(fetch_rss, urls=_urls), enabled=lambda: RSS_ENABLED,
+                       rate=2.0, concurrency=2))
+
 
 # -------------------- Main pipeline --------------------
 import time
@@ -761,7 +864,8 @@ from datetime import datetime
 def _ts():
     return datetime.now().strftime("%H:%M:%S")
 
-def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.3) -> Dict[str, Any]:
+def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: Optional[float] = None,
+            analyze: bool = ANALYZE_MODE) -> Dict[str, Any]:
     """
     Pipeline:
       1) Fetch → dedupe → enrich → pre-score (heuristic)
@@ -769,42 +873,71 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
       3) LLM classify subset (event/tickers + _llm_conf)
       4) ML infer (_ml_score)
       5) Final score = (1-ml_weight)*heur + ml_weight*ml + small LLM nudge
+         (ml_weight=None → ranker.blend_weight(): 0.3, or the searched weight with RANKER_BLEND=searched)
       6) Filter, summarize, persist training rows
+         (analyze=True: one combined llm_analyze() call per top item, single-purpose
+          calls only for the fields it missed)
     """
     t0 = time.perf_counter()
-    print(f"[{_ts()}] [pipeline] start (min_score={min_score}, with_llm={with_llm}, ml_weight={ml_weight})", flush=True)
+    if ml_weight is None:
+        ml_weight = blend_weight()
+    push.start()  # SSE server for this process if PUSH_PORT is set (idempotent)
+    if with_llm:
+        wx_warmup()  # auth + model init in the background while sources are fetched
+    print(f"[{_ts()}] [pipeline] start (min_score={min_score}, with_llm={with_llm}, ml_weight={ml_weight}, analyze={analyze})", flush=True)
 
     # 1) Fetch
     print(f"[{_ts()}] [pipeline] fetching sources…", flush=True)
-    # edgar     = fetch_edgar()
-    marketaux = fetch_marketaux()
-    newsapi   = fetch_newsapi()
-    #print(f"[{_ts()}] fetched → edgar={len(edgar)} marketaux={len(marketaux)} newsapi={len(newsapi)}", flush=True)
-    print(f"[{_ts()}] fetched → marketaux={len(marketaux)} newsapi={len(newsapi)}", flush=True)
+    fetched = run_connectors(headers=HEADERS, timeout=TIMEOUT)   # all enabled sources, concurrently
+    print(f"[{_ts()}] fetched → " + " ".join(f"{n}={len(v)}" for n, v in fetched.items()), flush=True)
 
     # 2) Dedupe
-    #all_items = dedupe(edgar + marketaux + newsapi)
-    all_items = dedupe(marketaux + newsapi)
+    all_items = dedupe([it for items in fetched.values() for it in items])
     print(f"[{_ts()}] [pipeline] after dedupe: total={len(all_items)}", flush=True)
 
+    # one reference "now" for the whole run: pre-score, decay, ML features, output
+    run_now = time.time()
+    stamp_ages(all_items, run_now)
+    textnorm.reset()   # cleanup memo is per run
+
+    # story linking: follow-ups get _parent_id/_story_id and a low _novelty
+    try:
+        st = link_stories(all_items, now=run_now)
+        print(f"[{_ts()}] [pipeline] stories: {st['new']} new items, {st['linked']} linked as follow-ups "
+              f"(index {st['indexed']})", flush=True)
+    except Exception as e:
+        print(f"[{_ts()}] [warn] story linking failed: {e}", flush=True)
+
     for it in all_items:
-        it["_classified"]  = False   # will flip to True inside the LLM classify loop
-        it["_summarized"]  = False
+        it._classified  = False   # flipped by the routing tier or the LLM classify loop
+        it._summarized  = False
         
-    # 3) Enrich + keyword preclassify + pre-score (heuristic only)
+    # 3) Enrich + keyword preclassify + local routing tier + pre-score (heuristic only)
     
     print(f"[{_ts()}] [pipeline] enrich + preclassify + pre-score…", flush=True)
-    for idx, it in enumerate(all_items, 1):
-        try:
-            enrich_tickers(it)
-            preclassify_keywords(it)
-            impact = score_item_base(it)
-            it["_pre_conf"] = impact * time_decay(it)
- # heuristic prior with time decay
-        except Exception as e:
-            print(f"[{_ts()}] [warn] enrich/preclassify failed on item#{idx}: {e}", flush=True)
+    for idx, (it, (tick, et, urg, err)) in enumerate(zip(all_items, pmap(_enrich_one, all_items)), 1):
+        if err:
+            print(f"[{_ts()}] [warn] enrich/preclassify failed on item#{idx}: {err}", flush=True)
+            continue
+        it.tickers = tick
+        it["event_type"], it["urgency"] = et, urg  # re-interned (pool results arrive unpickled)
 
-    # 4) Choose LLM classify subset
+    try:
+        local_preds = predict_events(all_items)  # {} if no local model yet
+    except Exception as e:
+        print(f"[{_ts()}] [warn] local classifier failed: {e}", flush=True)
+        local_preds = {}
+    routed = {"rules": 0, "local": 0}
+    for it in all_items:
+        r = route_classification(it, local_preds.get(it["id"]))
+        if r:
+            routed[r] += 1
+        impact = score_item_base(it)
+        it._pre_conf = impact * time_decay(it) * novelty_factor(it)  # heuristic prior with time decay
+    print(f"[{_ts()}] [pipeline] classified without LLM: rules={routed['rules']} local={routed['local']} "
+          f"(local model {'on' if local_preds else 'off'}, threshold={LOCAL_CONF_MIN})", flush=True)
+
+    # 4) Choose LLM classify subset (only items the routing tier was not confident about)
     MATERIAL_EDGAR = {"1.01","2.01","2.02","4.01","4.02","5.02"}  # MA, M&A, results, auditor/non-reliance, CEO
     def _is_tier1(src: str) -> bool:
         s = (src or "").lower()
@@ -818,16 +951,18 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
 
     def _priority_score(it) -> float:
         # Score-first, small nudges for EDGAR 8-K, Tier-1, watchlist
-        pre = float(it.get("_pre_conf", 0.0))
+        pre = float(it._pre_conf or 0.0)
         bonus = 0.0
         if _is_edgar_8k(it):                 bonus += 0.05
         if _is_tier1(it.get("source")):      bonus += 0.03
         if _on_watchlist(it):                bonus += 0.02
         return pre + bonus
 
+    needs_llm = [it for it in all_items if not it._classified]
+
     # Guardrail: always include material EDGAR
     must_classify = [
-    it for it in all_items
+    it for it in needs_llm
     if (it.get("source","").lower()=="sec_edgar" and (set(it.get("entities") or []) & MATERIAL_EDGAR))
        or (set(it.get("tickers") or []) & WATCHLIST)
     ]
@@ -835,11 +970,14 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
 
     # Fill the rest by priority; keep uniqueness; cap at MAX_CLASSIFY
     seen_ids = {it["id"] for it in must_classify}
-    rest_sorted = sorted(all_items, key=_priority_score, reverse=True)
+    rest_sorted = sorted(needs_llm, key=_priority_score, reverse=True)
     subset_for_llm = must_classify + [it for it in rest_sorted if it["id"] not in seen_ids]
     subset_for_llm = subset_for_llm[:MAX_CLASSIFY]
     print(f"[{_ts()}] [pipeline] LLM classify target count: {len(subset_for_llm)}", flush=True)
 
+    if with_llm:
+        print(f"[{_ts()}] [watsonx] {wx_healthcheck()}", flush=True)  # cached; waits for warmup if still running
+
     # 5) LLM classify subset (to improve event/tickers + get _llm_conf)
     if with_llm and subset_for_llm:
         print(f"[{_ts()}] [pipeline] LLM classify…", flush=True)
@@ -852,7 +990,9 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
                 it["asset_classes"] = it.get("asset_classes") or cls.get("asset_classes") or []
                 it["regions"]       = it.get("regions") or cls.get("regions") or []
                 it["_llm_conf"]     = float(cls.get("confidence") or 0.5)
+                it["_llm_event"]    = None if cls.get("_classify_fallback", True) else cls.get("event_type")  # LLM's own answer
                 it["_classify_fallback"] = bool(cls.get("_classify_fallback", True))
+                it["_classify_source"]   = "llm"
                 it["_classified"]        = True
             except Exception as e:
                 print(f"[{_ts()}] [warn] llm_classify failed on item {i}: {e}", flush=True)
@@ -860,12 +1000,13 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
                 print(f"  …classified {i}/{len(subset_for_llm)}", flush=True)
 
     # 6) ML ranker inference
-    ml_scores = infer_scores(all_items)  # {} if no model yet
+    feats = build_feature_matrix(all_items, now=run_now)   # once per run: inference + training rows
+    ml_scores = infer_scores(all_items, now=run_now, features=feats)  # {} if no model yet
     used_ml = 0
     for it in all_items:
-        ms = ml_scores.get(it["id"])
+        ms = ml_scores.get(it.id)
         if ms is not None:
-            it["_ml_score"] = float(ms)
+            it._ml_score = float(ms)
             used_ml += 1
     print(f"[{_ts()}] [pipeline] ML scores available for {used_ml}/{len(all_items)} items", flush=True)
 
@@ -873,25 +1014,53 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
     print(f"[{_ts()}] [pipeline] scoring + severity…", flush=True)
     for it in all_items:
         impact = score_item_base(it)                 # no decay
-        recent  = impact * time_decay(it)            # with decay
-        ml = it.get("_ml_score")
+        recent  = impact * time_decay(it) * novelty_factor(it)   # with decay, follow-ups discounted
+        ml = it._ml_score
         base = (1.0 - ml_weight) * recent + (ml_weight * float(ml) if ml is not None else 0.0)
-        if "_llm_conf" in it: base += 0.05 * (float(it["_llm_conf"]) - 0.5)
-        it["confidence"] = max(0.0, min(1.0, base))
-        it["severity"]   = severity(impact)          # <-- severity from undecayed score
-
+        if it._llm_conf is not None: base += 0.05 * (float(it._llm_conf) - 0.5)
+        it.confidence = max(0.0, min(1.0, base))
+        it.severity   = severity(impact)          # <-- severity from undecayed score
+
+    pushed: set = set()   # ids sent as "scored" → only these get a "summary" update
+    if push.active():  # push relevant items right away, CEO exits / M&A first
+        scored = [it for it in all_items if it.confidence >= min_score]
+        scored.sort(key=lambda x: (x.event_type not in push.PRIORITY_EVENTS, -x.confidence))
+        for it in scored:
+            push.emit("scored", _push_payload(it))
+            pushed.add(it.id)
 
     # 8) Filter AFTER blending
-    filtered = [it for it in all_items if it["confidence"] >= min_score]
+    filtered = [it for it in all_items if it.confidence >= min_score]
     print(f"[{_ts()}] [pipeline] filtered relevant: {len(filtered)} (threshold={min_score})", flush=True)
 
+    # 8b) Subscriber fan-out (client watchlists → matching relevant items)
+    fanout: Dict[str, List[str]] = {}
+    try:
+        engine = get_fanout()
+        if len(engine):
+            fanout = engine.fanout(filtered, tags_of=_entry_tags)
+            print(f"[{_ts()}] [pipeline] fan-out: {sum(map(len, fanout.values()))} notifications "
+                  f"for {len(fanout)}/{len(engine)} subscriptions", flush=True)
+            # persistent delivery queue (coalesced into digests by `python delivery.py worker`)
+            by_id = {it.id: it for it in filtered}
+            dq = get_delivery_queue()
+            queued = sum(dq.enqueue(sid, [_alert_payload(by_id[i]) for i in ids], engine.subs[sid].channel)
+                         for sid, ids in fanout.items())
+            print(f"[{_ts()}] [pipeline] delivery queue: +{queued} alerts", flush=True)
+    except Exception as e:
+        print(f"[{_ts()}] [warn] fan-out failed: {e}", flush=True)
+
     # 9) Persist feature rows for future labeling/training
     try:
         from pathlib import Path
         Path("out").mkdir(parents=True, exist_ok=True)
-        append_training_rows(all_items, csv_out="out/training_events.csv")
+        append_training_rows(all_items, csv_out="out/training_events.csv", now=run_now, features=feats)
     except Exception as e:
         print(f"[{_ts()}] [warn] append_training_rows failed: {e}", flush=True)
+    try:
+        append_labeled_rows(all_items)  # LLM-confirmed labels → local classifier history
+    except Exception as e:
+        print(f"[{_ts()}] [warn] append_labeled_rows failed: {e}", flush=True)
 
     # 10) Summarize ONLY top-N filtered
     # 10) Summarize ONLY top-N filtered
@@ -910,17 +1079,40 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
 
     TARGET_SUMMARIES = 20  # pick your number
     to_summarize = (material + non_material)[:min(MAX_SUMMARIZE, TARGET_SUMMARIES)]
+
+    # Provisional feed snapshots: scored items are visible now, summaries land incrementally
+    feed_entries: Dict[str, Dict[str, Any]] = {}
+    def _publish(changed) -> None:
+        if not SNAPSHOT_EVERY:
+            return
+        changed = list(changed)
+        for x, entry in zip(changed, pmap(to_provisional_entry, changed)):
+            feed_entries[x.id] = entry
+        try:
+            v = get_publisher().publish([feed_entries[x.id] for x in filtered if x.id in feed_entries])
+            print(f"[{_ts()}] [pipeline] provisional snapshot v{v}", flush=True)
+        except Exception as e:
+            print(f"[{_ts()}] [warn] snapshot publish failed: {e}", flush=True)
+    _publish(filtered)
+    summarize_ids = {it.id for it in to_summarize}
+    for it in all_items:
+        if it.id not in summarize_ids:
+            it.compact()  # body only needed again for persistence → park it compressed
     print(f"[{_ts()}] [pipeline] LLM summarize on {len(to_summarize)} of {len(all_items)} items…", flush=True)
 
 
     if with_llm and to_summarize:
         print(f"[{_ts()}] [pipeline] LLM summarize on {len(to_summarize)} of {len(filtered)} items…", flush=True)
         for i, it in enumerate(to_summarize, 1):
+            ok = False
             try:
-                if not it.get("event_type"):  # rare rescue
-                    cls = llm_classify(it)
-                    it["event_type"] = it.get("event_type") or cls.get("event_type")
-                summ = llm_summarize(it)
+                if analyze:
+                    summ = analyze_with_fallbacks(it)
+                else:
+                    if not it.get("event_type"):  # rare rescue
+                        cls = llm_classify(it)
+                        it["event_type"] = it.get("event_type") or cls.get("event_type")
+                    summ = llm_summarize(it)
 
                 why = (summ.get("why_it_matters") or "").strip()
                 why_fb = False
@@ -944,6 +1136,8 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
                 it["_summary_fallback"]  = bool(summ.get("_summary_fallback", True))
                 it["_headline_fallback"] = bool(summ.get("_headline_fallback", True))
                 it["_bullets_fallback"]  = bool(summ.get("_bullets_fallback", True))
+                if analyze:
+                    it["_analyze_fallback"] = bool(summ.get("_analyze_fallback", True))
                 it["_summarized"]        = True
                 # Use LLM headline (German) or translate the original if the LLM headline fell back
                 de_headline = (summ.get("headline") or "").strip()
@@ -955,35 +1149,63 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
                 # Make a short German draft one-liner (for Slack/UI)
                 # Keep it terse and factual: "Headline — Why it matters"
                 it["draft_note_de"] = f"{it['headline_de']} — {it['why_it_matters']}".strip()
+                ok = True
 
             except Exception as e:
                 print(f"[{_ts()}] [warn] llm_summarize failed on item {i}: {e}", flush=True)
             if i % 5 == 0:
                 print(f"  …summarized {i}/{len(to_summarize)}", flush=True)
+            if ok and it.id in pushed and push.active():
+                push.emit("summary", _push_payload(it))
+            if it.id in feed_entries:
+                feed_entries[it.id] = to_provisional_entry(it)
+                # high severity goes out immediately, the rest in batches
+                if it.severity == "high" or (SNAPSHOT_EVERY and i % SNAPSHOT_EVERY == 0):
+                    _publish(())
     ensure_de_fields(filtered)
     # Clean tail (filtered but not summarized)
     for it in filtered[MAX_SUMMARIZE:]:
         it.pop("bullets", None); it.pop("why_it_matters", None); it.pop("draft_note", None)
 
+    try:
+        persist_enriched(all_items, run_ts=run_now)  # input for rescore.py / replay.py (re-rank without re-ingest)
+    except Exception as e:
+        print(f"[{_ts()}] [warn] persist_enriched failed: {e}", flush=True)
+    try:
+        get_store().upsert_items(all_items)  # indexed store for feed/dashboard queries
+    except Exception as e:
+        print(f"[{_ts()}] [warn] store upsert failed: {e}", flush=True)
+
     dt = time.perf_counter() - t0
     print(f"[{_ts()}] [pipeline] done in {dt:.2f}s — relevant={len(filtered)}/{len(all_items)}", flush=True)
+    pstats = prompt_stats()
+    for name, st in pstats.items():
+        print(f"  [prompts] {name}: calls={st['calls']} avg_in={st['avg_prompt_tokens']} "
+              f"avg_out={st['avg_response_tokens']} trimmed={st['trimmed']} hit_cap={st['hit_max_new_tokens']}", flush=True)
 
     classify_fb = sum(1 for it in all_items if it.get("_classified") and it.get("_classify_fallback"))
     summ_fb     = sum(1 for it in filtered  if it.get("_summarized") and it.get("_summary_fallback"))
 
     return {
         "counts": {
-            #"sec_edgar": len(edgar),
-            "marketaux": len(marketaux),
-            "newsapi": len(newsapi),
+            **{name: len(items) for name, items in fetched.items()},
             "total_deduped": len(all_items),
             "relevant": len(filtered),
             "classified": sum(it.get("_classified", False) for it in all_items),
+            "classified_rules": routed["rules"],
+            "classified_local": routed["local"],
+            "classified_llm": sum(it.get("_classify_source") == "llm" for it in all_items),
             "summarized": sum(it.get("_summarized", False) for it in filtered),
             "classify_fallback": classify_fb,
             "summarize_fallback": summ_fb,
+            "analyze_fallback": sum(1 for it in filtered if it.get("_analyze_fallback")),
+            "notifications": sum(map(len, fanout.values())),
         },
-        "items": filtered,
+        "items": [it.to_dict() for it in filtered],
+        "fanout": fanout,
+        "run_ts": run_now,
+        "prompt_stats": pstats,
+        "debug_stats": debug_stats(),
     }
 
 
@@ -1075,16 +1297,16 @@ def process(min_score: float = 0.2, with_llm: bool = True, ml_weight: float = 0.
 _PRIORITY_MAP = {"high": "Hoch", "med": "Mittel", "low": "Niedrig"}
 
 
-def _iso_to_date_time(iso_str: str) -> tuple[str, str]:
+def _iso_to_date_time(iso_str: str, ts: float | None = None) -> tuple[str, str]:
     """
     Split '2025-09-20T15:59:11Z' into ('2025-09-20', '15:59:11').
-    Falls back to current UTC if parsing fails.
+    Uses the precomputed epoch `ts` when given (no re-parse);
+    falls back to current UTC if parsing fails.
     """
     from datetime import datetime, timezone
-    try:
-        dt = datetime.fromisoformat((iso_str or "").replace("Z", "+00:00"))
-    except Exception:
-        dt = datetime.now(timezone.utc)
+    if ts is None:
+        ts = epoch_of(iso_str)
+    dt = datetime.fromtimestamp(ts, timezone.utc) if ts is not None else datetime.now(timezone.utc)
     return dt.date().isoformat(), dt.time().strftime("%H:%M:%S")
 
 _PRIORITY_MAP = {"high": "Hoch", "med": "Mittel", "low": "Niedrig"}
@@ -1105,16 +1327,6 @@ def _event_to_tag(evt: str | None) -> str | None:
     return m.get((evt or "other_events").lower(), "Sonstiges")
 
 
-def _first_sentence(text: str, max_len: int = 280) -> str:
-    """Take the first sentence-ish chunk, trim to max_len."""
-    s = (text or "").strip()
-    if not s:
-        return ""
-    # Split on sentence enders; fallback to slice
-    import re
-    parts = re.split(r"(?<=[\.\!\?])\s+", s)
-    out = parts[0] if parts else s
-    return (out[:max_len] + ("…" if len(out) > max_len else ""))
 def _shorten_words(s: str, max_words: int = 12, max_chars: int = 90) -> str:
     """Return at most `max_words` words (and <= max_chars), trimmed cleanly."""
     s = (s or "").strip()
@@ -1126,28 +1338,6 @@ def _shorten_words(s: str, max_words: int = 12, max_chars: int = 90) -> str:
         out = out[:max_chars].rstrip(" ,;:-—–")
     return out.strip(" .:;-–—")
 
-def _sentences(text: str) -> list[str]:
-    """Lightweight sentence splitter; keeps only non-empty trimmed sentences."""
-    import re
-    text = (text or "").strip()
-    if not text:
-        return []
-    parts = re.split(r"(?<=[.!?])\s+", text)
-    return [p.strip() for p in parts if p.strip()]
-
-def _clean_prefixes(s: str) -> str:
-    """Strip noisy prefixes like 'Antwort:', 'ANTWORT:', 'Zusammenfassung:', etc."""
-    import re
-    s = (s or "").strip()
-    if not s:
-        return ""
-    # Remove bracketed labels and common noise tokens
-    s = re.sub(r"\[(?i:antwort|summary|note|draft)\]\s*", "", s)
-    s = re.sub(r"(?i)^(antwort|antw?ort|antwner|zusammenfassung|summary)\s*:\s*", "", s)
-    # Collapse duplicated spaces/dashes
-    s = re.sub(r"\s+", " ", s).strip(" —–—-")
-    return s
-
 def _pick_german_sentence(text: str, fallback: str = "") -> str:
     """Pick the first sentence that looks German; else fallback/first."""
     sents = _sentences(_strip_translation_markup(text))
@@ -1169,7 +1359,7 @@ def to_minimal_entry(it: dict) -> dict:
     # --- Source & time ---
     source = (it.get("source") or "").strip()
     url = (it.get("url") or "").strip()
-    date_str, time_str = _iso_to_date_time(it.get("published_at") or "")
+    date_str, time_str = _iso_to_date_time(it.get("published_at") or "", it.get("published_ts"))
     priority = _PRIORITY_MAP.get((it.get("severity") or "low").lower(), "Niedrig")
 
     # --- Title: short, clean, German-only ---
@@ -1189,14 +1379,14 @@ def to_minimal_entry(it: dict) -> dict:
         summary_long = _first_sentence(body)
         if summary_long and not _looks_german(summary_long):
             summary_long = translate_to_de(summary_long)
-        summary_long = _clean_prefixes(_strip_translation_markup(summary_long))
+        summary_long = _clean_text(summary_long)
 
     # Fallbacks for summary if body was empty/too short
     if not summary_long or len(summary_long) < 30:
         summary_long = raw_head if raw_head else (it.get("headline") or "")
         if summary_long and not _looks_german(summary_long):
             summary_long = translate_to_de(summary_long)
-        summary_long = _clean_prefixes(_strip_translation_markup(summary_long))
+        summary_long = _clean_text(summary_long)
 
     # --- Context (why it matters): sanitize & keep German ---
     context = (it.get("why_it_matters") or "").strip()
@@ -1212,7 +1402,7 @@ def to_minimal_entry(it: dict) -> dict:
             body_de = body
             if body_de and not _looks_german(body_de):
                 body_de = translate_to_de(body_de)
-            body_de = _clean_prefixes(_strip_translation_markup(body_de))
+            body_de = _clean_text(body_de)
             for s in _sentences(body_de):
                 if s.strip() and s.strip().rstrip(".") != context.strip().rstrip("."):
                     summary_long = s
@@ -1223,7 +1413,7 @@ def to_minimal_entry(it: dict) -> dict:
     bullets = it.get("bullets") or []
     bullets = [str(b).strip() for b in bullets if str(b).strip()]
     # Clean bullets a bit
-    bullets = [_clean_prefixes(_strip_translation_markup(b)) for b in bullets]
+    bullets = [_clean_text(b) for b in bullets]
     # Build review draft
     if bullets:
         # Join 2–3 bullets into a short review paragraph
@@ -1233,7 +1423,7 @@ def to_minimal_entry(it: dict) -> dict:
         body_de = body
         if body_de and not _looks_german(body_de):
             body_de = translate_to_de(body_de)
-        body_de = _clean_prefixes(_strip_translation_markup(body_de))
+        body_de = _clean_text(body_de)
         review = _two_sentence_body_draft(body_de) or summary_long
 
     # Ensure review differs from summary; if equal, append context (if not already)
@@ -1253,7 +1443,22 @@ def to_minimal_entry(it: dict) -> dict:
     if context and context not in review:
         review = f"{review} — {context}"
 
-    # --- Tags ---
+    return {
+        "id": it.get("id"),
+        "title": title,            # short, clean, German
+        "source": source,
+        "url": url,
+        "date": date_str,
+        "time": time_str,
+        "priority": priority,
+        "summary": summary_long,   # longer, first-sentence-style, German
+        "context": context,        # why it matters (German)
+        "draftText": review,       # DIFFERENT from summary; 2–3 bullets/body sentences + why
+        "tags": _entry_tags(it),
+    }
+
+
+def _entry_tags(it: dict) -> list[str]:
     tags: list[str] = []
     evt_tag = _event_to_tag(it.get("event_type"))
     if evt_tag:
@@ -1280,23 +1485,106 @@ def to_minimal_entry(it: dict) -> dict:
 
     # De-duplicate preserving order
     seen = set()
-    tags = [t for t in tags if not (t in seen or seen.add(t))]
+    return [t for t in tags if not (t in seen or seen.add(t))]
+
 
+def to_provisional_entry(it: dict) -> dict:
+    """
+    Same shape as to_minimal_entry() but LLM-free (no translation calls), for
+    the early snapshots published while summaries are still running. Uses the
+    German LLM fields once they exist; the final snapshot replaces it.
+    """
+    date_str, time_str = _iso_to_date_time(it.get("published_at") or "", it.get("published_ts"))
+    head = (it.get("headline_de") or it.get("headline") or "").strip()
+    title = _shorten_words(_clean_prefixes(_normalize_headline(head)) if head else "", max_words=12, max_chars=90)
+    context = _clean_text(it.get("why_it_matters") or "")
+    bullets = [_clean_text(str(b)) for b in (it.get("bullets") or []) if str(b).strip()]
+    summary = _clean_prefixes(_first_sentence(it.get("body_text") or "")) or title
     return {
         "id": it.get("id"),
-        "title": title,            # short, clean, German
-        "source": source,
-        "url": url,
+        "title": title,
+        "source": (it.get("source") or "").strip(),
+        "url": (it.get("url") or "").strip(),
         "date": date_str,
         "time": time_str,
-        "priority": priority,
-        "summary": summary_long,   # longer, first-sentence-style, German
-        "context": context,        # why it matters (German)
-        "draftText": review,       # DIFFERENT from summary; 2–3 bullets/body sentences + why
-        "tags": tags,
+        "priority": _PRIORITY_MAP.get((it.get("severity") or "low").lower(), "Niedrig"),
+        "summary": summary,
+        "context": context,
+        "draftText": " ".join(bullets[:3]) or summary,
+        "tags": _entry_tags(it),
+        "provisional": True,
     }
 
 
+def _alert_payload(it: ItemRecord) -> dict:
+    """Compact alert for the delivery queue (digests are built from these)."""
+    return {"id": it.id, "title": it.get("headline_de") or it.headline, "url": it.url,
+            "source": it.source, "severity": it.severity, "event_type": it.event_type,
+            "tickers": list(it.tickers or []), "confidence": round(it.confidence or 0.0, 4),
+            "published_at": it.published_at}
+
+
+def _push_payload(it: ItemRecord) -> dict:
+    """SSE payload: provisional feed entry + the fields clients filter on."""
+    return {**to_provisional_entry(it), "confidence": round(it.confidence or 0.0, 4),
+            "severity": it.severity, "event_type": it.event_type, "tickers": list(it.tickers or [])}
+
+
+ENRICHED_DIR = Path("out/enriched")
+_RUN_VOLATILE = ("_age_h", "confidence", "_pre_conf", "_ml_score")   # change every run with the item's age
+_PERSISTED: Dict[str, Dict[str, str]] = {}   # day file → {id: content hash already written}
+
+
+def _persisted(p: Path) -> Dict[str, str]:
+    """id → content hash of the rows in day file `p` (read once per process, then kept up to date)."""
+    key = str(p)
+    if key not in _PERSISTED:
+        seen: Dict[str, str] = {}
+        if p.exists():
+            with p.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        r = json.loads(line)
+                        seen[r["id"]] = r.get("_h", "")
+        _PERSISTED.clear()   # only the current day is ever appended to
+        _PERSISTED[key] = seen
+    return _PERSISTED[key]
+
+
+def persist_enriched(items: list[dict], directory: Path = ENRICHED_DIR, run_ts: float | None = None) -> Path:
+    """
+    Write fully enriched items (LLM outputs, _ml_score, _llm_conf, …) to
+    out/enriched/YYYY-MM-DD.jsonl so rescore.py can re-rank without a re-run.
+    Only new or changed items are written (hash over everything but the
+    per-run scores), so the first run of a day writes the window and later
+    runs only their deltas. Rows carry _run_ts (the run that wrote them).
+    Run membership + that run's _ml_score go to out/enriched/runs/YYYY-MM-DD.jsonl,
+    one line per run, so replay.py can rebuild every run.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    run_ts = time.time() if run_ts is None else run_ts
+    day = datetime.fromtimestamp(run_ts, timezone.utc).date().isoformat()
+    p = directory / f"{day}.jsonl"
+    seen = _persisted(p)
+    ids, ml = [], []
+    with p.open("a", encoding="utf-8") as f:
+        for it in items:
+            d = as_dict(it)
+            ids.append(d["id"]); ml.append(d.get("_ml_score"))
+            stable = {k: v for k, v in d.items() if k not in _RUN_VOLATILE}
+            h = hashlib.blake2b(json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"),
+                                digest_size=8).hexdigest()
+            if seen.get(d["id"]) == h:
+                continue
+            seen[d["id"]] = h
+            f.write(json.dumps({**d, "_run_ts": run_ts, "_h": h}, ensure_ascii=False, default=str) + "\n")
+    runs = directory / "runs"
+    runs.mkdir(exist_ok=True)
+    with (runs / f"{day}.jsonl").open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"_run_ts": run_ts, "ids": ids, "ml": ml}) + "\n")
+    return p
+
+
 def write_minimal_entries(items: list[dict], path: str = "out/feed_min.json"):
     """
     Save ONLY the fields the frontend needs:
@@ -1311,8 +1599,17 @@ def write_minimal_entries(items: list[dict], path: str = "out/feed_min.json"):
     p.parent.mkdir(parents=True, exist_ok=True)
 
     entries = [to_minimal_entry(it) for it in items]
-    p.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"Saved minimal entries: {p.resolve()}")
+    if p == LEGACY_PATH:
+        # final versioned snapshot (+ delta, pointer flip, atomic feed_min.json)
+        version = get_publisher().publish(entries, final=True)
+        print(f"Saved minimal entries: {p.resolve()} (snapshot v{version})")
+    else:
+        atomic_write_json(p, entries, indent=2)
+        print(f"Saved minimal entries: {p.resolve()}")
+    try:
+        get_store().upsert_entries(entries)
+    except Exception as e:
+        print(f"[warn] store upsert_entries failed: {e}")
     return entries
 
 import pathlib, pandas as pd, json
@@ -1320,16 +1617,6 @@ from collections import Counter
 
 # --- Language/cleanup helpers ---
 
-_DE_HINTS = {"der","die","das","und","oder","nicht","mit","ohne","für","über","bei","auf","im","sein","sind","wird","wurden","hat","haben","dass","weil","wenn","kann","können","Zinsen","Ausblick","Ergebnis","Quartal","Guidance"}
-
-def _looks_german(s: str) -> bool:
-    s = (s or "").lower()
-    if not s: return False
-    if any(ch in s for ch in "äöüß"):  # quick win
-        return True
-    hits = sum(1 for w in re.findall(r"[a-zA-ZäöüÄÖÜß]+", s) if w in _DE_HINTS)
-    return hits >= 2
-
 def _shorten_words(s: str, max_words: int = 16, max_chars: int = 90) -> str:
     s = _strip_translation_markup(s or "")
     words = s.split()
@@ -1338,40 +1625,6 @@ def _shorten_words(s: str, max_words: int = 16, max_chars: int = 90) -> str:
         s2 = s2[:max_chars].rsplit(" ", 1)[0] + "…"
     return s2.strip(" .:;-–—")
 
-def _strip_translation_markup(s: str) -> str:
-    if not s:
-        return ""
-    s = str(s)
-
-    # strip code fences
-    s = re.sub(r"^```(?:json|text)?\s*|\s*```$", "", s, flags=re.DOTALL | re.IGNORECASE)
-
-    # kill common LLM/translator labels at the start (both DE/EN)
-    s = re.sub(r"(?im)^\s*(antwort|reply|response|summary|zusammenfassung)\s*:\s*", "", s)
-    s = re.sub(r"(?im)^\s*\[(antwort|reply|response|summary)\]\s*:?\s*", "", s)
-
-    # keep only the last block after any ÜBERSETZUNG: markers
-    parts = re.split(r"(?i)über(setzung|setzung)\s*:\s*", s)
-    if len(parts) >= 3:
-        s = parts[-1]
-
-    # remove 'TEXT:' prefix
-    s = re.sub(r"(?im)^text\s*:\s*", "", s)
-
-    # collapse whitespace
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-
-def _normalize_headline(s: str) -> str:
-    """Single-line, no markup, trim trailing punctuation."""
-    s = _strip_translation_markup(s)
-    # first line / sentence-ish
-    s = s.split(" — ")[0].split(" - ")[0].splitlines()[0].strip()
-    s = re.sub(r"\s+", " ", s)
-    return s.strip(" .:;-–—")
-
-
 def ensure_de_fields(items: List[Dict[str, Any]]) -> None:
     for it in items:
         # --- Headline (German, cleaned) ---
@@ -0,0 +1,275 @@
+# prompts.py
+# ---------------------------------------------------------------------
+# Prompt templates with token-length guardrails.
+# - Static instruction text is tokenized ONCE when the template is built
+# - Per call only the variable fields are counted and trimmed to a token
+#   budget at sentence boundaries (no more blind [:1500] char cuts)
+# - max_new_tokens is set per template (or scaled to the input for
+#   translations) so outputs are not cut off mid-JSON
+# - Prompt/response token stats are recorded per template
+#
+# Token counts are an offline approximation of the granite BPE tokenizer
+# (word pieces of ~4 chars, punctuation = 1 token); good enough for
+# budgeting without a round-trip to the tokenize endpoint.
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass
+from string import Formatter
+from typing import Dict, Any, List, Optional
+
+_TOKEN_RE    = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENT_SPLIT  = re.compile(r"(?<=[.!?])\s+")
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str | None) -> int:
+    """Approximate token count (see module note)."""
+    if not text:
+        return 0
+    n = 0
+    for m in _TOKEN_RE.finditer(text):
+        n += max(1, -(-len(m.group()) // CHARS_PER_TOKEN))
+    return n
+
+
+def trim_to_tokens(text: str | None, budget: int) -> tuple[str, int, bool]:
+    """
+    Keep whole sentences while they fit `budget` tokens.
+    If the first sentence alone is too long, cut it at a word boundary.
+    Returns (text, tokens, trimmed?).
+    """
+    text = (text or "").strip()
+    total = count_tokens(text)
+    if total <= budget:
+        return text, total, False
+
+    kept: List[str] = []
+    used = 0
+    for sent in _SENT_SPLIT.split(text):
+        t = count_tokens(sent)
+        if used + t > budget:
+            break
+        kept.append(sent)
+        used += t
+    if kept:
+        return " ".join(kept), used, True
+
+    # First sentence exceeds the budget → word-level cut
+    words, used = [], 0
+    for w in text.split():
+        t = count_tokens(w)
+        if used + t > budget:
+            break
+        words.append(w)
+        used += t
+    return " ".join(words) + "…", used, True
+
+
+@dataclass
+class RenderedPrompt:
+    name: str
+    text: str
+    prompt_tokens: int
+    max_new_tokens: int
+    trimmed: bool
+
+
+class PromptTemplate:
+    """
+    A str.format-style template. `budgets` maps field name → max tokens;
+    fields without a budget are inserted as-is (keep those short).
+    `out_ratio` (optional) scales max_new_tokens with the budgeted input
+    tokens, e.g. for translations: output ≈ input length.
+    """
+
+    def __init__(self, name: str, text: str, *, model_key: str, max_new_tokens: int,
+                 budgets: Optional[Dict[str, int]] = None, out_ratio: float | None = None,
+                 out_field: str | None = None):
+        self.name = name
+        self.text = text.strip()
+        self.model_key = model_key
+        self.max_new_tokens = max_new_tokens
+        self.budgets = budgets or {}
+        self.out_ratio = out_ratio
+        self.out_field = out_field
+        self.fields = [f for _, f, _, _ in Formatter().parse(self.text) if f]
+        # pre-tokenize the static parts once
+        static = "".join(lit for lit, _, _, _ in Formatter().parse(self.text))
+        self.static_tokens = count_tokens(static)
+
+    def render(self, **values: Any) -> RenderedPrompt:
+        filled: Dict[str, str] = {}
+        tokens = self.static_tokens
+        trimmed = False
+        out_tokens = 0
+        for f in self.fields:
+            v = "" if values.get(f) is None else str(values[f])
+            if f in self.budgets:
+                v, t, cut = trim_to_tokens(v, self.budgets[f])
+                trimmed |= cut
+            else:
+                t = count_tokens(v)
+            if f == self.out_field:
+                out_tokens = t
+            filled[f] = v
+            tokens += t
+
+        max_new = self.max_new_tokens
+        if self.out_ratio and self.out_field:
+            max_new = min(self.max_new_tokens, int(out_tokens * self.out_ratio) + 32)
+        return RenderedPrompt(self.name, self.text.format(**filled), tokens, max_new, trimmed)
+
+
+# ---- Stats (per template; thread-safe) ----
+_stats_lock = threading.Lock()
+_STATS: Dict[str, Dict[str, float]] = {}
+
+
+def record(rp: RenderedPrompt, response: str | None) -> None:
+    rt = count_tokens(response)
+    with _stats_lock:
+        s = _STATS.setdefault(rp.name, {
+            "calls": 0, "prompt_tokens": 0, "response_tokens": 0,
+            "max_prompt_tokens": 0, "max_response_tokens": 0,
+            "trimmed": 0, "empty": 0, "hit_max_new_tokens": 0,
+        })
+        s["calls"] += 1
+        s["prompt_tokens"] += rp.prompt_tokens
+        s["response_tokens"] += rt
+        s["max_prompt_tokens"] = max(s["max_prompt_tokens"], rp.prompt_tokens)
+        s["max_response_tokens"] = max(s["max_response_tokens"], rt)
+        s["trimmed"] += int(rp.trimmed)
+        s["empty"] += int(not response)
+        s["hit_max_new_tokens"] += int(rt >= rp.max_new_tokens)
+
+
+def prompt_stats() -> Dict[str, Dict[str, float]]:
+    """Snapshot of the stats incl. per-call averages."""
+    with _stats_lock:
+        out = {k: dict(v) for k, v in _STATS.items()}
+    for s in out.values():
+        n = max(1, s["calls"])
+        s["avg_prompt_tokens"] = round(s["prompt_tokens"] / n, 1)
+        s["avg_response_tokens"] = round(s["response_tokens"] / n, 1)
+    return out
+
+
+def reset_prompt_stats() -> None:
+    with _stats_lock:
+        _STATS.clear()
+
+
+# -------------------- Templates --------------------
+
+EVENT_TYPES = ("central_bank", "earnings_surprise", "ceo_exit", "mna", "rating_change",
+               "dividend_change", "bankruptcy", "regulatory", "sector_shock", "other_events")
+
+TEMPLATES: Dict[str, PromptTemplate] = {}
+
+
+def _register(t: PromptTemplate) -> PromptTemplate:
+    TEMPLATES[t.name] = t
+    return t
+
+
+_register(PromptTemplate("translate", """
+Übersetze ins Deutsche in neutralem Finanzstil.
+- Erhalte Zahlen, Prozente, Währungen und Ticker unverändert.
+- Unternehmens- und Eigennamen nicht übersetzen.
+- Keine Halluzinationen, nichts hinzufügen oder weglassen.
+- Wenn Text bereits Deutsch ist, unverändert zurückgeben.
+
+TEXT:
+{text}""", model_key="summarize", budgets={"text": 1200}, max_new_tokens=1024,
+    out_ratio=1.4, out_field="text"))
+
+_register(PromptTemplate("classify", """
+Du bist ein Klassifizierer für Finanznachrichten (Analysten-Triage).
+
+Gib STRENGES JSON mit folgenden Schlüsseln zurück:
+event_type: eins aus [central_bank, earnings_surprise, ceo_exit, mna, rating_change, dividend_change, bankruptcy, regulatory, sector_shock, other_events]
+tickers: Array aus Strings (Aktienticker, UPPERCASE)
+sectors: Array aus Strings (GICS-ähnlich)
+asset_classes: Teilmenge von [Equity, Rates, Credit, Commodities, FX]
+regions: Teilmenge von [US, EU, CH, UK, JP, EM]
+confidence: Float 0..1 (Sicherheit bzgl. event_type)
+
+TITLE: {title}
+BODY: {body}
+TICKER_HINTS: {hints}
+
+Nur JSON ausgeben, keine Prosa.
+""", model_key="classify", budgets={"title": 60, "body": 400}, max_new_tokens=160))
+
+_register(PromptTemplate("summarize", """
+Du verfasst kompakte Analysten-Karten im Stil von Wellershoff & Partners.
+
+STIL:
+- Neutral, faktenbasiert, knapp. Zahlen zuerst, dann eine Linie Kontext.
+- Kurze Hauptsätze, wenige Adjektive. „stieg/fiel/unverändert“, nicht „sprang/stürzte“.
+- Makro-bewusst (Basiseffekte, Kern vs. Gesamt, real vs. nominal, Bewertung vs. Ertrag, Politikrahmen).
+- Formulierungen: „bleibt“, „deutet auf“, „stützt“, „belastet“, „Spielraum ist gering“, „Risiken sind asymmetrisch“.
+- Keine Ratschläge, keine Ausrufe, keine Spekulation außer wenn explizit im INPUT.
+- Zahlen mit Einheiten (%, bp, YoY/QoQ, Niveaus, Vergleich).
+
+STRUKTUR (genau 3 Bulletpoints, je 7–18 Wörter):
+1) Kontext — Was das Unternehmen/der Emittent ist (Kernaktivität).
+2) Narrativ — Was jetzt passiert (Aktion/Ereignis) mit relevantesten Zahlen.
+3) Wirkung/Jetzt — Warum es jetzt zählt; Reaktion/Guidance/Bewertung falls vorhanden.
+
+AUSGABE
+Gib JSON mit GENAU diesen Schlüsseln zurück:
+- "headline": string (<= 90 Zeichen), rein sachlich.
+- "bullets": genau 3 kurze Sätze (7–18 Wörter).
+- "why_it_matters": ein Satz (<= 40 Wörter), sachlich.
+
+REGELN
+- Immer alle Schlüssel ausgeben.
+- Wenn Infos nicht reichen: why_it_matters = "Unzureichende Informationen für eine Einordnung."
+- Keine Emojis, keine Halbsätze, keine Semikolons.
+- Nur belegbare Fakten aus dem INPUT.
+
+INPUT
+TITLE: {title}
+BODY: {body}
+EVENT: {event}
+TICKERS: {tick}
+""", model_key="summarize", budgets={"title": 60, "body": 400}, max_new_tokens=320))
+
+_register(PromptTemplate("why", """
+Gib JSON mit genau einem Schlüssel zurück: "why_it_matters".
+- Wert: ein prägnanter deutscher Satz (<= 40 Wörter), warum die Meldung marktrelevant ist.
+- Wenn Infos nicht reichen: "Unzureichende Informationen für eine Einordnung."
+
+TITLE: {title}
+BODY: {body}
+EVENT: {event}
+TICKERS: {tick}
+""", model_key="summarize", budgets={"title": 60, "body": 200}, max_new_tokens=96))
+
+_register(PromptTemplate("analyze", """
+Du bist Klassifizierer UND Redakteur für Finanznachrichten (Analysten-Triage, Stil Wellershoff & Partners).
+Neutral, faktenbasiert, knapp. Nur belegbare Fakten aus dem INPUT. Keine Emojis, keine Semikolons.
+
+Gib STRENGES JSON mit GENAU diesen Schlüsseln zurück:
+- "event_type": eins aus [""" + ", ".join(EVENT_TYPES) + """]
+- "tickers": Array aus Strings (Aktienticker, UPPERCASE)
+- "sectors": Array aus Strings (GICS-ähnlich)
+- "asset_classes": Teilmenge von [Equity, Rates, Credit, Commodities, FX]
+- "regions": Teilmenge von [US, EU, CH, UK, JP, EM]
+- "confidence": Float 0..1 (Sicherheit bzgl. event_type)
+- "headline_de": deutsche Schlagzeile (<= 90 Zeichen), rein sachlich
+- "bullets": genau 3 deutsche Sätze (7–18 Wörter): 1) Kontext 2) Narrativ mit Zahlen 3) Wirkung/Jetzt
+- "why_it_matters": ein deutscher Satz (<= 40 Wörter); wenn Infos nicht reichen: "Unzureichende Informationen für eine Einordnung."
+
+INPUT
+TITLE: {title}
+BODY: {body}
+EVENT_HINT: {event}
+TICKER_HINTS: {hints}
+
+Nur JSON ausgeben, keine Prosa.
+""", model_key="analyze", budgets={"title": 60, "body": 450}, max_new_tokens=450))
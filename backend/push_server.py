@@ -0,0 +1,199 @@
+# push_server.py
+# ---------------------------------------------------------------------
+# Server-sent events (SSE) push of scored items, fed in-process by
+# pipeline.process():
+#   event: scored   → as soon as final confidence/severity is computed
+#                     (ceo_exit / mna first)
+#   event: summary  → again when the item's LLM summary lands
+#
+#   GET /events?min_severity=high&event_type=ceo_exit,mna&ticker=NVDA
+#   (reconnects resume via Last-Event-ID / ?since=N from a ring buffer)
+#
+#   python push_server.py --port 8002 --interval 300   # server + pipeline loop
+#   PUSH_PORT=8002 python pipeline.py                  # server for one run
+#
+# stdlib only; one thread per client, bounded per-client queues (a slow
+# client loses its oldest events, never blocks the pipeline).
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+PUSH_PORT        = int(os.getenv("PUSH_PORT", "0"))        # 0 = no server unless started explicitly
+PUSH_BUFFER      = int(os.getenv("PUSH_BUFFER", "500"))    # events kept for Last-Event-ID replay
+PUSH_CLIENT_MAX  = 256                                      # per-client queue
+PUSH_KEEPALIVE   = 15.0
+PRIORITY_EVENTS  = ("ceo_exit", "mna")                      # pushed first within a batch
+_SEV_RANK = {"low": 0, "med": 1, "high": 2}
+
+Event = Tuple[int, str, Dict[str, Any], str]   # (id, kind, data, json)
+
+
+class EventBus:
+    def __init__(self, buffer: int = PUSH_BUFFER):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._recent: deque = deque(maxlen=buffer)
+        self._subs: List[queue.Queue] = []
+        self.stats = {"emitted": 0, "dropped": 0}
+
+    def emit(self, kind: str, data: Dict[str, Any]) -> int:
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._lock:
+            self._seq += 1
+            ev: Event = (self._seq, kind, data, payload)
+            self._recent.append(ev)
+            subs = list(self._subs)
+        self.stats["emitted"] += 1
+        for q in subs:
+            try:
+                q.put_nowait(ev)
+            except queue.Full:
+                try:
+                    q.get_nowait()  # drop the oldest for this slow client
+                    self.stats["dropped"] += 1
+                    q.put_nowait(ev)
+                except (queue.Empty, queue.Full):
+                    pass
+        return ev[0]
+
+    def subscribe(self, since: Optional[int] = None) -> Tuple[queue.Queue, List[Event]]:
+        q: queue.Queue = queue.Queue(maxsize=PUSH_CLIENT_MAX)
+        with self._lock:
+            backlog = [ev for ev in self._recent if since is not None and ev[0] > since]
+            self._subs.append(q)
+        return q, backlog
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subs:
+                self._subs.remove(q)
+
+    @property
+    def clients(self) -> int:
+        return len(self._subs)
+
+
+_bus = EventBus()
+_server_thread: Optional[threading.Thread] = None
+
+
+def get_bus() -> EventBus:
+    return _bus
+
+
+def active() -> bool:
+    """True once the SSE server runs (pipeline skips building payloads otherwise)."""
+    return _server_thread is not None
+
+
+def emit(kind: str, data: Dict[str, Any]) -> None:
+    if active():
+        _bus.emit(kind, data)
+
+
+def _matches(data: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    if _SEV_RANK.get(data.get("severity") or "low", 0) < flt["min_sev"]:
+        return False
+    if flt["events"] and data.get("event_type") not in flt["events"]:
+        return False
+    if flt["tickers"] and not flt["tickers"] & set(data.get("tickers") or ()):
+        return False
+    return True
+
+
+def start(port: int = PUSH_PORT, host: str = "0.0.0.0") -> None:
+    """Start the SSE server in a daemon thread (idempotent)."""
+    global _server_thread
+    if _server_thread is not None or not port:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            if u.path != "/events":
+                self.send_error(404)
+                return
+            q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+            flt = {
+                "min_sev": _SEV_RANK.get(q.get("min_severity", "low"), 0),
+                "events": {e for e in q.get("event_type", "").split(",") if e},
+                "tickers": {t.upper() for t in q.get("ticker", "").split(",") if t},
+            }
+            since = self.headers.get("Last-Event-ID") or q.get("since")
+            try:
+                since = int(since) if since else None
+            except ValueError:
+                since = None
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "keep-alive")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+
+            sub, backlog = _bus.subscribe(since)
+            try:
+                self.wfile.write(b"retry: 3000\n\n")
+                for ev in backlog:
+                    self._send(ev, flt)
+                self.wfile.flush()
+                while True:
+                    try:
+                        ev = sub.get(timeout=PUSH_KEEPALIVE)
+                    except queue.Empty:
+                        self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                        continue
+                    self._send(ev, flt)
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                pass
+            finally:
+                _bus.unsubscribe(sub)
+
+        def _send(self, ev: Event, flt: Dict[str, Any]) -> None:
+            seq, kind, data, payload = ev
+            if _matches(data, flt):
+                self.wfile.write(f"id: {seq}\nevent: {kind}\ndata: {payload}\n\n".encode("utf-8"))
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    srv.daemon_threads = True
+    _server_thread = threading.Thread(target=srv.serve_forever, name="sse-push", daemon=True)
+    _server_thread.start()
+    print(f"[push] SSE on http://localhost:{port}/events")
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="SSE push server + pipeline loop.")
+    ap.add_argument("--port", type=int, default=PUSH_PORT or 8002)
+    ap.add_argument("--interval", type=float, default=300.0, help="seconds between pipeline runs")
+    ap.add_argument("--min-score", type=float, default=0.2)
+    ap.add_argument("--no-llm", action="store_true")
+    a = ap.parse_args()
+
+    start(a.port)
+    import pipeline
+    while True:
+        try:
+            out = pipeline.process(min_score=a.min_score, with_llm=not a.no_llm)
+            pipeline.write_minimal_entries(out["items"])
+        except Exception as e:
+            print(f"[push] pipeline run failed: {e}", flush=True)
+        print(f"[push] clients={_bus.clients} stats={_bus.stats}; next run in {a.interval:.0f}s", flush=True)
+        time.sleep(a.interval)
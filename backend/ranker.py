@@ -1,96 +1,400 @@
 # ranker.py
-import os, json, joblib, numpy as np, pandas as pd
+import os, json, zlib, hashlib, joblib, numpy as np, pandas as pd
+from dataclasses import dataclass, field, asdict
+from functools import cached_property
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from items import epoch_of
+from prompts import EVENT_TYPES
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.model_selection import StratifiedKFold, cross_validate
 
 MODEL_PATH = Path("models/news_ranker.joblib")
 MODEL_PATH.parent.mkdir(exist_ok=True)
+RANKER_MODEL   = os.getenv("RANKER_MODEL", "logreg")           # logreg | hgb (calibrated gradient boosting)
+HOLDOUT_FRAC   = float(os.getenv("RANKER_HOLDOUT", "0.25"))    # newest rows held out for the blend search
+DEFAULT_BLEND  = 0.3                                           # ml_weight used by process() / rescore / replay
+RANKER_BLEND   = os.getenv("RANKER_BLEND", "fixed")            # fixed (DEFAULT_BLEND) | searched (adopt the bundle's search)
 
-WATCHLIST = {"FDX","NVDA","INTC","CRWD","AMD","AAPL","MSFT","GOOGL","AMZN","TSLA"}
+from fanout import WATCHLIST  # same house watchlist as pipeline.py (env WATCHLIST)
+import weights as W          # heuristic weights (pipeline.score_item_base)
 
-def _hours_old(iso: str) -> float:
-    try:
-        dt = datetime.fromisoformat(iso.replace("Z","+00:00"))
-        now = datetime.now(timezone.utc)
-        return max(0.0, (now - dt).total_seconds()/3600.0)
-    except Exception:
-        return 0.0
-
-def build_features(items: List[Dict[str,Any]]) -> pd.DataFrame:
-    rows = []
-    for it in items:
+def _hours_old(it: Dict[str,Any], now: float) -> float:
+    # prefer the age stamped once per run, then the ingestion epoch, then parse
+    age = it.get("_age_h")
+    if age is not None and age == age:      # NaN-safe (pandas records)
+        return float(age)
+    ts = it.get("published_ts")
+    if ts is None or ts != ts:
+        ts = epoch_of(it.get("published_at") or "1970-01-01T00:00:00Z")
+    return 0.0 if ts is None else max(0.0, (now - ts) / 3600.0)
+
+def _novelty(it: Dict[str,Any]) -> float:
+    nov = it.get("_novelty")                # novelty.link_stories; unknown = new story
+    return 1.0 if nov is None or nov != nov else float(nov)
+
+# Fixed numeric columns (in CSV order); categorical columns follow (see FeatureSchema)
+BASE_COLS = ("sec_8k", "sec_10q", "sec_10k", "tier1", "urg_high", "urg_med", "kw_hits",
+             "has_tickers", "on_watch", "llm_conf", "hours_old", "novelty")
+_FLOAT_COLS = {"llm_conf", "hours_old", "novelty"}
+_COL_DEFAULTS = {"novelty": 1.0}   # value for rows written before the column existed (else 0)
+_KW_LIST = ("guidance","resigns","resignation","appointed","impairment",
+            "non-reliance","acquisition","merger","downgrade","upgrade","beats","misses")
+_TIER1_SRC = ("reuters","bloomberg","wsj","ft","cnbc","marketwatch")
+
+# classifier events + EDGAR Item events (pipeline.ITEM_MAP) + keyword/score-only events
+EVENT_VOCAB = tuple(dict.fromkeys(EVENT_TYPES + (
+    "termination_material_agreement", "new_debt_obligation", "triggering_event_debt", "impairment",
+    "restructuring_costs", "unregistered_sale", "security_holder_rights_change", "auditor_change",
+    "non_reliance", "shareholder_vote", "reg_fd", "geopolitics", "guidance_change")))
+REGION_VOCAB = ("US", "EU", "CH", "UK", "JP", "EM", "Global")
+
+
+@dataclass(frozen=True)
+class CategoricalField:
+    """One categorical item field → fixed columns.
+    Values in `vocab` get a named column (<prefix>_<value>); anything else is
+    hashed (crc32, stable across processes) into `buckets` columns <prefix>_h<k>."""
+    prefix: str
+    key: str
+    vocab: Tuple[str, ...] = ()
+    buckets: int = 0
+    multi: bool = False           # list-valued (sectors, regions) → multi-hot
+    default: Optional[str] = None
+    lower: bool = False
+
+    def cols(self) -> List[str]:
+        return [f"{self.prefix}_{v}" for v in self.vocab] + [f"{self.prefix}_h{k}" for k in range(self.buckets)]
+
+    def values(self, it: Dict[str, Any]) -> List[str]:
+        v = it.get(self.key)
+        vals = (list(v) if isinstance(v, (list, tuple, set)) else [v]) if v else []
+        if not vals and self.default:
+            vals = [self.default]
+        out = [str(x).strip() for x in vals if str(x).strip()]
+        return [x.lower() for x in out] if self.lower else out
+
+    @cached_property
+    def _memo(self) -> Dict[str, Optional[int]]:
+        return {v: k for k, v in enumerate(self.vocab)}
+
+    def offset(self, v: str) -> Optional[int]:
+        """Column offset of value `v` within this field's block (memoized)."""
+        memo = self._memo
+        if v not in memo:
+            memo[v] = (len(self.vocab) + zlib.crc32(f"{self.prefix}={v}".encode("utf-8")) % self.buckets
+                       if self.buckets else None)
+        return memo[v]
+
+    def offsets(self, it: Dict[str, Any]) -> List[int]:
+        vals = self.values(it)
+        out = [self.offset(v) for v in (vals if self.multi else vals[:1])]
+        return [k for k in out if k is not None]
+
+
+@dataclass(frozen=True)
+class FeatureSchema:
+    """Versioned column layout: BASE_COLS + one block per categorical field.
+    Stored in the model bundle, so inference builds exactly the trained layout."""
+    version: int
+    fields: Tuple[CategoricalField, ...] = field(default_factory=tuple)
+    base: Tuple[str, ...] = BASE_COLS
+
+    @property
+    def cols(self) -> List[str]:
+        return list(self.base) + [c for f in self.fields for c in f.cols()]
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha1(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()[:12]
+
+    def to_dict(self) -> dict:
+        return {"version": self.version, "base": list(self.base),
+                "fields": [{**asdict(f), "vocab": list(f.vocab)} for f in self.fields]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "FeatureSchema":
+        return cls(version=int(d["version"]), base=tuple(d.get("base") or BASE_COLS),
+                   fields=tuple(CategoricalField(**{**f, "vocab": tuple(f.get("vocab") or ())})
+                                for f in d.get("fields") or ()))
+
+
+# v1 = legacy bundles ({"model","cols"}, per-batch ev_* columns); v2 = fixed-width layout;
+# v3 = v2 + novelty
+SCHEMA = FeatureSchema(version=3, fields=(
+    CategoricalField("ev", "event_type", vocab=EVENT_VOCAB, buckets=4, default="other_events"),
+    CategoricalField("src", "source", buckets=16, lower=True),
+    CategoricalField("sector", "sectors", buckets=16, multi=True, lower=True),
+    CategoricalField("region", "regions", vocab=REGION_VOCAB, buckets=4, multi=True),
+))
+
+
+class FeatureMatrix:
+    """Features of one item batch, built once per run: X[row] ↔ ids[row], columns = cols."""
+
+    def __init__(self, ids: List[Any], cols: List[str], X: np.ndarray, y: List[Any],
+                 schema: Optional[FeatureSchema] = None):
+        self.ids, self.cols, self.X, self.y, self.schema = ids, list(cols), X, y, schema
+        self.index = {c: k for k, c in enumerate(self.cols)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, cols: List[str], sparse: bool = False):
+        """Columns in the given order (model schema); unknown columns are 0.
+        sparse=True → scipy CSR (the categorical blocks are mostly zeros)."""
+        if cols == self.cols:
+            out = self.X
+        else:
+            out = np.zeros((len(self.ids), len(cols)), dtype=self.X.dtype)
+            for k, c in enumerate(cols):
+                j = self.index.get(c)
+                if j is not None:
+                    out[:, k] = self.X[:, j]
+        if sparse:
+            from scipy.sparse import csr_matrix
+            return csr_matrix(out)
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        """Training-CSV layout: _id, base columns, y, ev_* (ints stay ints)."""
+        df = pd.DataFrame(self.X, columns=self.cols)
+        for c in self.cols:
+            if c not in _FLOAT_COLS:
+                df[c] = df[c].astype(int)
+        df.insert(0, "_id", self.ids)
+        df.insert(1 + len(BASE_COLS), "y", self.y)
+        return df
+
+
+def build_feature_matrix(items: List[Dict[str,Any]], now: Optional[float] = None,
+                         schema: FeatureSchema = SCHEMA) -> FeatureMatrix:
+    now = datetime.now(timezone.utc).timestamp() if now is None else now  # one reference per call
+    cols = schema.cols
+    n, nb = len(items), len(schema.base)
+    X = np.zeros((n, len(cols)), dtype=np.float64)
+    ids, ys, hot_r, hot_c = [], [], [], []
+    for r, it in enumerate(items):
         src = (it.get("source","") or "").lower()
         head = it.get("headline") or ""
-        et = (it.get("event_type") or "other_events")
         urg = (it.get("urgency") or "low")
-        kw_list = ("guidance","resigns","resignation","appointed","impairment",
-                   "non-reliance","acquisition","merger","downgrade","upgrade","beats","misses")
-        kw_hits = sum(kw in head.lower() for kw in kw_list)
         ticks = set(it.get("tickers") or [])
-        rows.append(dict(
-            _id = it.get("id"),
-            sec_8k  = int(src=="sec_edgar" and head.startswith("8-K")),
-            sec_10q = int(src=="sec_edgar" and head.startswith("10-Q")),
-            sec_10k = int(src=="sec_edgar" and head.startswith("10-K")),
-            tier1   = int(any(d in src for d in ("reuters","bloomberg","wsj","ft","cnbc","marketwatch"))),
-            urg_high= int(urg=="high"),
-            urg_med = int(urg=="med"),
-            kw_hits = kw_hits,
-            has_tickers = int(bool(ticks)),
-            on_watch    = int(bool(ticks & WATCHLIST)),
-            llm_conf    = float(it.get("_llm_conf") or 0.5),
-            hours_old   = _hours_old(it.get("published_at","") or "1970-01-01T00:00:00Z"),
-            event       = et,
-            y           = it.get("label")  # optional, for training rows you’ll fill later
-        ))
-    df = pd.DataFrame(rows)
-    # one-hot events
-    for ev in df["event"].fillna("other_events").unique():
-        df[f"ev_{ev}"] = (df["event"]==ev).astype(int)
-    df = df.drop(columns=["event"])
-    return df
-
-def fit_from_csv(csv_path: str, out_path: str = str(MODEL_PATH)) -> dict:
+        hl = head.lower()
+        is_sec = src == "sec_edgar"
+        X[r, :nb] = (
+            is_sec and head.startswith("8-K"),
+            is_sec and head.startswith("10-Q"),
+            is_sec and head.startswith("10-K"),
+            any(d in src for d in _TIER1_SRC),
+            urg == "high",
+            urg == "med",
+            sum(kw in hl for kw in _KW_LIST),
+            bool(ticks),
+            bool(ticks & WATCHLIST),
+            float(it.get("_llm_conf") or 0.5),
+            _hours_old(it, now),
+            _novelty(it),
+        )
+        start = nb
+        for f in schema.fields:
+            for k in f.offsets(it):
+                hot_r.append(r)
+                hot_c.append(start + k)
+            start += len(f.vocab) + f.buckets
+        ids.append(it.get("id"))
+        ys.append(it.get("label"))  # optional, for training rows you’ll fill later
+    if hot_r:
+        X[hot_r, hot_c] = 1.0
+    return FeatureMatrix(ids, cols, X, ys, schema)
+
+
+def build_features(items: List[Dict[str,Any]], now: Optional[float] = None) -> pd.DataFrame:
+    return build_feature_matrix(items, now).to_frame()
+
+
+def load_training_matrix(csv_path: str = "out/training_events.csv") -> FeatureMatrix:
+    """Training CSV as a FeatureMatrix; parsed once and cached as <csv>.npz until the CSV changes."""
+    p = Path(csv_path)
+    st = p.stat()
+    key = f"{st.st_mtime_ns}:{st.st_size}"
+    npz = p.with_suffix(".npz")
+    if npz.exists():
+        try:
+            with np.load(npz, allow_pickle=True) as z:
+                if str(z["key"]) == key:
+                    return FeatureMatrix(z["ids"].tolist(), z["cols"].tolist(), z["X"], z["y"].tolist())
+        except Exception:
+            pass
+    df = pd.read_csv(p)
+    cols = [c for c in df.columns if c not in ("_id", "y")]
+    fm = FeatureMatrix(df["_id"].tolist(), cols, df[cols].fillna(_COL_DEFAULTS).fillna(0).to_numpy(dtype=np.float64),
+                       df["y"].tolist() if "y" in df else [None] * len(df))
+    try:
+        np.savez(npz, key=key, ids=np.array(fm.ids, dtype=object), cols=np.array(cols, dtype=object),
+                 X=fm.X, y=np.array(fm.y, dtype=object))
+    except OSError:
+        pass
+    return fm
+
+def _make_model(model_type: str, n_rows: int):
+    """Unfitted estimator for `model_type` ("logreg" | "hgb")."""
+    if model_type == "logreg":
+        return LogisticRegression(max_iter=2000, class_weight="balanced")
+    if model_type == "hgb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        from sklearn.calibration import CalibratedClassifierCV
+        hgb = HistGradientBoostingClassifier(max_iter=200, learning_rate=0.08, max_leaf_nodes=15,
+                                             min_samples_leaf=10, l2_regularization=1.0,
+                                             class_weight="balanced", random_state=42)
+        # balanced trees over-predict positives → calibrate; isotonic needs enough rows.
+        # ensemble=False: one booster + calibrator, so inference is a single pass
+        return CalibratedClassifierCV(hgb, method="isotonic" if n_rows >= 1000 else "sigmoid",
+                                      cv=3, ensemble=False)
+    raise ValueError(f"unknown RANKER_MODEL {model_type!r} (logreg|hgb)")
+
+
+def _holdout_split(y: np.ndarray, frac: float = HOLDOUT_FRAC) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows are appended run by run → the newest `frac` is the held-out set
+    (stratified shuffle if that tail holds only one class)."""
+    n = len(y)
+    k = max(1, int(round(n * frac)))
+    idx = np.arange(n)
+    tr, te = idx[:-k], idx[-k:]
+    if len(np.unique(y[te])) < 2 or len(np.unique(y[tr])) < 2:
+        from sklearn.model_selection import train_test_split
+        tr, te = train_test_split(idx, test_size=frac, stratify=y, random_state=42)
+    return tr, te
+
+
+def search_blend_weight(prior: np.ndarray, ml: np.ndarray, y: np.ndarray,
+                        grid: np.ndarray = np.linspace(0.0, 1.0, 21)) -> Tuple[float, float]:
+    """Weight w maximizing average precision of (1-w)*prior + w*ml → (w, ap)."""
+    from sklearn.metrics import average_precision_score
+    best = (0.0, -1.0)
+    for w in grid:
+        ap = average_precision_score(y, (1.0 - w) * prior + w * ml)
+        if ap > best[1] + 1e-9:
+            best = (float(w), float(ap))
+    return best
+
+
+def prior_from_features(feat: pd.DataFrame, *, source_w: Optional[Dict[str,float]] = None,
+                        event_w: Optional[Dict[str,float]] = None, urgency_w: Optional[Dict[str,float]] = None,
+                        half_life_hours: float = 72) -> np.ndarray:
+    """Heuristic score (impact × time decay × follow-up discount) rebuilt from ranker feature rows
+    (training CSV layout) — the prior the ML score is blended with, used by
+    fit_from_csv(prior=…) to search the blend weight. Approximate:
+    tier1 / keyword columns use the ranker's shorter lists."""
+    sw = {**W.SOURCE_W, **(source_w or {})}
+    ew = {**W.EVENT_W, **(event_w or {})}
+    uw = {**W.URGENCY_W, **(urgency_w or {})}
+    col = lambda c, d: feat[c] if c in feat.columns else pd.Series(d, index=feat.index)
+    f = lambda c: pd.to_numeric(col(c, 0.0), errors="coerce").fillna(0.0).to_numpy()
+
+    s = np.where(f("tier1") > 0, sw["tier1_press"], sw["other_press"])
+    ev_hit = np.zeros(len(feat), dtype=bool)
+    for e, w in ew.items():
+        if e != "other_events" and f"ev_{e}" in feat.columns:
+            on = f(f"ev_{e}") > 0
+            s = s + np.where(on, w, 0.0)
+            ev_hit |= on
+    s = s + np.where(ev_hit, 0.0, ew["other_events"])
+    s = s + f("urg_high") * uw["high"] + f("urg_med") * uw["med"]
+    s = s + np.where(f("kw_hits") > 0, W.KEYWORD_NUDGE, 0.0)
+    s = s + np.where(f("has_tickers") > 0, W.TICKER_PRESENT, 0.0)
+    s = s + np.where(f("on_watch") > 0, W.WATCHLIST_BOOST, 0.0)
+    nov = pd.to_numeric(col("novelty", 1.0), errors="coerce").fillna(1.0).to_numpy()
+    return (np.minimum(s, W.MAX_SCORE) * np.power(0.5, f("hours_old") / half_life_hours)
+            * (1.0 - W.FOLLOWUP_PENALTY * (1.0 - nov)))
+
+
+def fit_from_csv(csv_path: str, out_path: str = str(MODEL_PATH), schema: FeatureSchema = SCHEMA,
+                 model_type: str = RANKER_MODEL,
+                 prior: Optional[Callable[[pd.DataFrame], np.ndarray]] = None,
+                 min_score: float = 0.2) -> dict:
+    """Train `model_type` on the labelled rows of the training CSV.
+    With `prior` (feature frame → heuristic score, e.g. prior_from_features)
+    the blend weight against the heuristic is searched on held-out rows and
+    stored in the bundle as a report ("blend_search"). AP only looks at the
+    order, not the scale process() filters on, so the report also carries the
+    share of held-out rows ≥ `min_score` at the searched and at the fixed
+    weight; blend_weight() only uses the search with RANKER_BLEND=searched."""
     df = pd.read_csv(csv_path)
+    df = df[df["y"].notna()].reset_index(drop=True)
     y = df["y"].astype(int).values
 
-    X = df.drop(columns=["_id","y"])
-    # Drop leaky columns
-    drop_cols = [c for c in X.columns if c.startswith("ev_")] + ["urg_high","urg_med"]
-    X = X.drop(columns=drop_cols, errors="ignore")
+    # Schema columns only (rows from older runs lack some → 0); drop leaky columns
+    # (event one-hots and urgency mirror how triage labels are made)
+    cols = [c for c in schema.cols if not c.startswith("ev_") and c not in ("urg_high", "urg_med")]
+    X = df.reindex(columns=cols).fillna(_COL_DEFAULTS).fillna(0)
 
-    model = LogisticRegression(max_iter=2000, class_weight="balanced")
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    roc = cross_val_score(model, X, y, cv=cv, scoring="roc_auc").mean()
-    pr  = cross_val_score(model, X, y, cv=cv, scoring="average_precision").mean()
-    model.fit(X, y)
-    joblib.dump({"model": model, "cols": list(X.columns)}, out_path)
-    return {"roc_auc": float(roc), "pr_auc": float(pr), "path": out_path}
+    scores = cross_validate(_make_model(model_type, len(y)), X, y, cv=cv, scoring=("roc_auc", "average_precision"))
+    roc, pr = scores["test_roc_auc"].mean(), scores["test_average_precision"].mean()
+
+    blend = None
+    if prior is not None:
+        tr, te = _holdout_split(y)
+        held = _make_model(model_type, len(tr)).fit(X.iloc[tr], y[tr])
+        p_te, ml_te = np.asarray(prior(df.iloc[te]), dtype=float), held.predict_proba(X.iloc[te])[:, 1]
+        w, ap = search_blend_weight(p_te, ml_te, y[te])
+        passing = lambda bw: float(np.mean((1.0 - bw) * p_te + bw * ml_te >= min_score))
+        blend = {"weight": w, "holdout_ap": ap, "holdout_rows": int(len(te)), "min_score": min_score,
+                 "pass_rate": passing(w), "pass_rate_fixed": passing(DEFAULT_BLEND)}
+
+    model = _make_model(model_type, len(y)).fit(X, y)
+    joblib.dump({"model": model, "cols": cols, "schema": schema.to_dict(),
+                 "model_type": model_type, "blend_search": blend}, out_path)
+    return {"roc_auc": float(roc), "pr_auc": float(pr), "path": out_path, "schema_version": schema.version,
+            "model_type": model_type, "blend": blend}
+
+
+_BUNDLES: Dict[str, tuple] = {}   # path → (mtime_ns, bundle)
+
+def _load_bundle(model_path: str) -> dict:
+    mt = os.stat(model_path).st_mtime_ns
+    hit = _BUNDLES.get(model_path)
+    if hit is None or hit[0] != mt:
+        hit = _BUNDLES[model_path] = (mt, joblib.load(model_path))
+    return hit[1]
 
 
-def infer_scores(items: List[Dict[str,Any]], model_path: str = str(MODEL_PATH)) -> Dict[str, float]:
-    """Return dict id -> probability (0..1). If model missing, return {}."""
+def blend_weight(model_path: str = str(MODEL_PATH), default: float = DEFAULT_BLEND,
+                 mode: str = RANKER_BLEND) -> float:
+    """ml_weight for the final blend: `default` unless mode="searched" adopts the
+    weight searched at fit time (fit_from_csv(prior=…)) — and the bundle has one."""
+    if mode != "searched" or not os.path.exists(model_path):
+        return default
+    b = _load_bundle(model_path)
+    w = (b.get("blend_search") or {}).get("weight", b.get("blend_weight"))
+    return default if w is None else float(w)
+
+
+def infer_scores(items: List[Dict[str,Any]], model_path: str = str(MODEL_PATH),
+                 now: Optional[float] = None, features: Optional[FeatureMatrix] = None) -> Dict[str, float]:
+    """Return dict id -> probability (0..1). If model missing, return {}.
+    Pass `features` (build_feature_matrix) to reuse this run's matrix."""
     if not os.path.exists(model_path):
         return {}
-    bundle = joblib.load(model_path)
+    bundle = _load_bundle(model_path)
     model, cols = bundle["model"], bundle["cols"]
-    df = build_features(items)
-    if not len(df):
+    # v2 bundles carry their schema; legacy {"model","cols"} bundles align by column name
+    schema = FeatureSchema.from_dict(bundle["schema"]) if bundle.get("schema") else SCHEMA
+    fm = features
+    if fm is None or (fm.schema is not None and fm.schema.fingerprint != schema.fingerprint):
+        fm = build_feature_matrix(items, now, schema)
+    if not len(fm):
         return {}
-    # align columns
-    for c in cols:
-        if c not in df.columns:
-            df[c] = 0
-    X = df[cols]
+    X = pd.DataFrame(fm.take(cols), columns=cols)   # named columns, as at fit time
     proba = model.predict_proba(X)[:,1]
-    return dict(zip(df["_id"].tolist(), proba))
+    return dict(zip(fm.ids, proba.tolist()))
 
-def append_training_rows(items: List[Dict[str,Any]], csv_out: str = "out/training_events.csv") -> None:
+def append_training_rows(items: List[Dict[str,Any]], csv_out: str = "out/training_events.csv",
+                         now: Optional[float] = None, features: Optional[FeatureMatrix] = None) -> None:
     """Dump feature rows with y missing; you’ll label later (click/keep/etc.)."""
-    df = build_features(items)
+    fm = features if features is not None else build_feature_matrix(items, now)
+    df = fm.to_frame()
     # Don’t overwrite labels if the row already exists
     p = Path(csv_out)
     if p.exists():
@@ -127,9 +431,36 @@ def show_weights(model_path=str(MODEL_PATH), top=40):
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"{model_path} not found. Train the model first with fit_from_csv().")
     bundle = joblib.load(model_path)
+    if not hasattr(bundle["model"], "coef_"):
+        raise TypeError(f"{bundle.get('model_type')} ranker has no coefficients (only logreg does).")
     coefs = pd.Series(bundle["model"].coef_[0], index=bundle["cols"])
     out = pd.DataFrame({"coef": coefs, "odds_ratio": np.exp(coefs)}) \
             .sort_values("coef", key=lambda s: s.abs(), ascending=False)
     print(out.head(top).to_string())
     return out
 
+
+
+if __name__ == "__main__":
+    # python ranker.py [logreg|hgb]   → train from out/training_events.csv, search the
+    #                                   blend weight, benchmark batch inference
+    import sys, time
+
+    csv = "out/training_events.csv"
+    for mt in (sys.argv[1:] or [RANKER_MODEL]):
+        path = str(MODEL_PATH) if mt == RANKER_MODEL else f"models/news_ranker_{mt}.joblib"
+        t0 = time.perf_counter()
+        res = fit_from_csv(csv, path, model_type=mt, prior=prior_from_features)
+        t1 = time.perf_counter()
+        fm = load_training_matrix(csv)
+        items = [{"id": i} for i in fm.ids] * max(1, 20000 // max(1, len(fm)))
+        fm = FeatureMatrix([it["id"] for it in items], fm.cols, np.tile(fm.X, (len(items) // len(fm), 1)), [], None)
+        t2 = time.perf_counter()
+        scores = infer_scores(items, path, features=fm)
+        t3 = time.perf_counter()
+        b = res["blend"] or {}
+        print(f"{mt:>6}: cv roc={res['roc_auc']:.3f} pr={res['pr_auc']:.3f}  "
+              f"searched w={b.get('weight')} (held-out ap={b.get('holdout_ap', float('nan')):.3f}, n={b.get('holdout_rows')}, "
+              f"≥{b.get('min_score')}: {b.get('pass_rate', float('nan')):.1%} vs {b.get('pass_rate_fixed', float('nan')):.1%} "
+              f"at w={DEFAULT_BLEND})  "
+              f"fit {t1-t0:.2f}s  infer {len(fm)} rows {(t3-t2)*1000:.0f} ms")
@@ -0,0 +1,273 @@
+# replay.py
+# ---------------------------------------------------------------------
+# Offline replay of past pipeline runs against analyst decisions.
+#
+# - runs: out/enriched/runs/YYYY-MM-DD.jsonl lists each run's ids and
+#   _ml_score; the rows are the newest version (by _run_ts) of each id in
+#   out/enriched/YYYY-MM-DD.jsonl at that run (files written before the
+#   runs list: one group of rows per _run_ts; without _run_ts: one run
+#   per day)
+# - relevance: approved.json (dashboard review → approve). Entries with
+#   "ids"/"urls" match directly; plain {"text": …} entries match an item
+#   whose headline / headline_de / draft_note_de appears in the approved
+#   text. This is independent of our own scoring, unlike the triage
+#   labels from label_from_triage().
+# - scorers, re-ranked per run with rescore.rescore() at that run's now:
+#     heuristic  impact × decay (ml_weight=0)
+#     ml         _ml_score (--reload-model: current model re-run)
+#     blend      ranker.blend_weight() (same as process())
+# - metrics per scorer: precision@k, NDCG@k (binary gains) over runs
+#   with ≥1 approved item, time-to-surface = hours from published to the
+#   first run the item is in the top k, share of approved items surfaced
+# - days replay in parallel (process pool, one day file per task; forked
+#   only while single-threaded, else forkserver — see parallel.pool_context)
+# - the report keeps every run's top-k ids; --baseline diffs metrics and
+#   top-k overlap against an earlier report → did a change alter what
+#   analysts see?
+#
+#   python replay.py --days 30 --k 10 --save out/replay/base.json
+#   RANKER_MODEL=hgb … python replay.py --reload-model --baseline out/replay/base.json
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import math
+import os
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+import pipeline as P
+from rescore import rescore
+from ranker import blend_weight
+from parallel import pool_context
+from snapshots import atomic_write_json
+
+REPLAY_K       = int(os.getenv("REPLAY_K", "10"))
+REPLAY_WORKERS = int(os.getenv("REPLAY_WORKERS", "-1"))       # -1 = all cores, 0/1 = serial
+APPROVED_PATH  = Path(os.getenv("APPROVED_PATH", "approved.json"))
+REPORT_PATH    = Path(os.getenv("REPLAY_REPORT", "out/replay/report.json"))
+MIN_MATCH_CHARS = 20          # shorter headlines are too generic for text matching
+SCORERS = ("heuristic", "ml", "blend")
+
+
+def _norm(s: Any) -> str:
+    return " ".join(str(s or "").lower().split())
+
+
+def load_approvals(path: Path = APPROVED_PATH) -> List[Dict[str, Any]]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"[replay] [warn] no approvals from {path}: {e}", flush=True)
+        return []
+    return [a for a in data if isinstance(a, dict)]
+
+
+def approved_ids(df: pd.DataFrame, approvals: List[Dict[str, Any]]) -> Set[str]:
+    """Item ids in `df` an analyst approved (explicit ids/urls, else text match)."""
+    ids: Set[str] = set()
+    present = set(df["id"])
+    by_url = dict(zip(df["url"], df["id"])) if "url" in df.columns else {}
+    texts: List[str] = []
+    for a in approvals:
+        ids.update(i for i in a.get("ids") or () if i in present)
+        ids.update(by_url[u] for u in a.get("urls") or () if u in by_url)
+        if a.get("text"):
+            texts.append(_norm(a["text"]))
+    if texts:
+        for col in ("headline_de", "draft_note_de", "headline"):
+            if col not in df.columns:
+                continue
+            for i, v in zip(df["id"], df[col]):
+                v = _norm(v) if isinstance(v, str) else ""
+                if len(v) >= MIN_MATCH_CHARS and any(v in t for t in texts):
+                    ids.add(i)
+    return ids
+
+
+def load_runs(path: Path) -> List[Tuple[float, pd.DataFrame]]:
+    """One day file → [(run_ts, rows of that run)], oldest run first."""
+    path = Path(path)
+    with path.open(encoding="utf-8") as f:
+        df = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    if df.empty:
+        return []
+    runs_path = path.parent / "runs" / path.name
+    if runs_path.exists() and "_run_ts" in df.columns:
+        with runs_path.open(encoding="utf-8") as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+        rts = pd.to_numeric(df["_run_ts"], errors="coerce")
+        out = []
+        for r in runs:
+            rt = float(r["_run_ts"])
+            cur = df[rts <= rt].drop_duplicates(subset=["id"], keep="last").set_index("id")
+            ids = [i for i in r["ids"] if i in cur.index]
+            g = cur.loc[ids].reset_index()
+            g["_ml_score"] = pd.to_numeric(pd.Series(dict(zip(r["ids"], r["ml"]))).reindex(ids).to_numpy(),
+                                           errors="coerce")
+            out.append((rt, g))
+        return out
+    if "_run_ts" not in df.columns:
+        df["_run_ts"] = np.nan
+    ts = pd.to_numeric(df.get("published_ts"), errors="coerce")
+    legacy = df["_run_ts"].isna()
+    if legacy.any():   # pre-_run_ts rows: one run at the newest item of the day
+        df.loc[legacy, "_run_ts"] = ts[legacy].max() if ts[legacy].notna().any() else 0.0
+    return [(float(rt), g.drop_duplicates(subset=["id"], keep="last").reset_index(drop=True))
+            for rt, g in df.groupby("_run_ts", sort=True)]
+
+
+def _ranked(df: pd.DataFrame, run_ts: float, reload_model: bool, w: float) -> Dict[str, List[str]]:
+    """Ids of one run ordered by each scorer (scorers without scores are left out)."""
+    now = datetime.fromtimestamp(run_ts, timezone.utc)
+    heur = rescore(df, ml_weight=0.0, reload_model=reload_model, now=now)
+    out = {"heuristic": heur["id"].tolist()}
+    ml = pd.to_numeric(heur.get("_ml_score"), errors="coerce") if "_ml_score" in heur else None
+    if ml is not None and ml.notna().any():
+        out["ml"] = heur.assign(_m=ml.fillna(-1.0)).sort_values("_m", ascending=False, kind="stable")["id"].tolist()
+        out["blend"] = rescore(heur, ml_weight=w, now=now)["id"].tolist()
+    return out
+
+
+def _ndcg(ranked: List[str], rel: Set[str], k: int) -> float:
+    dcg = sum(1.0 / math.log2(i + 2) for i, x in enumerate(ranked[:k]) if x in rel)
+    idcg = sum(1.0 / math.log2(i + 2) for i in range(min(k, len(rel))))
+    return dcg / idcg if idcg else 0.0
+
+
+def replay_day(path: str, approvals: List[Dict[str, Any]], k: int = REPLAY_K,
+               reload_model: bool = False) -> Dict[str, Any]:
+    """Replay every run of one day file → per-run metrics + top-k ids per scorer."""
+    runs = load_runs(Path(path))
+    w = blend_weight()
+    day = {"day": Path(path).stem, "runs": len(runs), "published": {}, "scorers": {}}
+    for run_ts, df in runs:
+        rel = approved_ids(df, approvals)
+        ts = pd.to_numeric(df.get("published_ts"), errors="coerce")
+        for i, t in zip(df["id"], ts):
+            if i in rel and t == t:
+                day["published"][i] = min(float(t), day["published"].get(i, float(t)))
+        for name, ranked in _ranked(df, run_ts, reload_model, w).items():
+            s = day["scorers"].setdefault(name, {"p_at_k": [], "ndcg": [], "surfaced": {}, "topk": {}})
+            top = ranked[:k]
+            s["topk"][f"{run_ts:.0f}"] = top
+            if rel:
+                s["p_at_k"].append(sum(x in rel for x in top) / k)
+                s["ndcg"].append(_ndcg(ranked, rel, k))
+            for x in top:
+                if x in rel and x not in s["surfaced"]:
+                    s["surfaced"][x] = run_ts
+    return day
+
+
+def _replay_job(args) -> Dict[str, Any]:
+    return replay_day(*args)
+
+
+def replay(days: int = 30, k: int = REPLAY_K, *, reload_model: bool = False,
+           approvals: Optional[List[Dict[str, Any]]] = None, directory: Path = P.ENRICHED_DIR,
+           workers: int = REPLAY_WORKERS) -> Dict[str, Any]:
+    """Replay the last `days` day files (in parallel) → report dict (see summarize())."""
+    approvals = load_approvals() if approvals is None else approvals
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+    files = [str(f) for f in sorted(Path(directory).glob("*.jsonl")) if f.stem >= cutoff]
+    jobs = [(f, approvals, k, reload_model) for f in files]
+    w = (os.cpu_count() or 1) if workers < 0 else workers
+    if w <= 1 or len(jobs) <= 1:
+        per_day = [_replay_job(j) for j in jobs]
+    else:   # jobs are (path, approvals, k, flag) → cheap to pickle when fork is unsafe
+        with ProcessPoolExecutor(max_workers=min(w, len(jobs)), mp_context=pool_context()) as pool:
+            per_day = list(pool.map(_replay_job, jobs))
+    return summarize(per_day, k)
+
+
+def summarize(per_day: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    published: Dict[str, float] = {}
+    for d in per_day:
+        for i, t in d["published"].items():
+            published[i] = min(t, published.get(i, t))
+    report: Dict[str, Any] = {"k": k, "days": [d["day"] for d in per_day],
+                              "runs": sum(d["runs"] for d in per_day), "approved_items": len(published),
+                              "scorers": {}}
+    for name in SCORERS:
+        parts = [d["scorers"][name] for d in per_day if name in d["scorers"]]
+        if not parts:
+            continue
+        p = [x for s in parts for x in s["p_at_k"]]
+        n = [x for s in parts for x in s["ndcg"]]
+        first: Dict[str, float] = {}
+        for s in parts:
+            for i, t in s["surfaced"].items():
+                first[i] = min(t, first.get(i, t))
+        tts = [max(0.0, (first[i] - published[i]) / 3600.0) for i in first if i in published]
+        report["scorers"][name] = {
+            "p_at_k": statistics.fmean(p) if p else None,
+            "ndcg": statistics.fmean(n) if n else None,
+            "tts_median_h": statistics.median(tts) if tts else None,
+            "surfaced": len(first) / len(published) if published else None,
+            "eval_runs": len(p),
+            "topk": {f"{d['day']}/{r}": ids for d in per_day if name in d["scorers"]
+                     for r, ids in d["scorers"][name]["topk"].items()},
+        }
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Metric deltas and mean top-k Jaccard overlap per scorer (runs present in both)."""
+    out = {}
+    for name, cur in report["scorers"].items():
+        base = baseline.get("scorers", {}).get(name)
+        if not base:
+            continue
+        shared = set(cur["topk"]) & set(base["topk"])
+        jac = [len(set(cur["topk"][r]) & set(base["topk"][r])) / max(1, len(set(cur["topk"][r]) | set(base["topk"][r])))
+               for r in shared]
+        out[name] = {m: (None if cur[m] is None or base[m] is None else cur[m] - base[m])
+                     for m in ("p_at_k", "ndcg", "tts_median_h", "surfaced")}
+        out[name]["topk_overlap"] = statistics.fmean(jac) if jac else None
+        out[name]["runs_changed"] = sum(j < 1.0 for j in jac)
+        out[name]["runs_compared"] = len(jac)
+    return out
+
+
+def _fmt(v: Optional[float], spec: str = ".3f") -> str:
+    return "—" if v is None else format(v, spec)
+
+
+if __name__ == "__main__":
+    import argparse, time
+    ap = argparse.ArgumentParser(description="Replay past runs against analyst approvals.")
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--k", type=int, default=REPLAY_K)
+    ap.add_argument("--reload-model", action="store_true", help="score with the current ranker model")
+    ap.add_argument("--approved", default=str(APPROVED_PATH))
+    ap.add_argument("--workers", type=int, default=REPLAY_WORKERS)
+    ap.add_argument("--baseline", help="earlier report.json to diff against")
+    ap.add_argument("--save", default=str(REPORT_PATH))
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    rep = replay(a.days, a.k, reload_model=a.reload_model, approvals=load_approvals(Path(a.approved)),
+                 workers=a.workers)
+    dt = time.perf_counter() - t0
+    print(f"replayed {len(rep['days'])} days / {rep['runs']} runs in {dt:.2f}s — "
+          f"{rep['approved_items']} approved items, k={a.k}")
+    print(f"{'scorer':>10} {'P@k':>7} {'NDCG@k':>7} {'TTS med h':>10} {'surfaced':>9} {'runs':>5}")
+    for name, m in rep["scorers"].items():
+        print(f"{name:>10} {_fmt(m['p_at_k']):>7} {_fmt(m['ndcg']):>7} {_fmt(m['tts_median_h'], '.1f'):>10} "
+              f"{_fmt(m['surfaced'], '.0%'):>9} {m['eval_runs']:>5}")
+    if a.baseline:
+        diff = compare(rep, json.loads(Path(a.baseline).read_text(encoding="utf-8")))
+        print(f"\nvs. {a.baseline}:")
+        for name, d in diff.items():
+            print(f"{name:>10} ΔP@k={_fmt(d['p_at_k'], '+.3f')} ΔNDCG={_fmt(d['ndcg'], '+.3f')} "
+                  f"ΔTTS={_fmt(d['tts_median_h'], '+.1f')}h  top-k overlap={_fmt(d['topk_overlap'])} "
+                  f"({d['runs_changed']}/{d['runs_compared']} runs changed)")
+    atomic_write_json(Path(a.save), rep)
+    print(f"report → {a.save}")
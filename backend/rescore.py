@@ -0,0 +1,181 @@
+# rescore.py
+# ---------------------------------------------------------------------
+# Re-rank persisted enriched items without fetching or calling the LLM.
+# Reloads out/enriched/*.jsonl (written by pipeline.process) and recomputes
+# confidence / severity / filtered feed in ONE vectorized pandas pass, so
+# SOURCE_W / EVENT_W / URGENCY_W / WATCHLIST / ranker tweaks can be tried
+# interactively:
+#
+#   python rescore.py --days 7 --ml-weight 0.4 --reload-model
+#   >>> rescore(load_enriched(7), event_w={"mna": 0.4})
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import re
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+import pipeline as P
+from ranker import infer_scores, blend_weight, prior_from_features  # prior_from_features re-exported (lives in ranker.py)
+
+
+def load_enriched(days: int = 7, directory: Path = P.ENRICHED_DIR) -> pd.DataFrame:
+    """Last `days` daily files → one row per item id (latest version wins). Rows are only
+    rewritten when an item changes, so _ml_score comes from the newest run that saw it
+    (out/enriched/runs/, see pipeline.persist_enriched)."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+    rows: List[Dict[str, Any]] = []
+    ml: Dict[str, Any] = {}
+    for f in sorted(Path(directory).glob("*.jsonl")):
+        if f.stem < cutoff:
+            continue
+        with f.open(encoding="utf-8") as fh:
+            rows.extend(json.loads(line) for line in fh if line.strip())
+        runs = f.parent / "runs" / f.name
+        if runs.exists():
+            with runs.open(encoding="utf-8") as fh:
+                last = next((line for line in reversed(fh.readlines()) if line.strip()), None)
+            if last:
+                r = json.loads(last)
+                ml.update(zip(r["ids"], r["ml"]))
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows).drop_duplicates(subset=["id"], keep="last").reset_index(drop=True)
+    if ml:
+        fresh = pd.to_numeric(df["id"].map(ml), errors="coerce")
+        df["_ml_score"] = fresh.where(fresh.notna(), pd.to_numeric(_col(df, "_ml_score", np.nan), errors="coerce"))
+    return df
+
+
+def _col(df: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    if name in df.columns:
+        return df[name]
+    return pd.Series([default] * len(df), index=df.index)
+
+
+def base_scores(df: pd.DataFrame, *, source_w: Dict[str, float], event_w: Dict[str, float],
+                urgency_w: Dict[str, float], watchlist: Iterable[str]) -> pd.Series:
+    """Vectorized pipeline.score_item_base (undecayed impact)."""
+    src = _col(df, "source", "").fillna("").str.lower()
+    tier1 = src.str.contains("|".join(re.escape(d) for d in P.TIER1), regex=True)
+    s = np.where(tier1, source_w["tier1_press"], source_w["other_press"])
+
+    et = _col(df, "event_type", None).fillna("other_events")
+    s = s + et.map(event_w).fillna(event_w["other_events"]).to_numpy()
+    urg = _col(df, "urgency", None).fillna("low")
+    s = s + urg.map(urgency_w).fillna(0.0).to_numpy()
+
+    head = _col(df, "headline", "").fillna("").str.lower()
+    kw = head.str.contains("|".join(re.escape(k) for k in P.HEADLINE_KEYWORDS), regex=True)
+    s = s + np.where(kw, P.KEYWORD_NUDGE, 0.0)
+
+    tick = _col(df, "tickers", None).apply(lambda t: t if isinstance(t, list) else [])
+    s = s + np.where(tick.str.len() > 0, P.TICKER_PRESENT, 0.0)
+    exploded = tick.explode()
+    on_watch = exploded.isin(set(watchlist)).groupby(level=0).any().reindex(df.index, fill_value=False)
+    s = s + np.where(on_watch, P.WATCHLIST_BOOST, 0.0)
+    return pd.Series(np.minimum(s, P.MAX_SCORE), index=df.index)
+
+
+def rescore(df: pd.DataFrame, *, min_score: float = 0.2, ml_weight: Optional[float] = None,
+            source_w: Optional[Dict[str, float]] = None, event_w: Optional[Dict[str, float]] = None,
+            urgency_w: Optional[Dict[str, float]] = None, watchlist: Optional[Iterable[str]] = None,
+            reload_model: bool = False, model_path: Optional[str] = None,
+            now: Optional[datetime] = None, half_life_hours: float = 72) -> pd.DataFrame:
+    """
+    Same blend as process() steps 6–8. Weight dicts are merged over the
+    pipeline defaults; `reload_model=True` re-runs the ranker over all rows.
+    ml_weight=None → ranker.blend_weight() (0.3 unless RANKER_BLEND=searched).
+    Returns df with impact / confidence / severity / relevant columns.
+    """
+    if df.empty:
+        return df
+    df = df.copy()
+    sw = {**P.SOURCE_W, **(source_w or {})}
+    ew = {**P.EVENT_W, **(event_w or {})}
+    uw = {**P.URGENCY_W, **(urgency_w or {})}
+    wl = set(watchlist) if watchlist is not None else P.WATCHLIST
+
+    impact = base_scores(df, source_w=sw, event_w=ew, urgency_w=uw, watchlist=wl)
+
+    now = now or datetime.now(timezone.utc)
+    ts = pd.to_numeric(_col(df, "published_ts", np.nan), errors="coerce")
+    if ts.isna().any():  # older rows without the ingestion epoch
+        parsed = pd.to_datetime(_col(df, "published_at", None), utc=True, errors="coerce")
+        ts = ts.fillna((parsed - pd.Timestamp(0, tz="UTC")).dt.total_seconds())
+    hours = ((now.timestamp() - ts) / 3600.0).fillna(0.0).clip(lower=0.0)
+    nov = pd.to_numeric(_col(df, "_novelty", np.nan), errors="coerce").fillna(1.0)
+    recent = impact * np.power(0.5, hours / half_life_hours) * (1.0 - P.FOLLOWUP_PENALTY * (1.0 - nov))
+
+    if reload_model:
+        # ages are recomputed against `now`, not the stored run's _age_h
+        recs = df.drop(columns=["_age_h"], errors="ignore").to_dict("records")
+        scores = infer_scores(recs, now=now.timestamp(), **({"model_path": model_path} if model_path else {}))
+        df["_ml_score"] = df["id"].map(scores)
+    if ml_weight is None:
+        ml_weight = blend_weight(**({"model_path": model_path} if model_path else {}))
+    ml = pd.to_numeric(_col(df, "_ml_score", np.nan), errors="coerce")
+    base = (1.0 - ml_weight) * recent + (ml_weight * ml).fillna(0.0)
+
+    llm = pd.to_numeric(_col(df, "_llm_conf", np.nan), errors="coerce")
+    base = base + (0.05 * (llm - 0.5)).fillna(0.0)
+
+    df["impact"] = impact
+    df["confidence"] = base.clip(0.0, 1.0)
+    df["severity"] = np.select([impact >= 0.80, impact >= 0.55], ["high", "med"], default="low")
+    df["relevant"] = df["confidence"] >= min_score
+    return df.sort_values("confidence", ascending=False)
+
+
+def _parse_weights(pairs: List[str] | None) -> Dict[str, float]:
+    out = {}
+    for p in pairs or []:
+        k, v = p.split("=", 1)
+        out[k.strip()] = float(v)
+    return out
+
+
+if __name__ == "__main__":
+    import time
+    ap = argparse.ArgumentParser(description="Re-rank persisted enriched items with new weights.")
+    ap.add_argument("--days", type=int, default=7)
+    ap.add_argument("--min-score", type=float, default=0.2)
+    ap.add_argument("--ml-weight", type=float, default=None, help="default: ranker.blend_weight()")
+    ap.add_argument("--source-w", nargs="*", help="e.g. tier1_press=0.35")
+    ap.add_argument("--event-w", nargs="*", help="e.g. mna=0.4 ceo_exit=0.3")
+    ap.add_argument("--urgency-w", nargs="*", help="e.g. high=0.2")
+    ap.add_argument("--watchlist", help="comma-separated tickers (default: pipeline WATCHLIST)")
+    ap.add_argument("--reload-model", action="store_true", help="re-run ranker inference")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", default="out/rescored.csv")
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df = load_enriched(a.days)
+    t1 = time.perf_counter()
+    res = rescore(
+        df, min_score=a.min_score, ml_weight=a.ml_weight,
+        source_w=_parse_weights(a.source_w), event_w=_parse_weights(a.event_w),
+        urgency_w=_parse_weights(a.urgency_w),
+        watchlist={t.strip().upper() for t in a.watchlist.split(",") if t.strip()} if a.watchlist else None,
+        reload_model=a.reload_model,
+    )
+    t2 = time.perf_counter()
+    if res.empty:
+        print("No enriched items found — run pipeline.py first.")
+    else:
+        rel = res[res["relevant"]]
+        print(f"loaded {len(df)} items in {t1-t0:.3f}s, rescored in {t2-t1:.3f}s — relevant={len(rel)}")
+        print(rel.groupby("severity").size().to_string())
+        cols = ["confidence", "severity", "event_type", "source", "headline"]
+        print(rel[cols].head(a.top).to_string(index=False, max_colwidth=80))
+        Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+        rel.reindex(columns=["id", "published_at", "source", "headline", "tickers", "event_type",
+                             "impact", "confidence", "severity", "url"]).to_csv(a.out, index=False)
+        print(f"Saved: {a.out}")
@@ -0,0 +1,162 @@
+# snapshots.py
+# ---------------------------------------------------------------------
+# Versioned, atomically published analyst-feed snapshots.
+#
+#   out/feed/snapshots/000042.json   full feed at version 42 (immutable)
+#   out/feed/deltas/000042.json      upserts/removals vs. version 41
+#   out/feed/current.json            pointer → latest version
+#   out/feed_min.json                legacy copy (same atomic replace)
+#
+# Every file is written to a temp file in the same directory and then
+# os.replace()d, so readers never see torn JSON and never need a lock:
+# read current.json, then the (immutable) snapshot it points to.
+# Consumers poll changes_since(N) instead of re-downloading the feed.
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+FEED_DIR      = Path(os.getenv("FEED_DIR", "out/feed"))
+LEGACY_PATH   = Path("out/feed_min.json")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "50"))   # snapshots/deltas kept on disk
+
+
+def atomic_write_json(path: Path, obj: Any, *, indent: int | None = None) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _digest(entry: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _name(version: int) -> str:
+    return f"{version:06d}.json"
+
+
+class FeedPublisher:
+    """Single writer. Versions keep increasing across runs (resumed from current.json)."""
+
+    def __init__(self, directory: Path = FEED_DIR, *, keep: int = SNAPSHOT_KEEP,
+                 legacy_path: Optional[Path] = LEGACY_PATH):
+        self.dir = Path(directory)
+        self.keep = keep
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._lock = threading.Lock()
+        cur = read_pointer(self.dir)
+        self.version = cur["version"] if cur else 0
+        self._digests: Dict[str, str] = {}
+        if cur:
+            snap = _read_json(self.dir / cur["snapshot"])
+            self._digests = {e["id"]: _digest(e) for e in (snap or {}).get("items", [])}
+
+    def publish(self, entries: List[Dict[str, Any]], *, final: bool = False) -> int:
+        """Write snapshot + delta, then flip the pointer. Returns the new version."""
+        with self._lock:
+            digests = {e["id"]: _digest(e) for e in entries}
+            upserts = [e for e in entries if self._digests.get(e["id"]) != digests[e["id"]]]
+            removed = [i for i in self._digests if i not in digests]
+            if self.version and not upserts and not removed and not final:
+                return self.version  # nothing changed
+
+            base, self.version = self.version, self.version + 1
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            snap_rel = f"snapshots/{_name(self.version)}"
+            atomic_write_json(self.dir / snap_rel, {
+                "version": self.version, "generated_at": now, "final": final, "items": entries})
+            atomic_write_json(self.dir / "deltas" / _name(self.version), {
+                "version": self.version, "base_version": base, "generated_at": now,
+                "upserts": upserts, "removed": removed})
+            atomic_write_json(self.dir / "current.json", {
+                "version": self.version, "snapshot": snap_rel, "generated_at": now,
+                "count": len(entries), "final": final})
+            if self.legacy_path:
+                atomic_write_json(self.legacy_path, entries, indent=2)
+            self._digests = digests
+            self._prune()
+            return self.version
+
+    def _prune(self) -> None:
+        # Readers holding an older pointer retry (read_current) or fall back to a full snapshot
+        for sub in ("snapshots", "deltas"):
+            files = sorted((self.dir / sub).glob("*.json"))
+            for f in files[:-self.keep] if self.keep > 0 else []:
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+
+_publisher: Optional[FeedPublisher] = None
+
+
+def get_publisher() -> FeedPublisher:
+    global _publisher
+    if _publisher is None:
+        _publisher = FeedPublisher()
+    return _publisher
+
+
+# -------------------- readers (no locks) --------------------
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with Path(path).open(encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_pointer(directory: Path = FEED_DIR) -> Optional[Dict[str, Any]]:
+    return _read_json(Path(directory) / "current.json")
+
+
+def read_current(directory: Path = FEED_DIR, retries: int = 3) -> Optional[Dict[str, Any]]:
+    """Latest full snapshot ({"version", "items", …}) or None if nothing published yet."""
+    for _ in range(retries):
+        cur = read_pointer(directory)
+        if not cur:
+            return None
+        snap = _read_json(Path(directory) / cur["snapshot"])
+        if snap is not None:
+            return snap
+        time.sleep(0.01)  # pruned between pointer and snapshot read → re-read pointer
+    return None
+
+
+def changes_since(version: int, directory: Path = FEED_DIR) -> Dict[str, Any]:
+    """
+    Net changes after `version`: {"version", "upserts", "removed", "full"}.
+    If a needed delta was pruned, returns the whole current feed with full=True.
+    """
+    directory = Path(directory)
+    cur = read_pointer(directory)
+    if not cur or version >= cur["version"]:
+        return {"version": cur["version"] if cur else 0, "upserts": [], "removed": [], "full": False}
+
+    upserts: Dict[str, Dict[str, Any]] = {}
+    removed: set = set()
+    for v in range(version + 1, cur["version"] + 1):
+        d = _read_json(directory / "deltas" / _name(v))
+        if d is None:
+            snap = read_current(directory) or {"version": cur["version"], "items": []}
+            return {"version": snap["version"], "upserts": snap["items"], "removed": [], "full": True}
+        for e in d["upserts"]:
+            upserts[e["id"]] = e
+            removed.discard(e["id"])
+        for i in d["removed"]:
+            upserts.pop(i, None)
+            removed.add(i)
+    return {"version": cur["version"], "upserts": list(upserts.values()), "removed": sorted(removed),
+            "full": False}
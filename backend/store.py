@@ -0,0 +1,453 @@
+# store.py
+# ---------------------------------------------------------------------
+# Embedded item store (SQLite, WAL mode) for items, enrichment, scores,
+# summaries, minimal feed entries and labels.
+# - indexes on published_ts, (severity, ts), (event_type, ts), (ticker, ts)
+# - keyset pagination (published_ts, id) → "high, last 24h, NVDA" in ms
+# - readers never block the pipeline writer (WAL)
+# - FTS5 full-text index over headline, headline_de, body_text,
+#   why_it_matters and bullets, updated incrementally on every upsert;
+#   bm25-ranked search with ticker / event / severity facets
+#
+#   python store.py query --severity high --hours 24 --ticker NVDA
+#   python store.py search "CEO tritt zurück" --ticker NVDA
+#   python store.py serve --port 8001      # GET /api/items?…  GET /api/search?q=…
+#                                          # GET /api/feed/current, /api/feed/changes?since=N
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from items import as_dict, item_ts
+
+STORE_PATH = Path(os.getenv("STORE_PATH", "out/items.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    -- small, hot columns first: SQLite reads columns in order, so anything
+    -- placed after the large text blobs would cost overflow-page reads
+    rid             INTEGER PRIMARY KEY,  -- explicit rowid alias: items_fts key, survives VACUUM
+    id              TEXT NOT NULL UNIQUE,
+    published_at    TEXT,
+    published_ts    REAL,
+    source          TEXT,
+    event_type      TEXT,
+    urgency         TEXT,
+    severity        TEXT,
+    confidence      REAL,
+    ml_score        REAL,
+    llm_conf        REAL,
+    label           INTEGER,
+    updated_at      REAL,
+    tickers         TEXT,   -- JSON arrays
+    sectors         TEXT,
+    regions         TEXT,
+    asset_classes   TEXT,
+    url             TEXT,
+    headline        TEXT,
+    headline_de     TEXT,
+    why_it_matters  TEXT,
+    draft_note_de   TEXT,
+    bullets         TEXT,
+    entry           TEXT,   -- minimal feed entry JSON (to_minimal_entry)
+    body_text       TEXT,
+    raw             TEXT    -- full enriched item JSON
+);
+CREATE TABLE IF NOT EXISTS item_tickers (
+    ticker          TEXT NOT NULL,
+    item_id         TEXT NOT NULL,
+    published_ts    REAL,
+    PRIMARY KEY (ticker, item_id)
+);
+CREATE INDEX IF NOT EXISTS ix_items_ts       ON items(published_ts DESC, id);
+CREATE INDEX IF NOT EXISTS ix_items_sev_ts   ON items(severity, published_ts DESC);
+CREATE INDEX IF NOT EXISTS ix_items_event_ts ON items(event_type, published_ts DESC);
+CREATE INDEX IF NOT EXISTS ix_tickers_ts     ON item_tickers(ticker, published_ts DESC);
+CREATE INDEX IF NOT EXISTS ix_tickers_item   ON item_tickers(item_id);
+-- items_fts.rowid = items.rid (stable across ON CONFLICT updates and VACUUM) → O(log n) re-index
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    headline, headline_de, body_text, why_it_matters, bullets,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# bm25 column weights: headline, headline_de, body_text, why_it_matters, bullets
+_FTS_WEIGHTS = (5.0, 5.0, 1.0, 2.0, 2.0)
+_FTS_COLS = "headline, headline_de, body_text, why_it_matters, bullets"
+_FTS_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(q: str) -> str:
+    """Plain user text → safe FTS5 query (all terms required, last one as prefix if >= 4 chars)."""
+    toks = _FTS_TOKEN.findall(q or "")
+    if not toks:
+        return ""
+    parts = [f'"{t}"' for t in toks]
+    if len(toks[-1]) >= 4:
+        parts[-1] += "*"
+    return " ".join(parts)
+
+# Columns where a later run without LLM output must not erase earlier output
+_KEEP_IF_NULL = ("headline_de", "bullets", "why_it_matters", "draft_note_de", "entry",
+                 "ml_score", "llm_conf", "sectors", "regions", "asset_classes")
+
+
+def _js(v) -> Optional[str]:
+    return None if v in (None, [], "") else json.dumps(v, ensure_ascii=False)
+
+
+class ItemStore:
+    def __init__(self, path: Path | str = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as c:
+            self._migrate(c)
+            c.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            c.row_factory = sqlite3.Row
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+    def _migrate(self, c: sqlite3.Connection) -> None:
+        """Stores created before `rid` keyed items_fts on the implicit rowid, which
+        VACUUM may renumber for a TEXT-keyed table → copy into the new layout once."""
+        old = [r[1] for r in c.execute("PRAGMA table_info(items)")]
+        if not old or "rid" in old:
+            return
+        cols = ", ".join(old)
+        drops = "".join(f"DROP INDEX IF EXISTS {r[0]};\n" for r in c.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'items' AND sql IS NOT NULL"))
+        c.executescript(f"""
+            BEGIN;
+            ALTER TABLE items RENAME TO _items_v1;
+            {drops}
+            {_SCHEMA}
+            INSERT INTO items (rid, {cols}) SELECT rowid, {cols} FROM _items_v1;
+            DROP TABLE _items_v1;
+            DELETE FROM items_fts;
+            INSERT INTO items_fts (rowid, {_FTS_COLS}) SELECT rid, {_FTS_COLS} FROM items;
+            COMMIT;
+        """)
+        print(f"[store] migrated {self.path} → items.rid ({self.count()} items re-indexed)", flush=True)
+
+    # -------------------- writes --------------------
+
+    def upsert_items(self, items: Iterable[Dict[str, Any]]) -> int:
+        now = time.time()
+        rows, tick_rows = [], []
+        for it in items:
+            ts = item_ts(it)
+            tickers = sorted({str(t).upper() for t in (it.get("tickers") or []) if t})
+            rows.append((
+                it["id"], it.get("published_at"), ts, it.get("source"), it.get("url"),
+                it.get("headline"), it.get("headline_de"), it.get("body_text"),
+                it.get("event_type"), it.get("urgency"), it.get("severity"), it.get("confidence"),
+                it.get("_ml_score"), it.get("_llm_conf"),
+                _js(it.get("sectors")), _js(it.get("regions")), _js(it.get("asset_classes")), _js(tickers),
+                _js(it.get("bullets")), it.get("why_it_matters"), it.get("draft_note_de"),
+                json.dumps(as_dict(it), ensure_ascii=False, default=str), now,
+            ))
+            tick_rows.extend((t, it["id"], ts) for t in tickers)
+        if not rows:
+            return 0
+        keep = ", ".join(f"{c}=COALESCE(excluded.{c}, items.{c})" for c in _KEEP_IF_NULL if c != "entry")
+        plain = ("published_at", "published_ts", "source", "url", "headline", "body_text", "event_type",
+                 "urgency", "severity", "confidence", "tickers", "raw", "updated_at")
+        sets = ", ".join(f"{c}=excluded.{c}" for c in plain)
+        c = self._conn()
+        with c:
+            c.executemany(f"""
+                INSERT INTO items (id, published_at, published_ts, source, url, headline, headline_de,
+                    body_text, event_type, urgency, severity, confidence, ml_score, llm_conf,
+                    sectors, regions, asset_classes, tickers, bullets, why_it_matters, draft_note_de,
+                    raw, updated_at)
+                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(id) DO UPDATE SET {sets}, {keep}
+            """, rows)
+            c.executemany("DELETE FROM item_tickers WHERE item_id = ?", [(r[0],) for r in rows])
+            c.executemany("INSERT OR REPLACE INTO item_tickers (ticker, item_id, published_ts) VALUES (?,?,?)",
+                          tick_rows)
+            self._index_text(c, [r[0] for r in rows])
+        return len(rows)
+
+    def _index_text(self, c: sqlite3.Connection, ids: List[str]) -> None:
+        """(Re-)index the merged text columns of `ids` in items_fts."""
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            c.execute(f"DELETE FROM items_fts WHERE rowid IN (SELECT rid FROM items WHERE id IN ({marks}))", chunk)
+            c.execute(f"INSERT INTO items_fts (rowid, {_FTS_COLS}) "
+                      f"SELECT rid, {_FTS_COLS} FROM items WHERE id IN ({marks})", chunk)
+
+    def rebuild_fts(self) -> int:
+        c = self._conn()
+        with c:
+            c.execute("DELETE FROM items_fts")
+            c.execute(f"INSERT INTO items_fts (rowid, {_FTS_COLS}) SELECT rid, {_FTS_COLS} FROM items")
+            c.execute("INSERT INTO items_fts(items_fts) VALUES ('optimize')")
+        return self.count()
+
+    def upsert_entries(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Attach minimal feed entries (frontend shape) to their items."""
+        rows = [(json.dumps(e, ensure_ascii=False), e["id"]) for e in entries if e.get("id")]
+        c = self._conn()
+        with c:
+            c.executemany("UPDATE items SET entry = ? WHERE id = ?", rows)
+        return len(rows)
+
+    def set_labels(self, labels: Dict[str, int]) -> int:
+        c = self._conn()
+        with c:
+            c.executemany("UPDATE items SET label = ? WHERE id = ?", [(int(v), k) for k, v in labels.items()])
+        return len(labels)
+
+    # -------------------- reads --------------------
+
+    def query_items(self, *, severity: str | None = None, event_type: str | None = None,
+                    ticker: str | None = None, since_hours: float | None = None,
+                    min_confidence: float | None = None, limit: int = 50,
+                    cursor: Tuple[float, str] | None = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Newest first. Returns {"items": [...], "next_cursor": (ts, id) | None}.
+        Each item is the minimal feed entry when available (else core columns);
+        `full=True` returns the whole enriched item instead.
+        """
+        where, args = [], []
+        if ticker:
+            frm = "item_tickers t JOIN items i ON i.id = t.item_id"
+            where.append("t.ticker = ?"); args.append(ticker.upper())
+            ts_col = "t.published_ts"
+        else:
+            frm = "items i"
+            ts_col = "i.published_ts"
+        if since_hours is not None:
+            where.append(f"{ts_col} >= ?"); args.append(time.time() - since_hours * 3600.0)
+        if severity:
+            where.append("i.severity = ?"); args.append(severity)
+        if event_type:
+            where.append("i.event_type = ?"); args.append(event_type)
+        if min_confidence is not None:
+            where.append("i.confidence >= ?"); args.append(min_confidence)
+        if cursor:
+            where.append(f"({ts_col}, i.id) < (?, ?)"); args.extend(cursor)
+        sql = (f"SELECT i.id, {ts_col} AS ts, i.published_at, i.source, i.url, i.headline, i.headline_de, "
+               f"i.event_type, i.severity, i.confidence, i.tickers, i.why_it_matters, i.entry"
+               f"{', i.raw' if full else ''} FROM {frm}"
+               f"{' WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY {ts_col} DESC, i.id DESC LIMIT ?")
+        args.append(int(limit))
+        rows = self._conn().execute(sql, args).fetchall()
+
+        out = []
+        for r in rows:
+            if full:
+                out.append(json.loads(r["raw"]))
+            elif r["entry"]:
+                out.append(json.loads(r["entry"]))
+            else:
+                out.append({k: r[k] for k in ("id", "published_at", "source", "url", "headline", "headline_de",
+                                              "event_type", "severity", "confidence", "why_it_matters")}
+                           | {"tickers": json.loads(r["tickers"] or "[]")})
+        nxt = (rows[-1]["ts"], rows[-1]["id"]) if len(rows) == int(limit) else None
+        return {"items": out, "next_cursor": nxt}
+
+    def search(self, q: str, *, ticker: str | None = None, event_type: str | None = None,
+               severity: str | None = None, since_hours: float | None = None,
+               limit: int = 20, offset: int = 0, raw_query: bool = False) -> Dict[str, Any]:
+        """
+        bm25-ranked full-text search. Returns {"items", "total", "facets"}
+        where facets count ALL matches (before ticker/event/severity filters)
+        by event_type, severity and ticker.
+        """
+        match = q if raw_query else _fts_query(q)
+        if not match:
+            return {"items": [], "total": 0, "facets": {"event_type": {}, "severity": {}, "ticker": {}}}
+
+        c = self._conn()
+        # 1) evaluate the MATCH once → temp table with bm25 rank (facets, total and page read from it)
+        bm25 = f"bm25(items_fts, {', '.join(map(str, _FTS_WEIGHTS))})"
+        hit_sql, hit_args = f"SELECT rowid, {bm25} FROM items_fts WHERE items_fts MATCH ?", [match]
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS _hits (rid INTEGER PRIMARY KEY, rank REAL)")
+        c.execute("DELETE FROM _hits")
+        c.execute(f"INSERT INTO _hits (rid, rank) {hit_sql}", hit_args)
+        if since_hours is not None:
+            c.execute("DELETE FROM _hits WHERE rid IN (SELECT h.rid FROM _hits h CROSS JOIN items i ON i.rid = h.rid "
+                      "WHERE i.published_ts IS NULL OR i.published_ts < ?)", (time.time() - since_hours * 3600.0,))
+
+        facets = {
+            "event_type": dict(c.execute(
+                "SELECT COALESCE(i.event_type, 'other_events'), COUNT(*) FROM _hits h "
+                "JOIN items i ON i.rid = h.rid GROUP BY 1 ORDER BY 2 DESC").fetchall()),
+            "severity": dict(c.execute(
+                "SELECT COALESCE(i.severity, 'low'), COUNT(*) FROM _hits h "
+                "JOIN items i ON i.rid = h.rid GROUP BY 1 ORDER BY 2 DESC").fetchall()),
+            "ticker": dict(c.execute(
+                "SELECT t.ticker, COUNT(*) FROM _hits h CROSS JOIN items i ON i.rid = h.rid "
+                "JOIN item_tickers t ON t.item_id = i.id GROUP BY 1 ORDER BY 2 DESC LIMIT 25").fetchall()),
+        }
+
+        # 2) facet filters
+        where, args = [], []
+        if ticker:
+            where.append("EXISTS (SELECT 1 FROM item_tickers t WHERE t.item_id = i.id AND t.ticker = ?)")
+            args.append(ticker.upper())
+        if event_type:
+            where.append("i.event_type = ?"); args.append(event_type)
+        if severity:
+            where.append("i.severity = ?"); args.append(severity)
+        w = (" AND " + " AND ".join(where)) if where else ""
+        total = c.execute(f"SELECT COUNT(*) FROM _hits h CROSS JOIN items i ON i.rid = h.rid WHERE 1=1{w}",
+                          args).fetchone()[0]
+
+        # 3) ranked page, then snippets only for the page rows
+        rows = c.execute(f"""
+            SELECT h.rid, h.rank, i.id, i.published_at, i.source, i.url, i.headline, i.headline_de,
+                   i.event_type, i.severity, i.confidence, i.tickers, i.entry
+            FROM _hits h CROSS JOIN items i ON i.rid = h.rid
+            WHERE 1=1{w} ORDER BY h.rank LIMIT ? OFFSET ?
+        """, args + [int(limit), int(offset)]).fetchall()
+        snippets = {}
+        for r in rows:
+            sn = c.execute("SELECT snippet(items_fts, 2, '[', ']', '…', 12) FROM items_fts "
+                           "WHERE items_fts MATCH ? AND rowid = ?", (match, r["rid"])).fetchone()
+            snippets[r["rid"]] = sn[0] if sn else ""
+
+        items = []
+        for r in rows:
+            d = json.loads(r["entry"]) if r["entry"] else {
+                k: r[k] for k in ("id", "published_at", "source", "url", "headline", "headline_de",
+                                  "event_type", "severity", "confidence")}
+            d["tickers"] = json.loads(r["tickers"] or "[]")
+            d["score"] = -float(r["rank"])
+            d["snippet"] = snippets.get(r["rid"], "")
+            items.append(d)
+        return {"items": items, "total": total, "facets": facets}
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        r = self._conn().execute("SELECT raw FROM items WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(r["raw"]) if r else None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+_default: Optional[ItemStore] = None
+
+
+def get_store() -> ItemStore:
+    global _default
+    if _default is None:
+        _default = ItemStore()
+    return _default
+
+
+# -------------------- HTTP query API (stdlib) --------------------
+
+def _cursor_param(s: str | None) -> Tuple[float, str] | None:
+    if not s:
+        return None
+    ts, _id = s.split(":", 1)
+    return float(ts), _id
+
+
+def serve(port: int = 8001, store: ItemStore | None = None) -> None:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    from snapshots import read_current, changes_since
+
+    st = store or get_store()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            u = urlparse(self.path)
+            if u.path not in ("/api/items", "/api/search", "/api/feed/current", "/api/feed/changes"):
+                self.send_error(404)
+                return
+            q = {k: v[-1] for k, v in parse_qs(u.query).items()}
+            try:
+                hours = float(q["hours"]) if q.get("hours") else None
+                if u.path == "/api/feed/current":
+                    payload = read_current() or {"version": 0, "items": []}
+                elif u.path == "/api/feed/changes":
+                    payload = changes_since(int(q.get("since", 0)))
+                elif u.path == "/api/search":
+                    payload = st.search(
+                        q.get("q", ""), ticker=q.get("ticker"), event_type=q.get("event_type"),
+                        severity=q.get("severity"), since_hours=hours,
+                        limit=min(int(q.get("limit", 20)), 200), offset=int(q.get("offset", 0)),
+                    )
+                else:
+                    res = st.query_items(
+                        severity=q.get("severity"), event_type=q.get("event_type"), ticker=q.get("ticker"),
+                        since_hours=hours,
+                        min_confidence=float(q["min_confidence"]) if q.get("min_confidence") else None,
+                        limit=min(int(q.get("limit", 50)), 500), cursor=_cursor_param(q.get("cursor")),
+                    )
+                    nc = res["next_cursor"]
+                    payload = {"items": res["items"], "next_cursor": f"{nc[0]}:{nc[1]}" if nc else None}
+            except (ValueError, KeyError, sqlite3.OperationalError) as e:
+                self.send_error(400, str(e))
+                return
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    print(f"[store] serving {st.path} on http://localhost:{port}/api/items and /api/search")
+    ThreadingHTTPServer(("0.0.0.0", port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Query/serve the item store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    qp = sub.add_parser("query")
+    qp.add_argument("--severity"); qp.add_argument("--event-type"); qp.add_argument("--ticker")
+    qp.add_argument("--hours", type=float); qp.add_argument("--limit", type=int, default=20)
+    fp = sub.add_parser("search")
+    fp.add_argument("q"); fp.add_argument("--ticker"); fp.add_argument("--event-type")
+    fp.add_argument("--severity"); fp.add_argument("--hours", type=float); fp.add_argument("--limit", type=int, default=10)
+    sub.add_parser("reindex")
+    sp = sub.add_parser("serve")
+    sp.add_argument("--port", type=int, default=8001)
+    a = ap.parse_args()
+
+    if a.cmd == "serve":
+        serve(a.port)
+    elif a.cmd == "reindex":
+        print(f"re-indexed {get_store().rebuild_fts()} items")
+    elif a.cmd == "search":
+        t0 = time.perf_counter()
+        res = get_store().search(a.q, ticker=a.ticker, event_type=a.event_type, severity=a.severity,
+                                 since_hours=a.hours, limit=a.limit)
+        for it in res["items"]:
+            print(f"{it['score']:6.2f}  {it.get('published_at','')}  {it.get('title') or it.get('headline')}")
+            print(f"        {it['snippet']}")
+        print(json.dumps(res["facets"], ensure_ascii=False))
+        print(f"{res['total']} matches in {(time.perf_counter()-t0)*1000:.1f} ms")
+    else:
+        t0 = time.perf_counter()
+        res = get_store().query_items(severity=a.severity, event_type=a.event_type, ticker=a.ticker,
+                                      since_hours=a.hours, limit=a.limit)
+        print(json.dumps(res["items"], ensure_ascii=False, indent=2))
+        print(f"{len(res['items'])} items in {(time.perf_counter()-t0)*1000:.1f} ms")
@@ -3,6 +3,8 @@ import joblib, pandas as pd
 
 BUNDLE = joblib.load("models/news_ranker.joblib")
 model, cols = BUNDLE["model"], BUNDLE["cols"]
+if not hasattr(model, "coef_"):
+    raise SystemExit(f"{BUNDLE.get('model_type')} ranker has no coefficients — retrain with RANKER_MODEL=logreg to inspect weights.")
 
 # 1) Raw LR coefficients (log-odds per unit of the feature)
 coef = pd.Series(model.coef_[0], index=cols).sort_values(key=lambda s: s.abs(), ascending=False)
@@ -12,8 +14,9 @@ print(f"\nIntercept: {model.intercept_[0]:+.3f}")
 
 # 2) Optional: scale by feature std so you can compare effects fairly
 try:
-    df = pd.read_csv("out/training_events.csv")
-    std = df[cols].std(ddof=0).replace(0, 1)
+    from ranker import load_training_matrix   # same feature matrix as the pipeline, .npz-cached
+    fm = load_training_matrix("out/training_events.csv")
+    std = pd.Series(fm.take(cols).std(axis=0), index=cols).replace(0, 1)
     std_eff = (coef * std).sort_values(key=lambda s: s.abs(), ascending=False)
     print("\nStd-scaled effects (per 1σ increase):")
     print(std_eff.to_string(float_format=lambda x: f"{x:+.3f}"))
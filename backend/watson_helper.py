@@ -4,18 +4,34 @@
 # - Uses ModelInference (no deprecation warnings)
 # - Separate models for classify vs summarize (override via env)
 # - Small max_new_tokens for speed; greedy decoding for determinism
-# - Model instance cache (avoid re-init on every call)
+# - Model instances cached per (model_id, default params): switching
+#   models (A/B) or tweaking params only creates the new instance; the
+#   others stay warm
+# - One shared APIClient (one IAM token, one pooled HTTP session) for all
+#   model instances
+# - wx_warmup(): builds the default instances in a background thread;
+#   pipeline.process() starts it before fetching, so the first LLM call
+#   of a run doesn't pay auth + model init. A call that arrives while
+#   its instance is still warming up waits for it (per-key lock) instead
+#   of building a second one
+# - failed inits are remembered for WX_RETRY_S (no re-auth per call
+#   while the environment is broken)
+# - wx_healthcheck() cached for WX_HEALTH_TTL seconds
 # - Safe fallbacks: returns "" on any failure
 # ---------------------------------------------------------------------
 
 from __future__ import annotations
+import json
 import os
-from typing import Optional, Dict
+import threading
+import time
+from typing import Optional, Dict, Tuple
 
 try:
-    from ibm_watsonx_ai import Credentials
+    from ibm_watsonx_ai import APIClient, Credentials
     from ibm_watsonx_ai.foundation_models import ModelInference
 except Exception as e:  # SDK not installed or import problem
+    APIClient = None  # type: ignore
     Credentials = None  # type: ignore
     ModelInference = None  # type: ignore
     _IMPORT_ERR = e
@@ -41,9 +57,21 @@ SUMMARIZE_MODEL_ID = os.getenv("WATSONX_MODEL_ID_SUMMARIZE", DEFAULT_SUMMARIZE_M
 # Generation params (keep small for snappy UX)
 CLASSIFY_PARAMS  = {"decoding_method": "greedy", "max_new_tokens": 64, "temperature": 0.1}
 SUMMARIZE_PARAMS = {"decoding_method": "greedy", "max_new_tokens": 96, "temperature": 0.2}
+# Combined classify+summarize call returns one larger JSON object → needs more room
+ANALYZE_PARAMS   = {"decoding_method": "greedy", "max_new_tokens": 400, "temperature": 0.1}
 
-# Internal cache
-_models: Dict[str, "ModelInference"] = {}
+WX_HEALTH_TTL = float(os.getenv("WX_HEALTH_TTL", "300"))   # seconds a healthcheck result is reused
+WX_RETRY_S    = float(os.getenv("WX_RETRY_S", "60"))       # wait before re-trying a failed model init
+
+# Internal cache: (model_id, params key) → instance
+_ModelKey = Tuple[str, str]
+_models: Dict[_ModelKey, "ModelInference"] = {}
+_failed: Dict[_ModelKey, Tuple[float, str]] = {}            # key → (when, error)
+_key_locks: Dict[_ModelKey, threading.Lock] = {}
+_lock = threading.Lock()
+_client = None
+_health: Optional[Tuple[float, dict]] = None
+_warmup: Optional[threading.Thread] = None
 _last_error: Optional[str] = None
 
 
@@ -60,9 +88,35 @@ def _ctx_ok() -> bool:
     return True
 
 
-def _get_model(model_id: str, *, for_classify: bool = False) -> Optional["ModelInference"]:
+def _ctx_kwargs() -> dict:
+    return {"project_id": WATSONX_PROJECT_ID} if WATSONX_PROJECT_ID else {"space_id": WATSONX_SPACE_ID}
+
+
+def _api_client():
+    """Shared APIClient (authenticates once); None → per-model credentials."""
+    global _client
+    with _lock:
+        if _client is None and APIClient is not None:
+            try:
+                _client = APIClient(Credentials(api_key=WATSONX_API_KEY, url=WATSONX_BASE_URL), **_ctx_kwargs())
+            except Exception as e:
+                print(f"[watsonx] [warn] shared APIClient failed, falling back to per-model auth: {e}", flush=True)
+                _client = False
+        return _client or None
+
+
+def _params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _default_params(for_classify: bool) -> dict:
+    return CLASSIFY_PARAMS if for_classify else SUMMARIZE_PARAMS
+
+
+def _get_model(model_id: str, *, for_classify: bool = False,
+               params: Optional[dict] = None) -> Optional["ModelInference"]:
     """
-    Lazily initialize and cache a ModelInference for a given model_id.
+    Lazily initialize and cache a ModelInference per (model_id, default params).
     Uses PROJECT context by default; falls back to SPACE if provided.
     """
     global _last_error
@@ -73,36 +127,47 @@ def _get_model(model_id: str, *, for_classify: bool = False) -> Optional["ModelI
         )
         return None
 
-    if model_id in _models:
-        return _models[model_id]
-
-    try:
-        creds = Credentials(api_key=WATSONX_API_KEY, url=WATSONX_BASE_URL)
-        params = CLASSIFY_PARAMS if for_classify else SUMMARIZE_PARAMS
-
-        kwargs = dict(
-            model_id=model_id,
-            credentials=creds,
-            params=params,
-        )
-        if WATSONX_PROJECT_ID:
-            kwargs["project_id"] = WATSONX_PROJECT_ID
-        else:
-            kwargs["space_id"] = WATSONX_SPACE_ID  # using a Space / deployment context
+    params = _default_params(for_classify) if params is None else params
+    key = (model_id, _params_key(params))
+    m = _models.get(key)
+    if m is not None:
+        return m
 
-        m = ModelInference(**kwargs)  # type: ignore[arg-type]
-        _models[model_id] = m
+    with _lock:
+        klock = _key_locks.setdefault(key, threading.Lock())
+    with klock:   # one init per key; concurrent callers (warmup + first call) wait for it
+        m = _models.get(key)
+        if m is not None:
+            return m
+        failed = _failed.get(key)
+        if failed and time.time() - failed[0] < WX_RETRY_S:
+            _last_error = failed[1]
+            return None
+        try:
+            client = _api_client()
+            if client is not None:
+                m = ModelInference(model_id=model_id, api_client=client, params=dict(params))  # type: ignore[misc]
+            else:
+                creds = Credentials(api_key=WATSONX_API_KEY, url=WATSONX_BASE_URL)
+                m = ModelInference(model_id=model_id, credentials=creds, params=dict(params),  # type: ignore[misc]
+                                   **_ctx_kwargs())
+        except Exception as e:
+            _last_error = f"Model init failed for '{model_id}': {type(e).__name__}({e})"
+            _failed[key] = (time.time(), _last_error)
+            return None
+        _failed.pop(key, None)
+        _models[key] = m
         return m
-    except Exception as e:
-        _last_error = f"Model init failed for '{model_id}': {type(e).__name__}({e})"
-        return None
 
 
-def _wx_gen(prompt: str, *, model_key: str = "summarize", model_id: Optional[str] = None) -> str:
+def _wx_gen(prompt: str, *, model_key: str = "summarize", model_id: Optional[str] = None,
+            params: Optional[dict] = None) -> str:
     """
     Generate text with watsonx.ai.
-    - model_key: "classify" or "summarize" to pick the default model
+    - model_key: "classify", "summarize" or "analyze" to pick the default model
+      ("analyze" runs on the summarize model with ANALYZE_PARAMS)
     - model_id: explicit override (takes precedence over model_key)
+    - params: per-call generation params (override the cached model's defaults)
     Returns "" on failure (your pipeline should have safe fallbacks).
     """
     global _last_error
@@ -117,21 +182,62 @@ def _wx_gen(prompt: str, *, model_key: str = "summarize", model_id: Optional[str
     if m is None:
         return ""
 
+    if params is None and model_key == "analyze":
+        params = ANALYZE_PARAMS
+
     # call generate
     try:
         # ModelInference API
+        if params:
+            return m.generate_text(prompt=prompt, params=params) or ""
         return m.generate_text(prompt=prompt) or ""
     except Exception as e:
         _last_error = f"generate_text failed: {type(e).__name__}({e})"
         return ""
 
 
-def wx_healthcheck() -> dict:
-    """Quick diagnostics for your CLI."""
-    # try to init both defaults so we can report properly
+def wx_params(model_key: str = "summarize") -> dict:
+    """Current default generation params for a model_key (copy; safe to modify)."""
+    if model_key == "classify":
+        return dict(CLASSIFY_PARAMS)
+    if model_key == "analyze":
+        return dict(ANALYZE_PARAMS)
+    return dict(SUMMARIZE_PARAMS)
+
+
+def wx_warmup(wait: bool = False) -> Optional[threading.Thread]:
+    """
+    Build the default classify/summarize instances in a background thread
+    (idempotent: already-cached models are skipped). wait=True blocks until done.
+    """
+    global _warmup
+    if not _ctx_ok():
+        return None
+    with _lock:
+        if _warmup is None or not _warmup.is_alive():
+            def run():
+                t0 = time.perf_counter()
+                cm = _get_model(CLASSIFY_MODEL_ID, for_classify=True)
+                sm = _get_model(SUMMARIZE_MODEL_ID, for_classify=False)
+                print(f"[watsonx] warm in {time.perf_counter() - t0:.2f}s "
+                      f"(classify={'ok' if cm else 'failed'}, summarize={'ok' if sm else 'failed'})", flush=True)
+            _warmup = threading.Thread(target=run, name="wx-warmup", daemon=True)
+            _warmup.start()
+        t = _warmup
+    if wait:
+        t.join()
+    return t
+
+
+def wx_healthcheck(refresh: bool = False) -> dict:
+    """Quick diagnostics for your CLI (cached for WX_HEALTH_TTL seconds)."""
+    global _health
+    if not refresh and _health and time.time() - _health[0] < WX_HEALTH_TTL:
+        return _health[1]
+    # try to init both defaults so we can report properly (no-op once warm)
     cm = _get_model(CLASSIFY_MODEL_ID, for_classify=True)
     sm = _get_model(SUMMARIZE_MODEL_ID, for_classify=False)
-    return {
+    h = {
         "sdk_import_ok": _IMPORT_ERR is None,
         "base_url": WATSONX_BASE_URL,
         "project_id_set": bool(WATSONX_PROJECT_ID),
@@ -140,8 +246,12 @@ def wx_healthcheck() -> dict:
         "summarize_model_id": SUMMARIZE_MODEL_ID,
         "classify_model_inited": cm is not None,
         "summarize_model_inited": sm is not None,
+        "cached_models": len(_models),
+        "shared_client": bool(_client),
         "last_error": _last_error,
     }
+    _health = (time.time(), h)
+    return h
 
 
 # ---------------- Optional helpers ----------------
@@ -149,24 +259,25 @@ def wx_healthcheck() -> dict:
 def wx_set_params(*, classify_params: dict | None = None, summarize_params: dict | None = None) -> None:
     """
     Update generation parameters at runtime (e.g., to tweak token caps without restarting).
-    Clears model cache so new params stick.
+    Instances are cached per (model_id, params): the new params get their own
+    instance on next use; unrelated models stay warm.
     """
-    global CLASSIFY_PARAMS, SUMMARIZE_PARAMS, _models
+    global CLASSIFY_PARAMS, SUMMARIZE_PARAMS, _health
     if classify_params:
         CLASSIFY_PARAMS = dict(CLASSIFY_PARAMS, **classify_params)
     if summarize_params:
         SUMMARIZE_PARAMS = dict(SUMMARIZE_PARAMS, **summarize_params)
-    _models.clear()  # force re-init with new params
+    _health = None
 
 
 def wx_set_models(*, classify_model_id: Optional[str] = None, summarize_model_id: Optional[str] = None) -> None:
     """
     Swap default model IDs at runtime (handy for A/B testing).
-    Clears model cache so new models load.
+    Switching back reuses the cached instance; call wx_warmup() to pre-load the new ones.
     """
-    global CLASSIFY_MODEL_ID, SUMMARIZE_MODEL_ID, _models
+    global CLASSIFY_MODEL_ID, SUMMARIZE_MODEL_ID, _health
     if classify_model_id:
         CLASSIFY_MODEL_ID = classify_model_id
     if summarize_model_id:
         SUMMARIZE_MODEL_ID = summarize_model_id
-    _models.clear()
+    _health = None
@@ -0,0 +1,50 @@
+# weights.py
+# ---------------------------------------------------------------------
+# Heuristic scoring weights (tweak in one place).
+#
+# - Used by pipeline.score_item_base, rescore.py and ranker.prior_from_features.
+# - Imports nothing from the pipeline, so ranker.py can read the weights
+#   without pulling in pipeline (which itself imports ranker).
+# ---------------------------------------------------------------------
+from __future__ import annotations
+
+import os
+
+SOURCE_W = {
+    "sec_8k": 0.45,   # filings are high-signal but not always high-impact
+    "sec_10q": 0.30,
+    "sec_10k": 0.25,
+    "tier1_press": 0.30,   # Reuters/BBG/WSJ/FT/CNBC/MW
+    "other_press": 0.20,
+}
+EVENT_W = {
+    "ceo_exit": 0.35,
+    "bankruptcy": 0.35,
+    "non_reliance": 0.35,
+    "earnings_surprise": 0.30,
+    "mna": 0.30,
+    "guidance_change": 0.20,
+    "rating_change": 0.20,
+    "reg_fd": 0.10,
+    "geopolitics": 0.20,
+    "unregistered_sale": 0.15,
+    "dividend_change": 0.15,
+    "other_events": 0.05,
+}
+URGENCY_W = {"high": 0.15, "med": 0.06, "low": 0.00}
+KEYWORD_NUDGE = 0.03
+TICKER_PRESENT = 0.04
+WATCHLIST_BOOST = 0.12
+MAX_SCORE = 1.0
+
+TIER1 = ("reuters","bloomberg","wsj","ft","cnbc","marketwatch",
+         "nzz","handelszeitung","handelsblatt","faz","wiwo","boerse.ard","tagesschau","finanzen.net","cash","finews","tagesanzeiger")
+
+# Follow-ups on a story already seen (novelty.py) are discounted by up to this much
+FOLLOWUP_PENALTY = float(os.getenv("FOLLOWUP_PENALTY", "0.3"))
+
+HEADLINE_KEYWORDS = (
+    "guidance","resigns","resignation","appointed","impairment","non-reliance",
+    "acquisition","merger","downgrade","upgrade","beats","misses",
+    "ausblick","tritt zurück","übernahme","fusion","abstufung","hochstuft",
+    "übertrifft","verfehlt","dividende","aktienrückkauf","insolvenz")
@@ -57,6 +57,76 @@ app.use(express.json());
 app.get('/api/articles', (req, res) => res.json(db.data.articles));
 app.get('/api/tags', (req, res) => res.json(db.data.tags));
 
+// Pass a store response through; non-JSON bodies (e.g. the stdlib server's
+// HTML error pages) keep their status and become { message, detail }.
+async function relay(r, res) {
+    if ((r.headers.get('content-type') || '').includes('json')) {
+        return res.status(r.status).json(await r.json());
+    }
+    const text = await r.text();
+    res.status(r.ok ? 502 : r.status).json({
+        message: `Feed store answered ${r.status} ${r.statusText}`.trim(),
+        detail: text.slice(0, 500),
+    });
+}
+
+// Paged, filtered feed from the Python item store (backend/store.py serve).
+// Query: severity, event_type, ticker, hours, min_confidence, limit, cursor
+app.get('/api/feed', async (req, res) => {
+    const base = process.env.FEED_API_URL;
+    if (!base) return res.json({ items: db.data.articles, next_cursor: null });
+    try {
+        const qs = new URLSearchParams(req.query).toString();
+        const r = await fetch(`${base}/api/items?${qs}`);
+        await relay(r, res);
+    } catch (error) {
+        console.error("Error querying feed store:", error);
+        res.status(502).json({ message: "Feed store not reachable." });
+    }
+});
+
+app.get('/api/search', async (req, res) => {
+    const base = process.env.FEED_API_URL;
+    if (!base) return res.status(503).json({ message: "Search requires FEED_API_URL." });
+    try {
+        const qs = new URLSearchParams(req.query).toString();
+        const r = await fetch(`${base}/api/search?${qs}`);
+        await relay(r, res);
+    } catch (error) {
+        console.error("Error querying search index:", error);
+        res.status(502).json({ message: "Feed store not reachable." });
+    }
+});
+
+// Live push of scored items (SSE from backend/push_server.py), piped through.
+app.get('/api/stream', async (req, res) => {
+    const base = process.env.PUSH_API_URL;
+    if (!base) return res.status(503).json({ message: "Streaming requires PUSH_API_URL." });
+    const ctrl = new AbortController();
+    req.on('close', () => ctrl.abort());
+    try {
+        const qs = new URLSearchParams(req.query).toString();
+        const headers = req.get('Last-Event-ID') ? { 'Last-Event-ID': req.get('Last-Event-ID') } : {};
+        const r = await fetch(`${base}/events?${qs}`, { headers, signal: ctrl.signal });
+        // error pages must not be passed on as a 200 event stream (EventSource would retry forever)
+        if (!r.ok || !(r.headers.get('content-type') || '').includes('text/event-stream')) {
+            return await relay(r, res);
+        }
+        res.writeHead(200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+        });
+        for await (const chunk of r.body) res.write(chunk);
+        res.end();
+    } catch (error) {
+        if (ctrl.signal.aborted) return;
+        console.error("Error proxying push stream:", error);
+        if (!res.headersSent) res.status(502).json({ message: "Push server not reachable." });
+        else res.end();
+    }
+});
+
 app.post('/api/subscribe', async (req, res) => {
     try {
         const { email, tags, priorities } = req.body;